@@ -19,16 +19,21 @@ def sync_tyro_main(work_dir: Optional[str] = None,
                    ffmpeg: Optional[str] = None,
                    mark: Optional[str] = None,
                    language: Literal["en", "zh-CN"] = None,
+                   user_dict: Optional[str] = None,
+                   stopwords: Optional[str] = None,
                    show: bool = False,
                    clean: bool = False) -> None:
     """
-    Set working path, ffmpeg path, language and danmu mark.
+    Set working path, ffmpeg path, language, danmu mark, user dictionary and stopwords.
 
     Args:
         work_dir: working directory of program
         ffmpeg: the ffmpeg path in your computer
         mark: mark for marking live danmu, multiple marks need to be entered consecutive
         language: the language for program prompts
+        user_dict: user dictionary for word segmentation, one "word [frequency] [tag]" per line, for adding slang
+            and meme words
+        stopwords: stopword file for word clouds, one word per line
         show: whether to show the current configuration
         clean: whether to clean the configuration
     """
@@ -51,19 +56,31 @@ def sync_tyro_main(work_dir: Optional[str] = None,
 
         mark: list[str] = sync(ucu.load_danmu_mark_from_txt(temp_hide))
         language: str = ucu.load_language_from_txt()
+        try:
+            user_dict: Optional[str] = ucu.load_user_dict_path_from_txt(temp_hide)
+        except wam.FileMissError:
+            user_dict: Optional[str] = None
+        try:
+            stopwords: Optional[str] = ucu.load_stopwords_path_from_txt(temp_hide)
+        except wam.FileMissError:
+            stopwords: Optional[str] = None
 
         if language == "en":
             print("Current configuration:\n"
                      "\tWorking directory: {}\n"
                      "\tFFmpeg path: {}\n"
                      "\tDanmu mark: {}\n"
-                     "\tLanguage: {}".format(work_dir, ffmpeg, mark, language))
+                     "\tLanguage: {}\n"
+                     "\tUser dictionary: {}\n"
+                     "\tStopwords: {}".format(work_dir, ffmpeg, mark, language, user_dict, stopwords))
         else:
             print("当前配置为：\n"
                      "\t工作目录：{}\n"
                      "\tFFmpeg路径：{}\n"
                      "\t弹幕标记：{}\n"
-                     "\t语言：{}".format(work_dir, ffmpeg, mark, language))
+                     "\t语言：{}\n"
+                     "\t用户词典：{}\n"
+                     "\t停用词：{}".format(work_dir, ffmpeg, mark, language, user_dict, stopwords))
         return
 
     if work_dir is not None:
@@ -106,6 +123,22 @@ def sync_tyro_main(work_dir: Optional[str] = None,
             else:
                 log.warning("未指定弹幕标记，使用默认标记\"#\"。")
 
+    if user_dict is not None:
+        if not os.path.exists(user_dict):
+            if language == "en":
+                raise wam.FileMissError(f"User dictionary {user_dict} not found!")
+            else:
+                raise wam.FileMissError(f"未找到用户词典 {user_dict} ！")
+        sync(sc.save_user_dict_path_to_txt(user_dict, language))
+
+    if stopwords is not None:
+        if not os.path.exists(stopwords):
+            if language == "en":
+                raise wam.FileMissError(f"Stopword file {stopwords} not found!")
+            else:
+                raise wam.FileMissError(f"未找到停用词文件 {stopwords} ！")
+        sync(sc.save_stopwords_path_to_txt(stopwords, language))
+
     if language is not None:
         sync(sc.save_language_to_txt(language))
     else:
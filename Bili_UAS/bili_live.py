@@ -7,7 +7,7 @@ This module provides a command line interface for monitoring the live broadcast
 
 from __future__ import annotations
 from Bili_UAS.utils import config_utils as ucu
-from Bili_UAS.utils import live_utils as ulu, user_utils as uuu
+from Bili_UAS.utils import live_utils as ulu, user_utils as uuu, word_utils as uwu
 from typing import Union, Optional
 from Bili_UAS.writer import log_writer as wlw, abnormal_monitor as wam
 import os
@@ -16,8 +16,6 @@ from Bili_UAS.scripts import log_in as sli
 from Bili_UAS.cli import live_cli as clc
 import tyro
 from numpy import typing as npt
-import cv2 as cv
-import numpy as np
 
 
 def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonitor, clc.BiliLiveConfigProcess]) -> None:
@@ -65,7 +63,7 @@ def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonit
 
         if config.user_id is not None and config.live_id is None:
             user = uuu.BiliUser(uid=config.user_id, log=log_file, work_dir=work_dir, credential=credential)
-            config.live_id = user.room_id
+            config.live_id = sync(user.get_room_id())
 
         live_monitor = ulu.BiliLiveMonitor(config.live_id, log_file, work_dir, config.max_retry,
                                            config.retry_after, credential)
@@ -73,10 +71,16 @@ def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonit
         sync(live_monitor.monitor(config.save_all_danmu, config.danmu_disconnect, config.auto_disconnect))
 
         if config.mask is not None:
-            mask: Optional[npt.NDArray] = cv.imread(config.mask)
+            mask: Optional[npt.NDArray] = uwu.load_mask(config.mask, work_dir)
         else:
             mask = None
-        live_process = ulu.BiliLiveProcess(live_monitor.work_dir, log_file)
+        uwu.load_tokenizer(work_dir, ucu.load_user_dict_path_from_txt())
+        token_cache: uwu.TokenCache = uwu.load_token_cache(work_dir, config.token_cache)
+        word_filter: uwu.WordFilter = uwu.load_word_filter(ucu.load_stopwords_path_from_txt(), config.min_length,
+                                                           config.min_count)
+        renderer: uwu.WordCloudRenderer = uwu.load_word_cloud_renderer(work_dir, config.top_n)
+        live_process = ulu.BiliLiveProcess(live_monitor.work_dir, log_file, token_cache, word_filter,
+                                           renderer)
         sync(live_process.analysis(config.robust, config.robust_interval, config.danmu_interval, mask,
                                    config.revenue_interval, config.view_interval))
         live_process.clean_todo_file()
@@ -87,7 +91,8 @@ def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonit
             else:
                 log.warning("设置为长连直播间，要退出程序，请使用ctrl + c。")
             sync(live_monitor.monitor(config.save_all_danmu, config.danmu_disconnect, config.auto_disconnect))
-            live_process = ulu.BiliLiveProcess(live_monitor.work_dir, log_file)
+            live_process = ulu.BiliLiveProcess(live_monitor.work_dir, log_file, token_cache, word_filter,
+                                               renderer)
             sync(live_process.analysis(config.robust, config.robust_interval, config.danmu_interval, mask,
                                        config.revenue_interval, config.view_interval))
             live_process.clean_todo_file()
@@ -108,7 +113,7 @@ def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonit
 
         if config.user_id is not None and config.live_id is None:
             user = uuu.BiliUser(uid=config.user_id, log=log_file, work_dir=work_dir, credential=credential)
-            config.live_id = user.room_id
+            config.live_id = sync(user.get_room_id())
 
         live_monitor = ulu.BiliLiveMonitor(config.live_id, log_file, work_dir, config.max_retry,
                                            config.retry_after, credential)
@@ -135,13 +140,20 @@ def sync_tyro_main(config: Union[clc.BiliLiveConfigAuto, clc.BiliLiveConfigMonit
                 raise wam.ParameterInputError("没有指定数据文件夹！")
 
         if config.mask is not None:
-            mask: Optional[npt.NDArray] = cv.imread(config.mask).astype(np.uint8)
+            mask: Optional[npt.NDArray] = uwu.load_mask(config.mask, work_dir)
         else:
             mask = None
-        live_process = ulu.BiliLiveProcess(config.data_dir, log_file)
+        uwu.load_tokenizer(work_dir, ucu.load_user_dict_path_from_txt())
+        token_cache: uwu.TokenCache = uwu.load_token_cache(work_dir, config.token_cache)
+        word_filter: uwu.WordFilter = uwu.load_word_filter(ucu.load_stopwords_path_from_txt(), config.min_length,
+                                                           config.min_count)
+        renderer: uwu.WordCloudRenderer = uwu.load_word_cloud_renderer(work_dir, config.top_n)
+        live_process = ulu.BiliLiveProcess(config.data_dir, log_file, token_cache, word_filter,
+                                           renderer)
         sync(live_process.analysis(config.robust, config.robust_interval, config.danmu_interval, mask,
                                    config.revenue_interval, config.view_interval))
         live_process.clean_todo_file()
+        token_cache.close()
 
 
 def tyro_cli() -> None:
@@ -0,0 +1,83 @@
+"""
+Bili_UAS.bili_scheduler
+
+This module provides a command line interface for running periodic collection jobs in one long-running process.
+"""
+
+
+from __future__ import annotations
+import tyro
+from Bili_UAS.utils import config_utils as ucu, cache_utils as ucc
+from Bili_UAS.scripts import log_in as sli, track as st, scheduler as ssc
+from Bili_UAS.cli import scheduler_cli as csc
+from Bili_UAS.writer import log_writer as wlw, abnormal_monitor as wam
+from bilibili_api import sync, aid2bvid
+import os
+
+
+language: str = ucu.load_language_from_txt()
+
+
+def sync_tyro_main(config: csc.BiliSchedulerConfig) -> None:
+    """
+    Main function for tyro command-line interface.
+
+    Args:
+        config: configuration
+    """
+    work_dir: str = sync(ucu.load_work_dir_from_txt())
+    log_output: str = os.path.join(work_dir, "log")
+    log_file: str = os.path.join(log_output, "scheduler_log")
+
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING", "ERROR")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+
+    uid_list: list[int] = list(config.uid)
+    if config.uid_file is not None:
+        uid_list.extend(st.load_uid_file(config.uid_file))
+    bvid_list: list[str] = list(dict.fromkeys(aid2bvid(int(vid)) if vid.isdigit() else vid
+                                              for vid in config.video_id))
+    room_list: list[int] = list(dict.fromkeys(config.live_id))
+    if not uid_list and not bvid_list and not room_list:
+        if language == "en":
+            raise wam.ParameterInputError("None of uid, uid file, video ID and live ID entered!")
+        else:
+            raise wam.ParameterInputError("未输入uid、uid文件、视频ID或直播间ID！")
+
+    credential = sync(sli.load_credential_from_json(log_file))
+    if credential is not None:
+        credential = sync(sli.refresh_credential(credential, log_file))
+
+    cache = ucc.load_api_cache(work_dir, config.cache, False)
+    try:
+        sync(ssc.run_scheduler(uid_list, config.user_interval, bvid_list, config.video_interval, room_list,
+                               config.live_interval, config.jitter, config.max_jobs, config.parallel, config.rate,
+                               credential, log_file, work_dir, cache))
+    except KeyboardInterrupt:
+        if language == "en":
+            log.info("Scheduler stopped.")
+        else:
+            log.info("调度器已停止。")
+
+
+def tyro_cli() -> None:
+    """
+    Tyro command line interface.
+    """
+    tyro.extras.set_accent_color("bright_yellow")
+    sync_tyro_main(
+        tyro.cli(tyro.conf.FlagConversionOff[csc.BiliSchedulerConfig],
+                 description="Run follower updates, video statistics snapshots and live status checks periodically.")
+    )
+
+
+if __name__ == "__main__":
+    tyro_cli()
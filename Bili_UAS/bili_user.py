@@ -6,20 +6,22 @@ This module provides a command line interface for collecting user information an
 
 
 from __future__ import annotations
-from Bili_UAS.utils import config_utils as ucu, user_utils as uuu
+from Bili_UAS.utils import config_utils as ucu, user_utils as uuu, cache_utils as ucc
 from Bili_UAS.cli import user_cli as cuc
 from typing import Union
 from bilibili_api import sync, user as bau
 from Bili_UAS.writer import log_writer as wlw, abnormal_monitor as wam
 import os
-from Bili_UAS.scripts import log_in as sli
+import re
+from Bili_UAS.scripts import log_in as sli, track as st
 import tyro
 
 
 language: str = ucu.load_language_from_txt()
 
 
-def sync_tyro_main(config: Union[cuc.BiliUserConfigUpdate, cuc.BiliUserConfigAddress]) -> None:
+def sync_tyro_main(config: Union[cuc.BiliUserConfigUpdate, cuc.BiliUserConfigAddress,
+                                 cuc.BiliUserConfigBatchUpdate, cuc.BiliUserConfigForecast]) -> None:
     """
     Main function for tyro command-line interface.
 
@@ -45,6 +47,20 @@ def sync_tyro_main(config: Union[cuc.BiliUserConfigUpdate, cuc.BiliUserConfigAdd
     if credential is not None:
         credential = sync(sli.refresh_credential(credential, log_file))
 
+    if isinstance(config, cuc.BiliUserConfigBatchUpdate):
+        uid_list: list[int] = list(config.uid)
+        if config.uid_file is not None:
+            uid_list.extend(st.load_uid_file(config.uid_file))
+        if not uid_list:
+            if language == "en":
+                raise wam.ParameterInputError("Neither uid nor uid file entered!")
+            else:
+                raise wam.ParameterInputError("未输入uid或uid文件！")
+        cache = ucc.load_api_cache(work_dir, config.cache, config.cache_only)
+        sync(st.batch_update(uid_list, config.parallel, config.rate, config.guard, config.charge, credential,
+                             log_file, work_dir, cache))
+        return
+
     if config.name is None:
         if config.uid is None:
             if language == "en":
@@ -73,7 +89,14 @@ def sync_tyro_main(config: Union[cuc.BiliUserConfigUpdate, cuc.BiliUserConfigAdd
                 log.warning("请重新输入用户名或直接输入uid！")
             return
 
-    user = uuu.BiliUser(config.uid, log=log_file, work_dir=work_dir, credential=credential)
+    if isinstance(config, cuc.BiliUserConfigForecast):
+        user = uuu.BiliUser(config.uid, log=log_file, work_dir=work_dir, credential=credential)
+        sync(user.forecast_series(config.series, config.horizon * 24 * 60 * 60, config.step * 60 * 60,
+                                  config.level))
+        return
+
+    cache = ucc.load_api_cache(work_dir, config.cache, config.cache_only)
+    user = uuu.BiliUser(config.uid, log=log_file, work_dir=work_dir, credential=credential, cache=cache)
 
     if isinstance(config, cuc.BiliUserConfigUpdate):
         sync(user.update_fans_number())
@@ -82,9 +105,15 @@ def sync_tyro_main(config: Union[cuc.BiliUserConfigUpdate, cuc.BiliUserConfigAdd
     else:
         mode = uuu.AddressProcessType(config.mode)
         if mode == uuu.AddressProcessType.SEND:
-            sync(user.guard_address_stat_send())
+            if config.campaign is not None and not re.fullmatch(r"[\w-]+", config.campaign):
+                if language == "en":
+                    raise wam.ParameterInputError("campaign can only contain letters, digits, _ and -!")
+                else:
+                    raise wam.ParameterInputError("活动名只能包含字母、数字、_和-！")
+            sync(user.guard_address_stat_send(config.parallel, config.rate, config.max_retry, config.retry_after,
+                                              config.resend, config.campaign))
         elif mode == uuu.AddressProcessType.RECEIVE:
-            sync(user.guard_address_stat_receive())
+            sync(user.guard_address_stat_receive(config.parallel, config.rate))
 
 
 def tyro_cli() -> None:
@@ -7,22 +7,53 @@ This module provides a command line interface for downloading videos, audio or g
 
 from __future__ import annotations
 import tyro
-from Bili_UAS.utils import config_utils as ucu, video_utils as uvu
-from Bili_UAS.scripts import video as sv, log_in as sli
+from Bili_UAS.utils import (config_utils as ucu, video_utils as uvu, user_utils as uuu, search_utils as usu,
+                            cache_utils as ucc, word_utils as uwu)
+from Bili_UAS.scripts import video as sv, log_in as sli, download as sd, corpus as sco
 from Bili_UAS.cli import video_cli as cvc
 from Bili_UAS.writer import log_writer as wlw, abnormal_monitor as wam
-from bilibili_api import sync
+from bilibili_api import sync, aid2bvid, Credential
 import os
-from typing import Union
+from typing import Optional, Union
 from numpy import typing as npt
-import numpy as np
-import cv2 as cv
 
 
 language: str = ucu.load_language_from_txt()
 
 
-def sync_tyro_main(config: Union[cvc.BiliVideoConfigWordCloud, cvc.BiliVideoConfigDownload]) -> None:
+def resolve_video_list(config: Union[cvc.BiliVideoConfigBatchDownload, cvc.BiliVideoConfigCorpus],
+                       credential: Optional[Credential],
+                       log_file: str,
+                       work_dir: str,
+                       cache: Optional[ucc.BiliApiCache]) -> list[str]:
+    """
+    Collect bvid of the videos entered, the videos uploaded by the user and the videos found by the keywords.
+
+    Args:
+        config: configuration
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+
+    Returns:
+        bvid of videos without duplicates, in the order of collection
+    """
+    bvid_list: list[str] = [aid2bvid(int(vid)) if vid.isdigit() else vid for vid in config.video_id]
+    if config.uid is not None:
+        user = uuu.BiliUser(config.uid, log=log_file, work_dir=work_dir, credential=credential, cache=cache)
+        sync(user.get_upload_videos())
+        bvid_list.extend(user.video_id)
+    if config.keywords:
+        search = usu.BiliSearch(list(config.keywords), log=log_file, cache=cache)
+        sync(search.search_video())
+        bvid_list.extend(search.video_id)
+    return list(dict.fromkeys(bvid_list))
+
+
+def sync_tyro_main(config: Union[cvc.BiliVideoConfigWordCloud, cvc.BiliVideoConfigDownload,
+                                 cvc.BiliVideoConfigBatchDownload, cvc.BiliVideoConfigMergeWordCloud,
+                                 cvc.BiliVideoConfigCorpus]) -> None:
     """
     Main function for tyro command-line interface.
 
@@ -44,10 +75,33 @@ def sync_tyro_main(config: Union[cvc.BiliVideoConfigWordCloud, cvc.BiliVideoConf
     log.add_config(file_handler)
     log.add_config(sys_handler)
 
+    if isinstance(config, cvc.BiliVideoConfigMergeWordCloud):
+        if not config.video_id and not config.live_dir:
+            if language == "en":
+                raise wam.ParameterInputError("Neither video ID nor live directory entered!")
+            else:
+                raise wam.ParameterInputError("未输入视频ID或直播目录！")
+        if config.mask is not None:
+            word_cloud_mask: npt.NDArray = uwu.load_mask(config.mask, work_dir)
+        else:
+            word_cloud_mask = None
+        if config.output is not None:
+            save_path: str = config.output
+        else:
+            save_path = os.path.join(work_dir, "merged_word_cloud.png")
+        word_filter: uwu.WordFilter = uwu.load_word_filter(ucu.load_stopwords_path_from_txt(), config.min_length,
+                                                           config.min_count)
+        sync(sv.merge_word_cloud(list(config.video_id), list(config.live_dir), sv.WordCloudContent(config.mode),
+                                 word_cloud_mask, save_path, log_file, work_dir, word_filter,
+                                 uwu.load_word_cloud_renderer(work_dir, config.top_n)))
+        return
+
     credential = sync(sli.load_credential_from_json(log_file))
     if credential is not None:
         credential = sync(sli.refresh_credential(credential, log_file))
 
+    cache = ucc.load_api_cache(work_dir, config.cache, config.cache_only)
+
     if isinstance(config, cvc.BiliVideoConfigWordCloud):
         if config.video_id is None:
             if language == "en":
@@ -56,10 +110,43 @@ def sync_tyro_main(config: Union[cvc.BiliVideoConfigWordCloud, cvc.BiliVideoConf
                 raise wam.ParameterInputError("未输入视频ID！")
         wm = sv.WordCloudContent(config.mode)
         if config.mask is not None:
-            word_cloud_mask: npt.NDArray = cv.imread(config.mask).astype(np.uint8)
+            word_cloud_mask: npt.NDArray = uwu.load_mask(config.mask, work_dir)
+        else:
+            word_cloud_mask = None
+        uwu.load_tokenizer(work_dir, ucu.load_user_dict_path_from_txt())
+        token_cache: uwu.TokenCache = uwu.load_token_cache(work_dir, config.token_cache)
+        word_filter: uwu.WordFilter = uwu.load_word_filter(ucu.load_stopwords_path_from_txt(), config.min_length,
+                                                           config.min_count)
+        sync(sv.word_cloud(config.video_id, credential, wm, config.sec, word_cloud_mask, log_file, work_dir, cache,
+                           config.incremental, config.processes, token_cache, word_filter,
+                           uwu.load_word_cloud_renderer(work_dir, config.top_n)))
+        token_cache.close()
+    elif isinstance(config, cvc.BiliVideoConfigBatchDownload):
+        bvid_list: list[str] = resolve_video_list(config, credential, log_file, work_dir, cache)
+        dm = uvu.VideoDownloadMode(config.mode)
+        sync(sd.batch_download(bvid_list, dm, config.parallel_video, config.parallel, config.connections,
+                               config.bandwidth, config.max_retry, config.retry_after, credential, log_file, work_dir,
+                               cache))
+    elif isinstance(config, cvc.BiliVideoConfigCorpus):
+        bvid_list: list[str] = resolve_video_list(config, credential, log_file, work_dir, cache)
+        name_parts: list[str] = []
+        if config.uid is not None:
+            name_parts.append(f"uid_{config.uid}")
+        name_parts.extend(config.keywords)
+        if config.video_id:
+            name_parts.append("videos")
+        if config.mask is not None:
+            word_cloud_mask: npt.NDArray = uwu.load_mask(config.mask, work_dir)
         else:
             word_cloud_mask = None
-        sync(sv.word_cloud(config.video_id, credential, wm, config.sec, word_cloud_mask, log_file, work_dir))
+        uwu.load_tokenizer(work_dir, ucu.load_user_dict_path_from_txt())
+        token_cache: uwu.TokenCache = uwu.load_token_cache(work_dir, config.token_cache)
+        word_filter: uwu.WordFilter = uwu.load_word_filter(ucu.load_stopwords_path_from_txt(), config.min_length,
+                                                           config.min_count)
+        sync(sco.corpus_analysis(bvid_list, "_".join(name_parts) or "videos", config.sec, config.parallel_video,
+                                 config.rate, config.refresh, credential, log_file, work_dir, cache, token_cache,
+                                 word_filter, uwu.load_word_cloud_renderer(work_dir, config.top_n), word_cloud_mask))
+        token_cache.close()
     else:
         if config.video_id is None:
             if language == "en":
@@ -68,11 +155,13 @@ def sync_tyro_main(config: Union[cvc.BiliVideoConfigWordCloud, cvc.BiliVideoConf
                 raise wam.ParameterInputError("未输入视频ID！")
         dm = uvu.VideoDownloadMode(config.mode)
         if isinstance(config.video_id, int):
-            video = uvu.BiliVideo(log=log_file, aid=config.video_id, credential=credential, work_dir=work_dir)
+            video = uvu.BiliVideo(log=log_file, aid=config.video_id, credential=credential, work_dir=work_dir,
+                                  cache=cache)
         else:
-            video = uvu.BiliVideo(log=log_file, bvid=config.video_id, credential=credential, work_dir=work_dir)
+            video = uvu.BiliVideo(log=log_file, bvid=config.video_id, credential=credential, work_dir=work_dir,
+                                  cache=cache)
         sync(video.init_all())
-        sync(video.download(dm))
+        sync(video.download(dm, config.parallel))
 
 
 def tyro_cli() -> None:
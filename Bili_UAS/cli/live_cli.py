@@ -39,6 +39,14 @@ class BiliLiveConfigAuto(object):
     """time interval for conducting danmu frequency analysis, unit: minute"""
     mask: Union[str, None] = None
     """Mask for generating danmu word cloud image."""
+    token_cache: bool = True
+    """whether to keep word segmentation results on disk, so that known danmu are not segmented again"""
+    min_length: int = 1
+    """the minimum number of characters of a word in the danmu word cloud"""
+    min_count: int = 1
+    """the minimum frequency of a word in the danmu word cloud"""
+    top_n: int = 200
+    """the maximum number of words in the danmu word cloud"""
     revenue_interval: float = 5
     """time interval for revenue statistics, unit: minute"""
     view_interval: float = 5
@@ -83,6 +91,14 @@ class BiliLiveConfigProcess(object):
     """time interval for conducting danmu frequency analysis, unit: minute"""
     mask: Union[str, None] = None
     """Mask for generating danmu word cloud image."""
+    token_cache: bool = True
+    """whether to keep word segmentation results on disk, so that known danmu are not segmented again"""
+    min_length: int = 1
+    """the minimum number of characters of a word in the danmu word cloud"""
+    min_count: int = 1
+    """the minimum frequency of a word in the danmu word cloud"""
+    top_n: int = 200
+    """the maximum number of words in the danmu word cloud"""
     revenue_interval: float = 5
     """time interval for revenue statistics, unit: minute"""
     view_interval: float = 5
@@ -0,0 +1,40 @@
+"""
+Bili_UAS.cli.scheduler_cli
+
+This module provides scheduler command line interface configuration.
+"""
+
+
+from typing import Union
+from dataclasses import dataclass
+
+
+@dataclass
+class BiliSchedulerConfig(object):
+    """
+    Bilibili Scheduler Configuration Class.
+    """
+    uid: tuple[int, ...] = ()
+    """users whose fan number, guard number and charging number are updated"""
+    uid_file: Union[str, None] = None
+    """text file of users' uid, one uid per line"""
+    user_interval: float = 60
+    """interval of updating users, unit: minute"""
+    video_id: tuple[str, ...] = ()
+    """videos' aid or bvid, whose statistics are recorded"""
+    video_interval: float = 60
+    """interval of recording video statistics, unit: minute"""
+    live_id: tuple[int, ...] = ()
+    """live rooms whose live status is checked"""
+    live_interval: float = 5
+    """interval of checking live status, unit: minute"""
+    jitter: float = 30
+    """maximum random delay added to every run, unit: second"""
+    max_jobs: int = 2
+    """the maximum number of jobs running at the same time"""
+    parallel: int = 8
+    """the maximum number of users updated at the same time"""
+    rate: float = 5
+    """the maximum number of API requests per second in total"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
@@ -19,6 +19,10 @@ class BiliUserConfigUpdate(object):
     """username, either name or uid must be filled in"""
     uid: Union[str, None] = None
     """user uid, either name or uid must be filled in"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
 
 
 @dataclass
@@ -30,19 +34,84 @@ class BiliUserConfigAddress(object):
     """username, either name or uid must be filled in"""
     uid: Union[str, None] = None
     """user uid, either name or uid must be filled in"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
     mode: Literal[1, 2] = 1
     """address process mode, 1 for send, 2 for receive"""
+    parallel: int = 2
+    """the maximum number of messages sent or sessions fetched at the same time"""
+    rate: float = 1
+    """the maximum number of messages sent or sessions fetched per second"""
+    max_retry: int = 3
+    """the maximum number of attempts for a guard"""
+    retry_after: float = 5
+    """waiting time before retrying a failed message, doubled after each failure, unit: second"""
+    resend: bool = False
+    """whether to message guards who have been sent the message in this campaign again"""
+    campaign: Union[str, None] = None
+    """name of the address campaign, made of letters, digits, "_" and "-", rerunning a campaign only messages the guards
+    not messaged yet, None for the current date"""
 
 
-mode_configs: dict[str, Union[BiliUserConfigUpdate, BiliUserConfigAddress]] = {}
+@dataclass
+class BiliUserConfigBatchUpdate(object):
+    """
+    Bilibili User Configuration Class: Batch Update.
+    """
+    uid: tuple[int, ...] = ()
+    """users' uid"""
+    uid_file: Union[str, None] = None
+    """text file of users' uid, one uid per line"""
+    parallel: int = 8
+    """the maximum number of users updated at the same time"""
+    rate: float = 10
+    """the maximum number of API requests per second in total"""
+    guard: bool = True
+    """whether to update the number of guards"""
+    charge: bool = True
+    """whether to update the number of charging members"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
+
+
+@dataclass
+class BiliUserConfigForecast(object):
+    """
+    Bilibili User Configuration Class: Forecast.
+    """
+    name: Union[str, None] = None
+    """username, either name or uid must be filled in"""
+    uid: Union[str, None] = None
+    """user uid, either name or uid must be filled in"""
+    series: Literal["fans", "guard", "charge"] = "fans"
+    """the data to forecast, the total number is forecast for guards"""
+    horizon: float = 7
+    """how far to forecast after the last record, unit: day"""
+    step: float = 6
+    """spacing of forecast points, unit: hour"""
+    level: float = 0.9
+    """probability covered by the forecast interval"""
+
+
+mode_configs: dict[str, Union[BiliUserConfigUpdate, BiliUserConfigAddress, BiliUserConfigBatchUpdate,
+                              BiliUserConfigForecast]] = {}
 
 descriptions: dict[str, str] = {
     "update": "Update user fan number, guard number, charging number.",
-    "address": "Count the guard's address."
+    "address": "Count the guard's address.",
+    "batch_update": "Update fan number, guard number and charging number of many users in one sweep, recorded in "
+                    "user_output/batch_metrics.csv.",
+    "forecast": "Forecast fan number, guard number or charging number from the recorded data."
 }
 
 mode_configs["update"] = BiliUserConfigUpdate()
 mode_configs["address"] = BiliUserConfigAddress()
+mode_configs["batch_update"] = BiliUserConfigBatchUpdate()
+mode_configs["forecast"] = BiliUserConfigForecast()
 
 UserConfigUnion = tyro.conf.SuppressFixed[
     tyro.conf.FlagConversionOff[
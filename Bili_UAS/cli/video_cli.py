@@ -23,6 +23,22 @@ class BiliVideoConfigWordCloud(object):
     """whether to process secondary replies"""
     mask: Union[str, None] = None
     """word cloud mask, filling the white pixel with word clouds"""
+    incremental: bool = False
+    """whether to only fetch replies newer than the last run, keeping all replies in a local store"""
+    processes: int = 0
+    """number of processes for word segmentation, 0 represents the number of CPU cores"""
+    token_cache: bool = True
+    """whether to keep word segmentation results on disk, so that known messages are not segmented again"""
+    min_length: int = 1
+    """the minimum number of characters of a word in the word cloud"""
+    min_count: int = 1
+    """the minimum frequency of a word in the word cloud"""
+    top_n: int = 200
+    """the maximum number of words in the word cloud"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
 
 
 @dataclass
@@ -32,19 +48,126 @@ class BiliVideoConfigDownload(object):
     """
     video_id: Union[str, int, None] = None
     """video's aid or bvid"""
-    mode: Literal[1, 2] = 1
-    """video download type, 1 represents video and 2 represents audio"""
+    mode: Literal[1, 2, 3] = 1
+    """video download type, 1 represents video, 2 represents mp3 audio and 3 represents original audio without
+    transcoding"""
+    parallel: int = 2
+    """the maximum number of sub videos downloaded at the same time"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
+
+
+@dataclass
+class BiliVideoConfigBatchDownload(object):
+    """
+    Bilibili Video Configuration Class: Batch Download.
+    """
+    video_id: tuple[str, ...] = ()
+    """videos' aid or bvid"""
+    uid: Union[int, None] = None
+    """download all videos uploaded by this user"""
+    keywords: tuple[str, ...] = ()
+    """download all videos found by these keywords"""
+    mode: Literal[1, 2, 3] = 1
+    """video download type, 1 represents video, 2 represents mp3 audio and 3 represents original audio without
+    transcoding"""
+    parallel_video: int = 2
+    """the maximum number of videos downloaded at the same time"""
+    parallel: int = 2
+    """the maximum number of sub videos of a video downloaded at the same time"""
+    connections: int = 8
+    """the maximum number of open download connections in total"""
+    bandwidth: float = 0
+    """the total download bandwidth, unit: KB/s, 0 represents unlimited"""
+    max_retry: int = 3
+    """the maximum number of attempts for a video"""
+    retry_after: float = 5
+    """waiting time before retrying a failed video, doubled after each failure, unit: second"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
+
+
+@dataclass
+class BiliVideoConfigMergeWordCloud(object):
+    """
+    Bilibili Video Configuration Class: Merge Word Cloud.
+    """
+    video_id: tuple[str, ...] = ()
+    """videos' aid or bvid, whose word clouds have been generated"""
+    live_dir: tuple[str, ...] = ()
+    """output directories of live rooms or of single live-streamings, whose data have been processed"""
+    mode: Literal[1, 2, 3] = 1
+    """word cloud content of the videos, 1 represents comments, 2 represents barrage, and 3 represents both"""
+    mask: Union[str, None] = None
+    """word cloud mask, filling the white pixel with word clouds"""
+    output: Union[str, None] = None
+    """path of the merged word cloud image, defaults to merged_word_cloud.png in the working directory"""
+    min_length: int = 1
+    """the minimum number of characters of a word in the word cloud"""
+    min_count: int = 1
+    """the minimum frequency of a word in the merged word cloud"""
+    top_n: int = 200
+    """the maximum number of words in the word cloud"""
+
+
+@dataclass
+class BiliVideoConfigCorpus(object):
+    """
+    Bilibili Video Configuration Class: Corpus Analysis.
+    """
+    video_id: tuple[str, ...] = ()
+    """videos' aid or bvid"""
+    uid: Union[int, None] = None
+    """analyze all videos uploaded by this user"""
+    keywords: tuple[str, ...] = ()
+    """analyze all videos found by these keywords"""
+    sec: bool = True
+    """whether to process secondary replies"""
+    parallel_video: int = 4
+    """the maximum number of videos analyzed at the same time"""
+    rate: float = 5
+    """the maximum number of API requests per second in total"""
+    refresh: bool = False
+    """whether to analyze videos analyzed before again"""
+    mask: Union[str, None] = None
+    """word cloud mask, filling the white pixel with word clouds"""
+    min_length: int = 1
+    """the minimum number of characters of a word in the word cloud"""
+    min_count: int = 1
+    """the minimum frequency of a word in the word cloud"""
+    top_n: int = 200
+    """the maximum number of words in the word cloud"""
+    token_cache: bool = True
+    """whether to cache word segmentation results on disk"""
+    cache: bool = True
+    """whether to cache API responses on disk"""
+    cache_only: bool = False
+    """whether to work offline, only using cached API responses"""
 
 
-mode_configs: dict[str, Union[BiliVideoConfigWordCloud, BiliVideoConfigDownload]] = {}
+mode_configs: dict[str, Union[BiliVideoConfigWordCloud, BiliVideoConfigDownload, BiliVideoConfigBatchDownload,
+                              BiliVideoConfigMergeWordCloud, BiliVideoConfigCorpus]] = {}
 
 descriptions: dict[str, str] = {
     "word_cloud": "Generate word cloud images of video replies or danmu.",
-    "download": "Download video or audio."
+    "download": "Download video or audio.",
+    "batch_download": "Download many videos, videos uploaded by a user or videos found by keywords. Interrupted "
+                      "downloads are resumed in the next run.",
+    "merge_word_cloud": "Generate one word cloud image of many videos and live-streamings from their saved word "
+                        "frequency tables.",
+    "corpus": "Analyze replies and danmu of many videos, videos uploaded by a user or videos found by keywords, "
+              "producing per-video statistics and an aggregate word cloud."
 }
 
 mode_configs["word_cloud"] = BiliVideoConfigWordCloud()
 mode_configs["download"] = BiliVideoConfigDownload()
+mode_configs["batch_download"] = BiliVideoConfigBatchDownload()
+mode_configs["merge_word_cloud"] = BiliVideoConfigMergeWordCloud()
+mode_configs["corpus"] = BiliVideoConfigCorpus()
 
 VideoConfigUnion = tyro.conf.SuppressFixed[
     tyro.conf.FlagConversionOff[
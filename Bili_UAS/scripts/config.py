@@ -91,3 +91,37 @@ async def save_language_to_txt(language: str) -> None:
         print("INFO: Language configuration saved successfully.")
     else:
         print("INFO: 语言配置保存成功。")
+
+
+async def save_user_dict_path_to_txt(user_dict: str, language: str) -> None:
+    """
+    Save the path of the user dictionary for word segmentation to file.
+
+    Args:
+        user_dict: the path of the user dictionary
+        language: the language of program prompts
+    """
+    user_dict_file: str = ".user_dict"
+    with open(user_dict_file, "w") as f:
+        f.write(os.path.abspath(user_dict) + "\n")
+    if language == "en":
+        print("INFO: User dictionary path saved successfully.")
+    else:
+        print("INFO: 用户词典路径保存成功。")
+
+
+async def save_stopwords_path_to_txt(stopwords: str, language: str) -> None:
+    """
+    Save the path of the stopword file for word clouds to file.
+
+    Args:
+        stopwords: the path of the stopword file
+        language: the language of program prompts
+    """
+    stopwords_file: str = ".stopwords"
+    with open(stopwords_file, "w") as f:
+        f.write(os.path.abspath(stopwords) + "\n")
+    if language == "en":
+        print("INFO: Stopword file path saved successfully.")
+    else:
+        print("INFO: 停用词文件路径保存成功。")
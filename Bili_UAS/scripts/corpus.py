@@ -0,0 +1,244 @@
+"""
+Bili_UAS.scripts.corpus
+
+This module provides the corpus analysis of many videos, e.g. all videos uploaded by a user or found by keywords.
+"""
+
+
+# per video statistics path: video_output/{bvid}/corpus_stats.json
+# per video word frequency path: video_output/{bvid}/corpus_word_freq.json, Chinese words without other filtering
+# corpus output directory: video_output/corpus/{name}/
+
+
+from __future__ import annotations
+from Bili_UAS.utils import video_utils as uvu, word_utils as uwu
+from Bili_UAS.utils.rate_utils import TokenBucket
+from Bili_UAS.utils.cache_utils import BiliApiCache
+from Bili_UAS.utils.config_utils import load_language_from_txt
+from Bili_UAS.writer import log_writer as wlw
+from bilibili_api import Credential
+from collections import Counter
+from numpy import typing as npt
+from typing import AsyncIterator, Optional
+import pandas as pd
+import asyncio
+import json
+import os
+
+
+language: str = load_language_from_txt()
+corpus_word_freq_file: str = "corpus_word_freq.json"
+
+
+async def _analyze_video(bvid: str,
+                         sec: bool,
+                         limiter: TokenBucket,
+                         credential: Optional[Credential],
+                         log_file: str,
+                         work_dir: str,
+                         cache: Optional[BiliApiCache],
+                         token_cache: uwu.TokenCache) -> dict:
+    """
+    Obtain the replies and danmu of a video and compute its statistics and word frequency. Replies and danmu are
+    fetched concurrently and tokenized as they arrive. The word frequency is saved without the word filter, so that
+    the filter is applied once over the whole corpus.
+
+    Args:
+        bvid: bvid of video
+        sec: whether to process secondary replies
+        limiter: request rate limiter shared by all videos
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+        token_cache: word segmentation cache
+
+    Returns:
+        statistics of the video
+    """
+    video = uvu.BiliVideo(log=log_file, bvid=bvid, credential=credential, work_dir=work_dir, cache=cache,
+                          limiter=limiter)
+    await video.init_all()
+    await video.video_info_statistics()
+    counts: dict[str, int] = {"reply": 0, "danmu": 0}
+
+    async def __reply_pages() -> AsyncIterator[list[str]]:
+        """
+        Obtain cleaned replies page by page.
+
+        Yields:
+            cleaned content of a page of replies
+        """
+        async for page_replies in video.iter_reply_pages(sec):
+            counts['reply'] += len(page_replies)
+            yield [uvu.clean_reply_content(elem.content) for elem in page_replies]
+
+    async def __danmu_pages() -> AsyncIterator[list[str]]:
+        """
+        Obtain danmu sub video by sub video.
+
+        Yields:
+            content of the danmu of a sub video
+        """
+        async for page_danmu in video.iter_danmu_pages():
+            counts['danmu'] += len(page_danmu)
+            yield [elem.content for elem in page_danmu]
+
+    wf: Counter = await uwu.count_words_async(uwu.merge_pages(__reply_pages(), __danmu_pages()), 1,
+                                              token_cache=token_cache)
+    uwu.save_word_freq(wf, os.path.join(video.work_dir, corpus_word_freq_file))
+
+    duration: int = sum(video.p_time)
+    stats: dict = {"bvid": bvid,
+                   "publish_time": video.publish_time,
+                   "duration": duration,
+                   "view": video.view,
+                   "like": video.like,
+                   "reply": counts['reply'],
+                   "danmu": counts['danmu'],
+                   "danmu_per_minute": counts['danmu'] / (duration / 60) if duration else 0.0,
+                   "words": sum(wf.values())}
+    temp_file: str = os.path.join(video.work_dir, "corpus_stats.json.temp")
+    with open(temp_file, "w") as f:
+        json.dump(stats, f, indent=1)
+    os.replace(temp_file, os.path.join(video.work_dir, "corpus_stats.json"))
+    return stats
+
+
+async def corpus_analysis(bvid_list: list[str],
+                          name: str,
+                          sec: bool,
+                          parallel_video: int,
+                          rate: float,
+                          refresh: bool,
+                          credential: Optional[Credential],
+                          log_file: str,
+                          work_dir: str,
+                          cache: Optional[BiliApiCache] = None,
+                          token_cache: Optional[uwu.TokenCache] = None,
+                          word_filter: Optional[uwu.WordFilter] = None,
+                          renderer: Optional[uwu.WordCloudRenderer] = None,
+                          mask: Optional[npt.NDArray] = None) -> None:
+    """
+    Analyze the replies and danmu of many videos, producing statistics of every video, aggregate statistics and an
+    aggregate word cloud. Statistics and word frequency are kept per video, so videos analyzed before are not
+    fetched again unless refreshed.
+
+    Args:
+        bvid_list: bvid of videos
+        name: name of the corpus, used as the output directory name
+        sec: whether to process secondary replies
+        parallel_video: the maximum number of videos analyzed at the same time
+        rate: the maximum number of API requests per second in total
+        refresh: whether to analyze videos analyzed before again
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+        token_cache: word segmentation cache, None for an in-memory cache of this run
+        word_filter: word filter applied to the word frequency of the whole corpus, None for only keeping Chinese words
+        renderer: word cloud renderer, None for rendering without the image cache
+        mask: word cloud mask, filling the white pixel with word clouds
+    """
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING", "ERROR")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+
+    if not bvid_list:
+        if language == "en":
+            log.warning("There is no video to analyze!")
+        else:
+            log.warning("没有需要分析的视频！")
+        return
+    if token_cache is None:
+        token_cache = uwu.TokenCache()
+    if word_filter is None:
+        word_filter = uwu.WordFilter()
+    if renderer is None:
+        renderer = uwu.WordCloudRenderer()
+
+    stats: dict[str, dict] = {}
+    pending: list[str] = []
+    for bvid in bvid_list:
+        stats_file: str = os.path.join(work_dir, "video_output", bvid, "corpus_stats.json")
+        freq_file: str = os.path.join(work_dir, "video_output", bvid, corpus_word_freq_file)
+        if not refresh and os.path.exists(stats_file) and os.path.exists(freq_file):
+            with open(stats_file, "r") as f:
+                stats[bvid] = json.load(f)
+        else:
+            pending.append(bvid)
+    if language == "en":
+        log.info(f"{len(stats)} of {len(bvid_list)} videos have been analyzed before, {len(pending)} videos are "
+                 f"waiting to be analyzed.")
+    else:
+        log.info(f"{len(bvid_list)} 个视频中有 {len(stats)} 个已分析过，{len(pending)} 个视频等待分析。")
+
+    limiter: TokenBucket = TokenBucket(rate)
+    job_queue: asyncio.Queue = asyncio.Queue()
+    for bvid in pending:
+        job_queue.put_nowait(bvid)
+
+    async def __worker() -> None:
+        """
+        Take videos from the queue and analyze them until the queue is empty.
+        """
+        while not job_queue.empty():
+            bvid: str = job_queue.get_nowait()
+            try:
+                stats[bvid] = await _analyze_video(bvid, sec, limiter, credential, log_file, work_dir, cache,
+                                                   token_cache)
+            except Exception as e:
+                if language == "en":
+                    log.error(f"{bvid} analysis failed: {type(e).__name__}: {e}")
+                else:
+                    log.error(f"{bvid} 分析失败：{type(e).__name__}：{e}")
+
+    await asyncio.gather(*[__worker() for _ in range(max(1, parallel_video))])
+
+    corpus_dir: str = os.path.join(work_dir, "video_output", "corpus", name)
+    os.makedirs(corpus_dir, exist_ok=True)
+    analyzed: list[str] = [bvid for bvid in bvid_list if bvid in stats]
+    if not analyzed:
+        if language == "en":
+            log.warning("No video was analyzed successfully!")
+        else:
+            log.warning("没有成功分析的视频！")
+        return
+
+    video_stats: pd.DataFrame = pd.DataFrame([stats[bvid] for bvid in analyzed])
+    video_stats['publish_time'] = pd.to_datetime(video_stats['publish_time'], unit="s")
+    video_stats_file: str = os.path.join(corpus_dir, "video_stats.xlsx")
+    video_stats.to_excel(video_stats_file, index=False)
+
+    total_duration: int = int(video_stats['duration'].sum())
+    summary: dict = {"videos": len(analyzed),
+                     "duration": total_duration,
+                     "reply": int(video_stats['reply'].sum()),
+                     "danmu": int(video_stats['danmu'].sum()),
+                     "reply_mean": float(video_stats['reply'].mean()),
+                     "danmu_mean": float(video_stats['danmu'].mean()),
+                     "danmu_per_minute": (float(video_stats['danmu'].sum()) / (total_duration / 60)
+                                          if total_duration else 0.0)}
+    with open(os.path.join(corpus_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=1)
+
+    wf: Counter = word_filter.apply(uwu.merge_word_freq(os.path.join(work_dir, "video_output", bvid,
+                                                                     corpus_word_freq_file) for bvid in analyzed))
+    uwu.save_word_freq(wf, os.path.join(corpus_dir, "word_freq.json"))
+    if wf:
+        renderer.render(wf, mask, os.path.join(corpus_dir, "word_cloud.png"))
+
+    if language == "en":
+        log.info(f"Corpus analysis completed: {summary['videos']} videos, {summary['reply']} replies, "
+                 f"{summary['danmu']} danmu, {summary['danmu_per_minute']:.2f} danmu per minute. Results are saved "
+                 f"in {corpus_dir}.")
+    else:
+        log.info(f"语料分析完成：共 {summary['videos']} 个视频，{summary['reply']} 条评论，{summary['danmu']} 条弹幕，"
+                 f"每分钟 {summary['danmu_per_minute']:.2f} 条弹幕。结果保存在 {corpus_dir} 。")
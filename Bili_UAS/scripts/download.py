@@ -0,0 +1,253 @@
+"""
+Bili_UAS.scripts.download
+
+This module provides a persistent download queue for downloading many videos in one run.
+"""
+
+
+# queue file path: video_output/.download_queue.json
+# queue file content format: {bvid: {"mode": mode, "status": status, "attempts": attempts, "error": error}}
+
+
+from __future__ import annotations
+from Bili_UAS.utils import video_utils as uvu
+from Bili_UAS.utils.rate_utils import TokenBucket
+from Bili_UAS.utils.cache_utils import BiliApiCache
+from Bili_UAS.utils.config_utils import load_language_from_txt
+from Bili_UAS.writer import log_writer as wlw
+from bilibili_api import Credential
+from typing import Optional
+import asyncio
+import enum
+import json
+import os
+
+
+language: str = load_language_from_txt()
+
+
+class DownloadJobStatus(enum.Enum):
+    """
+    Download Job Status Enumeration Class
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class DownloadQueue(object):
+    """
+    Download queue persisted to the video output directory, so that an interrupted batch can be resumed.
+    """
+
+    def __init__(self, work_dir: str) -> None:
+        """
+        Args:
+            work_dir: working directory
+        """
+        self.queue_file: str = os.path.join(work_dir, "video_output", ".download_queue.json")
+        self.jobs: dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Load the queue from file. Failed jobs of the previous run are retried.
+        """
+        if os.path.exists(self.queue_file):
+            with open(self.queue_file, "r") as f:
+                self.jobs = json.load(f)
+        for job in self.jobs.values():
+            if job['status'] == DownloadJobStatus.FAILED.value:
+                job['status'] = DownloadJobStatus.PENDING.value
+                job['attempts'] = 0
+
+    def save(self) -> None:
+        """
+        Save the queue to file. The file is replaced atomically, so an interrupted save does not lose the queue.
+        """
+        temp_file: str = self.queue_file + ".temp"
+        with open(temp_file, "w") as f:
+            json.dump(self.jobs, f, indent=1)
+        os.replace(temp_file, self.queue_file)
+
+    def add(self, bvid_list: list[str], mode: uvu.VideoDownloadMode) -> None:
+        """
+        Add videos to the queue. Videos already downloaded in the same mode are not added again.
+
+        Args:
+            bvid_list: bvid of videos
+            mode: download mode
+        """
+        for bvid in bvid_list:
+            job: Optional[dict] = self.jobs.get(bvid)
+            if job is not None and job['mode'] == mode.value and job['status'] == DownloadJobStatus.DONE.value:
+                continue
+            self.jobs[bvid] = {"mode": mode.value, "status": DownloadJobStatus.PENDING.value, "attempts": 0,
+                               "error": ""}
+        self.save()
+
+    def pending(self) -> list[str]:
+        """
+        Get the videos waiting to be downloaded.
+
+        Returns:
+            bvid of pending videos
+        """
+        return [bvid for bvid, job in self.jobs.items() if job['status'] == DownloadJobStatus.PENDING.value]
+
+    def set_status(self, bvid: str, status: DownloadJobStatus, error: str = "") -> None:
+        """
+        Update the status of a job and save the queue.
+
+        Args:
+            bvid: bvid of video
+            status: new status
+            error: error message of the last attempt
+        """
+        self.jobs[bvid]['status'] = status.value
+        self.jobs[bvid]['error'] = error
+        self.save()
+
+
+async def batch_download(bvid_list: list[str],
+                         mode: uvu.VideoDownloadMode,
+                         parallel_video: int,
+                         parallel: int,
+                         connections: int,
+                         bandwidth: float,
+                         max_retry: int,
+                         retry_after: float,
+                         credential: Optional[Credential],
+                         log_file: str,
+                         work_dir: str,
+                         cache: Optional[BiliApiCache] = None) -> None:
+    """
+    Download many videos through the persistent download queue. Videos left in the queue by an interrupted run are
+    downloaded as well.
+
+    Args:
+        bvid_list: bvid of videos to add to the queue
+        mode: download mode
+        parallel_video: the maximum number of videos downloaded at the same time
+        parallel: the maximum number of sub videos of a video downloaded at the same time
+        connections: the maximum number of open download connections in total
+        bandwidth: the total download bandwidth, unit: KB/s, 0 for unlimited
+        max_retry: the maximum number of attempts for a video
+        retry_after: base waiting time before retrying a failed video, doubled after each failure, unit: second
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+    """
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING", "ERROR")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+
+    download_queue: DownloadQueue = DownloadQueue(work_dir)
+    download_queue.add(bvid_list, mode)
+    pending: list[str] = download_queue.pending()
+    if not pending:
+        if language == "en":
+            log.warning("There is no video waiting to be downloaded!")
+        else:
+            log.warning("没有等待下载的视频！")
+        return
+    if language == "en":
+        log.info(f"A total of {len(pending)} videos are waiting to be downloaded.")
+    else:
+        log.info(f"共有 {len(pending)} 个视频等待下载。")
+
+    bandwidth_limiter: Optional[TokenBucket] = TokenBucket(bandwidth * 1024) if bandwidth > 0 else None
+    connection_semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, connections))
+    transcoders: asyncio.Semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    job_queue: asyncio.Queue = asyncio.Queue()
+    retry_tasks: set[asyncio.Task] = set()
+    for bvid in pending:
+        job_queue.put_nowait(bvid)
+
+    async def __retry_later(bvid: str, delay: float) -> None:
+        """
+        Put a failed video back into the queue after waiting.
+
+        Args:
+            bvid: bvid of video
+            delay: waiting time, unit: second
+        """
+        await asyncio.sleep(delay)
+        await job_queue.put(bvid)
+        job_queue.task_done()
+
+    async def __worker() -> None:
+        """
+        Take videos from the queue and download them until the queue is closed.
+        """
+        while True:
+            bvid: Optional[str] = await job_queue.get()
+            if bvid is None:
+                job_queue.task_done()
+                return
+            job: dict = download_queue.jobs[bvid]
+            job['attempts'] += 1
+            try:
+                video = uvu.BiliVideo(log=log_file, bvid=bvid, credential=credential, work_dir=work_dir,
+                                      cache=cache)
+                await video.init_all()
+                # jobs left by an earlier run keep the mode they were queued with
+                success: bool = await video.download(uvu.VideoDownloadMode(job['mode']), parallel,
+                                                     bandwidth_limiter, connection_semaphore, transcoders)
+                error: str = "" if success else "some sub videos failed"
+            except Exception as e:
+                success = False
+                error = f"{type(e).__name__}: {e}"
+
+            if success:
+                download_queue.set_status(bvid, DownloadJobStatus.DONE)
+                job_queue.task_done()
+            elif job['attempts'] < max_retry:
+                download_queue.set_status(bvid, DownloadJobStatus.PENDING, error)
+                delay: float = retry_after * 2 ** (job['attempts'] - 1)
+                if language == "en":
+                    log.warning(f"{bvid} download failed ({error}), retry after {delay} seconds.")
+                else:
+                    log.warning(f"{bvid} 下载失败（{error}），{delay} 秒后重试。")
+                retry_task: asyncio.Task = asyncio.create_task(__retry_later(bvid, delay))
+                retry_tasks.add(retry_task)
+                retry_task.add_done_callback(retry_tasks.discard)
+            else:
+                download_queue.set_status(bvid, DownloadJobStatus.FAILED, error)
+                if language == "en":
+                    log.error(f"{bvid} download failed after {job['attempts']} attempts: {error}")
+                else:
+                    log.error(f"{bvid} 在尝试 {job['attempts']} 次后下载失败：{error}")
+                job_queue.task_done()
+
+    workers: list[asyncio.Task] = [asyncio.create_task(__worker()) for _ in range(max(1, parallel_video))]
+    try:
+        await job_queue.join()
+    finally:
+        for retry_task in list(retry_tasks):
+            retry_task.cancel()
+    for _ in workers:
+        job_queue.put_nowait(None)
+    await asyncio.gather(*workers)
+
+    done: int = sum(1 for bvid in pending if download_queue.jobs[bvid]['status'] == DownloadJobStatus.DONE.value)
+    if done == len(pending):
+        if language == "en":
+            log.info(f"Batch download completed, {done} videos downloaded.")
+        else:
+            log.info(f"批量下载完成，共下载 {done} 个视频。")
+    else:
+        if language == "en":
+            log.warning(f"Batch download completed, but only {done} / {len(pending)} videos were downloaded. Failed "
+                        f"videos are recorded in {download_queue.queue_file} and will be retried in the next run.")
+        else:
+            log.warning(f"批量下载完成，但只下载了 {done} / {len(pending)} 个视频。失败的视频记录在 "
+                        f"{download_queue.queue_file} 中，将在下次运行时重试。")
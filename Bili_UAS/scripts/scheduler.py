@@ -0,0 +1,281 @@
+"""
+Bili_UAS.scripts.scheduler
+
+This module provides the periodic collection jobs and the scheduler running them in one long-lived process.
+"""
+
+
+# video statistics path: video_output/video_stats.csv
+# video statistics content format: {time},{bvid},{view},{like},{coin},{favorite},{share},{reply},{danmu}
+# live status path: live_output/live_status.csv
+# live status content format: {time},{room_id},{live_status}, live_status: 0 for offline, 1 for live, 2 for rotation
+
+
+from __future__ import annotations
+from Bili_UAS.utils.rate_utils import TokenBucket
+from Bili_UAS.utils.cache_utils import BiliApiCache, cached_call
+from Bili_UAS.utils.config_utils import load_language_from_txt
+from Bili_UAS.writer import log_writer as wlw
+from Bili_UAS.scripts import track as st
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from bilibili_api import Credential, live as bal, video as bav
+from typing import Callable, Coroutine, Optional
+import pandas as pd
+import asyncio
+import datetime
+import os
+import time
+
+
+language: str = load_language_from_txt()
+video_stats_columns: list[str] = ["query_time", "bvid", "view", "like", "coin", "favorite", "share", "reply", "danmu"]
+live_status_columns: list[str] = ["query_time", "room_id", "live_status"]
+
+
+def _set_log(log_file: str) -> wlw.Logger:
+    """
+    Set up logs.
+
+    Args:
+        log_file: the log file
+
+    Returns:
+        the logger
+    """
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING", "ERROR")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+    return log
+
+
+def _append_csv(table: pd.DataFrame, file: str) -> None:
+    """
+    Append rows to a csv file, writing the header if the file is new.
+
+    Args:
+        table: the rows
+        file: the csv file
+    """
+    if table.empty:
+        return
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    table.to_csv(file, mode="a", header=not os.path.exists(file), index=False)
+
+
+async def video_stat_snapshot(bvid_list: list[str],
+                              limiter: TokenBucket,
+                              credential: Optional[Credential],
+                              log_file: str,
+                              work_dir: str,
+                              cache: Optional[BiliApiCache] = None) -> None:
+    """
+    Record the current statistics of videos, one row per video. The statistics are always fetched from the API, and
+    the fresh responses are written to the cache for other commands.
+
+    Args:
+        bvid_list: bvid of videos
+        limiter: request rate limiter
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+    """
+    log: wlw.Logger = _set_log(log_file)
+    query_time: str = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime())
+
+    async def __snapshot(bvid: str) -> Optional[list]:
+        """
+        Obtain the statistics of a video.
+
+        Args:
+            bvid: bvid of video
+
+        Returns:
+            a row of the statistics file, None if failed
+        """
+        try:
+            video_info, _ = await cached_call(cache, "video.get_info", {"bvid": bvid},
+                                              bav.Video(bvid=bvid, credential=credential).get_info, limiter=limiter,
+                                              refresh=True)
+        except Exception as e:
+            if language == "en":
+                log.warning(f"Failed to get the statistics of {bvid}: {type(e).__name__}: {e}")
+            else:
+                log.warning(f"获取 {bvid} 的统计数据失败：{type(e).__name__}：{e}")
+            return None
+        stat: dict = video_info['stat']
+        return [query_time, bvid, stat['view'], stat['like'], stat['coin'], stat['favorite'], stat['share'],
+                stat['reply'], stat['danmaku']]
+
+    rows: list[Optional[list]] = await asyncio.gather(*[__snapshot(bvid) for bvid in bvid_list])
+    _append_csv(pd.DataFrame([row for row in rows if row is not None], columns=video_stats_columns),
+                os.path.join(work_dir, "video_output", "video_stats.csv"))
+
+
+async def live_status_check(room_list: list[int],
+                            last_status: dict[int, int],
+                            limiter: TokenBucket,
+                            credential: Optional[Credential],
+                            log_file: str,
+                            work_dir: str) -> None:
+    """
+    Record the live status of live rooms, and log the rooms that started or ended live-streaming since the last check.
+
+    Args:
+        room_list: live room IDs
+        last_status: live status of the last check, updated in place
+        limiter: request rate limiter
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+    """
+    log: wlw.Logger = _set_log(log_file)
+    query_time: str = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime())
+
+    async def __check(room_id: int) -> Optional[list]:
+        """
+        Obtain the live status of a live room.
+
+        Args:
+            room_id: live room ID
+
+        Returns:
+            a row of the live status file, None if failed
+        """
+        try:
+            await limiter.acquire()
+            play_info: dict = await bal.LiveRoom(room_id, credential).get_room_play_info()
+        except Exception as e:
+            if language == "en":
+                log.warning(f"Failed to get the live status of {room_id}: {type(e).__name__}: {e}")
+            else:
+                log.warning(f"获取直播间 {room_id} 的直播状态失败：{type(e).__name__}：{e}")
+            return None
+        status: int = play_info['live_status']
+        if room_id in last_status and (status == 1) != (last_status[room_id] == 1):
+            if status == 1:
+                if language == "en":
+                    log.info(f"Live room {room_id} started live-streaming.")
+                else:
+                    log.info(f"直播间 {room_id} 开播了。")
+            else:
+                if language == "en":
+                    log.info(f"Live room {room_id} ended live-streaming.")
+                else:
+                    log.info(f"直播间 {room_id} 下播了。")
+        last_status[room_id] = status
+        return [query_time, room_id, status]
+
+    rows: list[Optional[list]] = await asyncio.gather(*[__check(room_id) for room_id in room_list])
+    _append_csv(pd.DataFrame([row for row in rows if row is not None], columns=live_status_columns),
+                os.path.join(work_dir, "live_output", "live_status.csv"))
+
+
+async def run_scheduler(uid_list: list[int],
+                        user_interval: float,
+                        bvid_list: list[str],
+                        video_interval: float,
+                        room_list: list[int],
+                        live_interval: float,
+                        jitter: float,
+                        max_jobs: int,
+                        parallel: int,
+                        rate: float,
+                        credential: Optional[Credential],
+                        log_file: str,
+                        work_dir: str,
+                        cache: Optional[BiliApiCache] = None) -> None:
+    """
+    Run the collection jobs periodically until interrupted. All jobs run in this process and share the rate limiter,
+    the API cache and the HTTP session. A run missed while the previous one is still running is merged into one run.
+
+    Args:
+        uid_list: users whose number of fans, guards and charging members are updated
+        user_interval: interval of updating users, unit: minute
+        bvid_list: videos whose statistics are recorded
+        video_interval: interval of recording video statistics, unit: minute
+        room_list: live rooms whose live status is checked
+        live_interval: interval of checking live status, unit: minute
+        jitter: maximum random delay added to every run, unit: second
+        max_jobs: the maximum number of jobs running at the same time
+        parallel: the maximum number of users updated at the same time in a run
+        rate: the maximum number of API requests per second in total
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+    """
+    log: wlw.Logger = _set_log(log_file)
+    limiter: TokenBucket = TokenBucket(rate)
+    job_semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, max_jobs))
+    last_status: dict[int, int] = {}
+
+    def __guarded(name: str, job: Callable[[], Coroutine]) -> Callable[[], Coroutine]:
+        """
+        Wrap a job so that it waits for a free slot and never stops the scheduler when it fails.
+
+        Args:
+            name: name of the job
+            job: the job
+
+        Returns:
+            the wrapped job
+        """
+        async def __run() -> None:
+            """
+            Run the job.
+            """
+            async with job_semaphore:
+                try:
+                    await job()
+                except Exception as e:
+                    if language == "en":
+                        log.error(f"Job {name} failed: {type(e).__name__}: {e}")
+                    else:
+                        log.error(f"任务 {name} 失败：{type(e).__name__}：{e}")
+        return __run
+
+    jobs: list[tuple[str, float, Callable[[], Coroutine]]] = []
+    if uid_list:
+        jobs.append(("user", user_interval,
+                     lambda: st.batch_update(uid_list, parallel, rate, True, True, credential, log_file, work_dir,
+                                             cache, limiter)))
+    if bvid_list:
+        jobs.append(("video", video_interval,
+                     lambda: video_stat_snapshot(bvid_list, limiter, credential, log_file, work_dir, cache)))
+    if room_list:
+        jobs.append(("live", live_interval,
+                     lambda: live_status_check(room_list, last_status, limiter, credential, log_file, work_dir)))
+    if not jobs:
+        if language == "en":
+            log.warning("There is no job to schedule!")
+        else:
+            log.warning("没有需要调度的任务！")
+        return
+
+    scheduler: AsyncIOScheduler = AsyncIOScheduler()
+    for name, interval, job in jobs:
+        scheduler.add_job(__guarded(name, job), IntervalTrigger(minutes=interval, jitter=jitter or None), id=name,
+                          coalesce=True, max_instances=1, misfire_grace_time=max(1, int(interval * 60)),
+                          next_run_time=datetime.datetime.now())
+        if language == "en":
+            log.info(f"Job {name} scheduled every {interval} minutes.")
+        else:
+            log.info(f"任务 {name} 已设置，每 {interval} 分钟运行一次。")
+    scheduler.start()
+    if language == "en":
+        log.warning("Scheduler started. To exit the program, please use ctrl + c.")
+    else:
+        log.warning("调度器已启动，要退出程序，请使用ctrl + c。")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        scheduler.shutdown(wait=False)
@@ -0,0 +1,231 @@
+"""
+Bili_UAS.scripts.track
+
+This module provides the batch update of the number of fans, guards and charging members of many users.
+"""
+
+
+# metrics file path: user_output/batch_metrics.csv
+# metrics file content format: {time},{uid},{fans_num},{guard_num},{governor_num},{supervisor_num},{captain_num},
+#                              {charge_num}, empty for a value failed to get
+# the values are also appended to the time series of every user, see user_utils
+
+
+from __future__ import annotations
+from Bili_UAS.utils import user_utils as uuu
+from Bili_UAS.utils.rate_utils import TokenBucket
+from Bili_UAS.utils.cache_utils import BiliApiCache
+from Bili_UAS.utils.config_utils import load_language_from_txt
+from Bili_UAS.writer import log_writer as wlw, abnormal_monitor as wam
+from bilibili_api import Credential
+from typing import Optional
+import pandas as pd
+import asyncio
+import os
+import time
+
+
+language: str = load_language_from_txt()
+metrics_columns: list[str] = ["query_time", "uid", "fans_num", "guard_num", "governor_num", "supervisor_num",
+                              "captain_num", "charge_num"]
+
+
+def load_uid_file(uid_file: str) -> list[int]:
+    """
+    Load user IDs from a text file, one uid per line.
+
+    Args:
+        uid_file: the uid file
+
+    Returns:
+        user IDs
+    """
+    if not os.path.exists(uid_file):
+        if language == "en":
+            raise wam.FileMissError(f"uid file {uid_file} not found!")
+        else:
+            raise wam.FileMissError(f"未找到uid文件 {uid_file} ！")
+    uid_list: list[int] = []
+    with open(uid_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not line.isdigit():
+                if language == "en":
+                    raise wam.ParameterInputError(f"uid must be a number, got {line}!")
+                else:
+                    raise wam.ParameterInputError(f"uid必须为数字，输入为 {line} ！")
+            uid_list.append(int(line))
+    return uid_list
+
+
+async def _user_metrics(user: uuu.BiliUser, guard: bool, charge: bool) -> tuple[dict, list[str]]:
+    """
+    Obtain the number of fans, guards and charging members of a user concurrently.
+
+    Args:
+        user: the user
+        guard: whether to get the number of guards
+        charge: whether to get the number of charging members
+
+    Returns:
+        metrics of the user without the failed ones, and the errors
+    """
+    async def __guard_metrics() -> dict:
+        """
+        Obtain the number of guards of every level.
+
+        Returns:
+            the number of guards, empty if the user has not opened a live streaming room
+        """
+        if await user.get_room_id() is None:
+            return {}
+        roster: pd.DataFrame = await user.get_guard_roster(refresh=True)
+        guard_num, governor_num, supervisor_num, captain_num = uuu.count_guard_levels(roster)
+        return {"guard_num": guard_num, "governor_num": governor_num, "supervisor_num": supervisor_num,
+                "captain_num": captain_num}
+
+    async def __fans_metrics() -> dict:
+        """
+        Obtain the number of fans.
+
+        Returns:
+            the number of fans
+        """
+        return {"fans_num": await user.get_fans_number()}
+
+    async def __charge_metrics() -> dict:
+        """
+        Obtain the number of charging members.
+
+        Returns:
+            the number of charging members
+        """
+        return {"charge_num": await user.get_charge_number()}
+
+    jobs: list = [__fans_metrics()]
+    if guard:
+        jobs.append(__guard_metrics())
+    if charge:
+        jobs.append(__charge_metrics())
+    metrics: dict = {}
+    errors: list[str] = []
+    for result in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(result, Exception):
+            errors.append(f"{type(result).__name__}: {result}")
+        else:
+            metrics.update(result)
+    return metrics, errors
+
+
+async def batch_update(uid_list: list[int],
+                       parallel: int,
+                       rate: float,
+                       guard: bool,
+                       charge: bool,
+                       credential: Optional[Credential],
+                       log_file: str,
+                       work_dir: str,
+                       cache: Optional[BiliApiCache] = None,
+                       limiter: Optional[TokenBucket] = None) -> None:
+    """
+    Update the number of fans, guards and charging members of many users in one sweep, appending one row per user to
+    the metrics file.
+
+    Args:
+        uid_list: user IDs
+        parallel: the maximum number of users updated at the same time
+        rate: the maximum number of API requests per second in total
+        guard: whether to update the number of guards
+        charge: whether to update the number of charging members
+        credential: logon credentials
+        log_file: the log file
+        work_dir: working directory
+        cache: API response cache, None for not using the cache
+        limiter: request rate limiter shared with other jobs, None for a new limiter of the given rate
+    """
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING", "ERROR")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+
+    uid_list = list(dict.fromkeys(uid_list))
+    if not uid_list:
+        if language == "en":
+            log.warning("There is no user to update!")
+        else:
+            log.warning("没有需要更新的用户！")
+        return
+    if language == "en":
+        log.info(f"Start updating {len(uid_list)} users...")
+    else:
+        log.info(f"开始更新 {len(uid_list)} 个用户...")
+
+    start_time: float = time.monotonic()
+    now_time: int = int(time.time())
+    query_time: str = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now_time))
+    if limiter is None:
+        limiter = TokenBucket(rate)
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+    failed: list[int] = []
+
+    async def __update(uid: int) -> dict:
+        """
+        Update a user.
+
+        Args:
+            uid: user ID
+
+        Returns:
+            a row of the metrics file
+        """
+        async with semaphore:
+            user = uuu.BiliUser(uid, log=log_file, work_dir=work_dir, credential=credential, cache=cache,
+                                limiter=limiter)
+            metrics, errors = await _user_metrics(user, guard, charge)
+        if "fans_num" in metrics:
+            user.get_series("fans").append([now_time], {"fans_num": [metrics['fans_num']]})
+        if "guard_num" in metrics:
+            user.get_series("guard").append([now_time], {"total_num": [metrics['guard_num']],
+                                                         "governor_num": [metrics['governor_num']],
+                                                         "supervisor_num": [metrics['supervisor_num']],
+                                                         "captain_num": [metrics['captain_num']]})
+        if "charge_num" in metrics:
+            user.get_series("charge").append([now_time], {"charge_num": [metrics['charge_num']]})
+        if errors:
+            failed.append(uid)
+            if language == "en":
+                log.warning(f"Failed to get some data of user {uid}: {'; '.join(errors)}")
+            else:
+                log.warning(f"获取用户 {uid} 的部分数据失败：{'；'.join(errors)}")
+        return {"query_time": query_time, "uid": uid, **metrics}
+
+    rows: list[dict] = await asyncio.gather(*[__update(uid) for uid in uid_list])
+    metrics_table: pd.DataFrame = pd.DataFrame(rows, columns=metrics_columns)
+    metrics_table[metrics_columns[2:]] = metrics_table[metrics_columns[2:]].astype("Int64")
+
+    user_output_dir: str = os.path.join(work_dir, "user_output")
+    os.makedirs(user_output_dir, exist_ok=True)
+    metrics_file: str = os.path.join(user_output_dir, "batch_metrics.csv")
+    metrics_table.to_csv(metrics_file, mode="a", header=not os.path.exists(metrics_file), index=False)
+
+    cost: float = time.monotonic() - start_time
+    if not failed:
+        if language == "en":
+            log.info(f"{len(uid_list)} users updated in {cost:.1f} seconds. Data are recorded in {metrics_file}.")
+        else:
+            log.info(f"{len(uid_list)} 个用户更新完成，用时 {cost:.1f} 秒。数据记录在 {metrics_file} 中。")
+    else:
+        if language == "en":
+            log.warning(f"{len(uid_list)} users updated in {cost:.1f} seconds, some data of {len(failed)} users "
+                        f"failed to get. Data are recorded in {metrics_file}.")
+        else:
+            log.warning(f"{len(uid_list)} 个用户更新完成，用时 {cost:.1f} 秒，其中 {len(failed)} 个用户的部分数据获取失败。"
+                        f"数据记录在 {metrics_file} 中。")
@@ -6,13 +6,12 @@ This module provides the function to obtain video data and generate word cloud i
 
 
 from __future__ import annotations
-from typing import Union
-import jieba
-import wordcloud
-import pandas as pd
-from Bili_UAS.utils import video_utils as uvu, live_utils as ulu
+from typing import AsyncIterator, Union, Optional
+from collections import Counter
+from Bili_UAS.utils import video_utils as uvu, word_utils as uwu
 from numpy import typing as npt
-from bilibili_api import Credential
+from bilibili_api import Credential, aid2bvid
+from Bili_UAS.utils.cache_utils import BiliApiCache
 from Bili_UAS.utils.config_utils import load_language_from_txt
 from Bili_UAS.writer import log_writer as wlw
 import enum
@@ -31,13 +30,26 @@ class WordCloudContent(enum.Enum):
     BOTH = 3
 
 
+word_freq_file: dict[WordCloudContent, str] = {
+    WordCloudContent.REPLY: "reply_word_freq.json",
+    WordCloudContent.DANMU: "danmu_word_freq.json",
+    WordCloudContent.BOTH: "reply_and_danmu_word_freq.json",
+}
+
+
 async def word_cloud(video_id: Union[str, int],
                      credential: Union[Credential, None],
                      mode: WordCloudContent,
                      sec: bool,
                      mask: npt.NDArray,
                      log_file: str,
-                     work_dir: str) -> None:
+                     work_dir: str,
+                     cache: Optional[BiliApiCache] = None,
+                     incremental: bool = False,
+                     processes: int = 0,
+                     token_cache: Optional[uwu.TokenCache] = None,
+                     word_filter: Optional[uwu.WordFilter] = None,
+                     renderer: Optional[uwu.WordCloudRenderer] = None) -> None:
     """
     Obtain word cloud images of video replies or danmu.
 
@@ -49,6 +61,12 @@ async def word_cloud(video_id: Union[str, int],
         mask: word cloud mask, filling the white pixel with word clouds
         log_file: the log file
         work_dir: working directory
+        cache: API response cache, None for not using the cache
+        incremental: whether to only synchronize new replies into the local reply store
+        processes: number of tokenization processes, 0 for the number of CPU cores
+        token_cache: word segmentation cache, None for an in-memory cache of this run
+        word_filter: word filter, None for only keeping Chinese words
+        renderer: word cloud renderer, None for rendering without the image cache
     """
     file_handler: wlw.Handler = wlw.Handler("file")
     file_handler.set_level("WARNING", "ERROR")
@@ -61,10 +79,13 @@ async def word_cloud(video_id: Union[str, int],
     log.add_config(file_handler)
     log.add_config(sys_handler)
 
+    if renderer is None:
+        renderer = uwu.WordCloudRenderer()
+
     if isinstance(video_id, int):
-        video = uvu.BiliVideo(log=log_file, aid=video_id, credential=credential, work_dir=work_dir)
+        video = uvu.BiliVideo(log=log_file, aid=video_id, credential=credential, work_dir=work_dir, cache=cache)
     else:
-        video = uvu.BiliVideo(log=log_file, bvid=video_id, credential=credential, work_dir=work_dir)
+        video = uvu.BiliVideo(log=log_file, bvid=video_id, credential=credential, work_dir=work_dir, cache=cache)
     await video.init_all()
 
     if language == "en":
@@ -85,21 +106,19 @@ async def word_cloud(video_id: Union[str, int],
             else:
                 return
 
-        reply_content: str = ""
-        await video.get_replies(sec=sec)
-        await video.reply_robust_process()
-        for elem in video.robust_replies:
-            reply_content += elem.content
-            reply_content += "。"
-
-        words: list[str] = jieba.lcut(reply_content)
-        word_freq = pd.Series(words).value_counts()
-        wf: dict[str, float] = word_freq.to_dict()
-        wf = await ulu.chinese_content_process(wf)
-        wc = wordcloud.WordCloud(font_path='PingFang.ttc', background_color='white', mask=mask, height=675, width=1080)
-        wc.generate_from_frequencies(wf)
-        image = wc.to_image()
-        image.save(save_path, quality=100)
+        if incremental:
+            await video.sync_replies(sec=sec)
+        else:
+            await video.get_replies(sec=sec)
+        await video.reply_robust_process(emotes=True)
+        if video.robust_reply_content is None:
+            return
+
+        wf: Counter = uwu.count_words_parallel(video.robust_reply_content, processes, token_cache=token_cache,
+                                               word_filter=word_filter)
+        uwu.save_word_freq(wf, os.path.join(video.work_dir, word_freq_file[mode]))
+        uwu.save_word_freq(Counter(video.reply_emotes.to_dict()), os.path.join(video.work_dir, "reply_emote_freq.json"))
+        renderer.render(wf, mask, save_path)
 
     elif mode == WordCloudContent.DANMU:
         save_path: str = os.path.join(video.work_dir, "danmu_word_cloud.png")
@@ -115,20 +134,12 @@ async def word_cloud(video_id: Union[str, int],
             else:
                 return
 
-        danmu_content: str = ""
         await video.get_danmu()
-        for elem in video.danmu:
-            danmu_content += elem.content
-            danmu_content += "。"
-
-        words: list[str] = jieba.lcut(danmu_content)
-        word_freq = pd.Series(words).value_counts()
-        wf: dict[str, float] = word_freq.to_dict()
-        wf = await ulu.chinese_content_process(wf)
-        wc = wordcloud.WordCloud(font_path='PingFang.ttc', background_color='white', mask=mask, height=675, width=1080)
-        wc.generate_from_frequencies(wf)
-        image = wc.to_image()
-        image.save(save_path, quality=100)
+
+        wf: Counter = uwu.count_words_parallel((elem.content for elem in video.danmu), processes,
+                                               token_cache=token_cache, word_filter=word_filter)
+        uwu.save_word_freq(wf, os.path.join(video.work_dir, word_freq_file[mode]))
+        renderer.render(wf, mask, save_path)
 
     else:
         save_path: str = os.path.join(video.work_dir, "reply_and_danmu_word_cloud.png")
@@ -144,25 +155,34 @@ async def word_cloud(video_id: Union[str, int],
             else:
                 return
 
-        content: str = ""
-        await video.get_replies(sec=sec)
-        await video.reply_robust_process()
-        await video.get_danmu()
-        for elem in video.robust_replies:
-            content += elem.content
-            content += "。"
-        for elem in video.danmu:
-            content += elem.content
-            content += "。"
-
-        words: list[str] = jieba.lcut(content)
-        word_freq = pd.Series(words).value_counts()
-        wf: dict[str, float] = word_freq.to_dict()
-        wf = await ulu.chinese_content_process(wf)
-        wc = wordcloud.WordCloud(font_path='PingFang.ttc', mask=mask, background_color='white', height=675, width=1080)
-        wc.generate_from_frequencies(wf)
-        image = wc.to_image()
-        image.save(save_path, quality=100)
+        async def __reply_pages() -> AsyncIterator[list[str]]:
+            """
+            Obtain cleaned replies page by page.
+
+            Yields:
+                cleaned content of a page of replies
+            """
+            if incremental:
+                await video.sync_replies(sec=sec)
+                yield [uvu.clean_reply_content(elem.content) for elem in video.replies]
+            else:
+                async for page_replies in video.iter_reply_pages(sec):
+                    yield [uvu.clean_reply_content(elem.content) for elem in page_replies]
+
+        async def __danmu_pages() -> AsyncIterator[list[str]]:
+            """
+            Obtain danmu sub video by sub video.
+
+            Yields:
+                content of the danmu of a sub video
+            """
+            async for page_danmu in video.iter_danmu_pages():
+                yield [elem.content for elem in page_danmu]
+
+        wf: Counter = await uwu.count_words_async(uwu.merge_pages(__reply_pages(), __danmu_pages()), processes,
+                                                  token_cache=token_cache, word_filter=word_filter)
+        uwu.save_word_freq(wf, os.path.join(video.work_dir, word_freq_file[mode]))
+        renderer.render(wf, mask, save_path)
 
     if language == "en":
         log.info(f"Word cloud image generated successfully! Saved in {save_path}.")
@@ -170,6 +190,82 @@ async def word_cloud(video_id: Union[str, int],
         log.info(f"词云图片生成成功！保存在 {save_path} 。")
 
 
+async def merge_word_cloud(video_id: list[str],
+                           live_dir: list[str],
+                           mode: WordCloudContent,
+                           mask: Optional[npt.NDArray],
+                           save_path: str,
+                           log_file: str,
+                           work_dir: str,
+                           word_filter: Optional[uwu.WordFilter] = None,
+                           renderer: Optional[uwu.WordCloudRenderer] = None) -> None:
+    """
+    Generate one word cloud image from the word frequency tables saved by earlier word cloud runs, without
+    obtaining or segmenting the messages again.
+
+    Args:
+        video_id: videos' aid or bvid
+        live_dir: output directories of live rooms or of single live-streamings, searched recursively
+        mode: which word frequency table of the videos to merge
+        mask: word cloud mask, filling the white pixel with word clouds
+        save_path: path of the merged image
+        log_file: the log file
+        work_dir: working directory
+        word_filter: word filter applied to the merged word frequency, None for not filtering again
+        renderer: word cloud renderer, None for rendering without the image cache
+    """
+    file_handler: wlw.Handler = wlw.Handler("file")
+    file_handler.set_level("WARNING", "ERROR")
+    file_handler.set_file(log_file)
+
+    sys_handler: wlw.Handler = wlw.Handler("sys")
+    sys_handler.set_level("INFO", "WARNING")
+
+    log: wlw.Logger = wlw.Logger()
+    log.add_config(file_handler)
+    log.add_config(sys_handler)
+
+    if renderer is None:
+        renderer = uwu.WordCloudRenderer()
+
+    freq_files: list[str] = []
+    for vid in video_id:
+        bvid: str = aid2bvid(int(vid)) if vid.isdigit() else vid
+        freq_file: str = os.path.join(work_dir, "video_output", bvid, word_freq_file[mode])
+        if os.path.exists(freq_file):
+            freq_files.append(freq_file)
+        else:
+            if language == "en":
+                log.warning(f"{freq_file} does not exist, please generate the word cloud of {bvid} first!")
+            else:
+                log.warning(f"{freq_file} 不存在，请先生成 {bvid} 的词云！")
+    for directory in live_dir:
+        live_freq_files: list[str] = uwu.find_word_freq_files(directory, "word_freq.json")
+        if not live_freq_files:
+            if language == "en":
+                log.warning(f"There is no word frequency table in {directory}, please process the live data first!")
+            else:
+                log.warning(f"{directory} 中没有词频表，请先处理直播数据！")
+        freq_files.extend(live_freq_files)
+
+    if not freq_files:
+        if language == "en":
+            log.warning("There is no word frequency table to merge!")
+        else:
+            log.warning("没有可合并的词频表！")
+        return
+
+    wf: Counter = uwu.merge_word_freq(freq_files)
+    if word_filter is not None:
+        wf = word_filter.apply(wf)
+    uwu.save_word_freq(wf, os.path.splitext(save_path)[0] + "_word_freq.json")
+    renderer.render(wf, mask, save_path)
+    if language == "en":
+        log.info(f"Merged {len(freq_files)} word frequency tables, word cloud image saved in {save_path}.")
+    else:
+        log.info(f"已合并 {len(freq_files)} 个词频表，词云图片保存在 {save_path} 。")
+
+
 # TODO: Effective Chinese sentiment analysis tool
 # def _sentiment_analysis() -> None:
 #     """
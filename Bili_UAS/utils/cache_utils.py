@@ -0,0 +1,242 @@
+"""
+Bili_UAS.utils.cache_utils
+
+This module provides an on-disk cache for bilibili_api responses, keyed by endpoint and parameters.
+"""
+
+
+# cache path template: {work_dir}/cache/api/{key[:2]}/{key}.pkl
+# cache file content: pickled {"time": write time, "endpoint": endpoint, "data": response}
+
+
+from __future__ import annotations
+from .config_utils import load_language_from_txt
+from .rate_utils import TokenBucket
+from Bili_UAS.writer import abnormal_monitor as wam
+from typing import Any, Awaitable, Callable, Optional
+import hashlib
+import json
+import os
+import pickle
+import time
+
+
+language: str = load_language_from_txt()
+
+# time to live of each endpoint, unit: second
+api_cache_ttl: dict[str, float] = {
+    "video.get_info": 10 * 60,
+    "video.get_stat": 10 * 60,
+    "video.get_pages": 24 * 60 * 60,
+    "video.get_tags": 24 * 60 * 60,
+    "video.get_danmakus": 60 * 60,
+    "comment.get_comments": 60 * 60,
+    "user.get_live_info": 24 * 60 * 60,
+    "user.get_videos": 60 * 60,
+    "live.get_dahanghai": 5 * 60,
+    "search.search_by_type": 60 * 60,
+}
+default_api_cache_ttl: float = 60 * 60
+default_api_cache_max_size: int = 512 * 1024 * 1024
+
+
+class BiliApiCache(object):
+    """
+    Content-addressed on-disk cache of API responses. Every endpoint has its own time to live, and the least recently
+    used entries are evicted when the cache exceeds its size limit.
+    """
+
+    def __init__(self,
+                 work_dir: str,
+                 max_size: int = default_api_cache_max_size,
+                 cache_only: bool = False,
+                 ttl: Optional[dict[str, float]] = None) -> None:
+        """
+        Args:
+            work_dir: working directory
+            max_size: the maximum size of the cache, unit: byte
+            cache_only: whether to work offline, only answering from the cache and ignoring the time to live
+            ttl: time to live of each endpoint, overrides the default values, unit: second
+        """
+        self.cache_dir: str = os.path.join(work_dir, "cache", "api")
+        self.max_size: int = max_size
+        self.cache_only: bool = cache_only
+        self.ttl: dict[str, float] = dict(api_cache_ttl)
+        if ttl is not None:
+            self.ttl.update(ttl)
+        self.size: Optional[int] = None
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def __key(endpoint: str, params: dict) -> str:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            endpoint: endpoint name
+            params: request parameters
+
+        Returns:
+            the cache key
+        """
+        raw: str = json.dumps([endpoint, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __path(self, key: str) -> str:
+        """
+        Get the cache file of a key.
+
+        Args:
+            key: the cache key
+
+        Returns:
+            the cache file path
+        """
+        return os.path.join(self.cache_dir, key[:2], key + ".pkl")
+
+    def __entries(self) -> list[tuple[float, int, str]]:
+        """
+        List all cache files.
+
+        Returns:
+            last access time, size and path of every cache file
+        """
+        entries: list[tuple[float, int, str]] = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path: str = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def get(self, endpoint: str, params: dict) -> tuple[bool, Any]:
+        """
+        Look up a response in the cache.
+
+        Args:
+            endpoint: endpoint name
+            params: request parameters
+
+        Returns:
+            whether the response is cached and still fresh, and the cached response
+        """
+        path: str = self.__path(self.__key(endpoint, params))
+        if not os.path.exists(path):
+            return False, None
+        try:
+            with open(path, "rb") as f:
+                entry: dict = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if not self.cache_only:
+            if time.time() - entry['time'] > self.ttl.get(endpoint, default_api_cache_ttl):
+                return False, None
+        os.utime(path)
+        return True, entry['data']
+
+    def put(self, endpoint: str, params: dict, data: Any) -> None:
+        """
+        Save a response to the cache and evict old entries if the cache is too large.
+
+        Args:
+            endpoint: endpoint name
+            params: request parameters
+            data: the response
+        """
+        path: str = self.__path(self.__key(endpoint, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old_size: int = os.path.getsize(path) if os.path.exists(path) else 0
+        temp_file: str = path + ".temp"
+        with open(temp_file, "wb") as f:
+            pickle.dump({"time": time.time(), "endpoint": endpoint, "data": data}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, path)
+
+        if self.size is None:
+            self.size = sum(entry[1] for entry in self.__entries())
+        else:
+            self.size += os.path.getsize(path) - old_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache takes up at most 90% of its size limit.
+        """
+        entries: list[tuple[float, int, str]] = sorted(self.__entries())
+        self.size = sum(entry[1] for entry in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_size * 0.9:
+                break
+            os.remove(path)
+            self.size -= size
+
+    def clean(self) -> None:
+        """
+        Remove all entries.
+        """
+        for _, _, path in self.__entries():
+            os.remove(path)
+        self.size = 0
+
+
+async def cached_call(cache: Optional[BiliApiCache],
+                      endpoint: str,
+                      params: dict,
+                      func: Callable[..., Awaitable[Any]],
+                      *args: Any,
+                      limiter: Optional[TokenBucket] = None,
+                      refresh: bool = False,
+                      **kwargs: Any) -> tuple[Any, bool]:
+    """
+    Call an API function through the cache.
+
+    Args:
+        cache: the cache, None for calling the API directly
+        endpoint: endpoint name, used for the cache key and the time to live
+        params: parameters identifying the request, used for the cache key
+        func: the API function
+        args: positional arguments of the API function
+        limiter: request rate limiter, only requests actually sent are limited, None for not limiting
+        refresh: whether to skip the cached response and call the API, the new response is still cached
+        kwargs: keyword arguments of the API function
+
+    Returns:
+        the response, and whether it was answered from the cache
+    """
+    if cache is None:
+        if limiter is not None:
+            await limiter.acquire()
+        return await func(*args, **kwargs), False
+    if not refresh:
+        hit, data = cache.get(endpoint, params)
+        if hit:
+            return data, True
+    if cache.cache_only:
+        if language == "en":
+            raise wam.CacheMissError(f"{endpoint} {params} is not in the cache, and the cache only mode is on!")
+        else:
+            raise wam.CacheMissError(f"{endpoint} {params} 不在缓存中，且已开启仅使用缓存模式！")
+    if limiter is not None:
+        await limiter.acquire()
+    data = await func(*args, **kwargs)
+    cache.put(endpoint, params, data)
+    return data, False
+
+
+def load_api_cache(work_dir: str, use_cache: bool, cache_only: bool) -> Optional[BiliApiCache]:
+    """
+    Create the API cache of the working directory according to the command line options.
+
+    Args:
+        work_dir: working directory
+        use_cache: whether to use the cache
+        cache_only: whether to work offline and only answer from the cache
+
+    Returns:
+        the cache, None if the cache is not used
+    """
+    if not use_cache and not cache_only:
+        return None
+    return BiliApiCache(work_dir, cache_only=cache_only)
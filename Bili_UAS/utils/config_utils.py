@@ -4,6 +4,7 @@ Bili_UAS.utils.config_utils
 
 
 from __future__ import annotations
+from typing import Optional
 import os
 from Bili_UAS.writer import abnormal_monitor as wam
 
@@ -107,6 +108,66 @@ async def load_danmu_mark_from_txt(hide: bool = False) -> list[str]:
         return mark
 
 
+def load_user_dict_path_from_txt(hide: bool = False) -> Optional[str]:
+    """
+    Load the path of the user dictionary for word segmentation.
+
+    Args:
+        hide: whether to hide the prompt
+
+    Returns:
+        the path of the user dictionary, None if not specified
+    """
+    user_dict_file: str = ".user_dict"
+    language: str = load_language_from_txt()
+    if not os.path.exists(user_dict_file):
+        return None
+    else:
+        with open(user_dict_file, "r") as f:
+            user_dict: str = f.readline().removesuffix("\n")
+        if not os.path.exists(user_dict):
+            if language == "en":
+                raise wam.FileMissError(f"User dictionary {user_dict} not found, please specify it again.")
+            else:
+                raise wam.FileMissError(f"未找到用户词典 {user_dict} ，请重新指定。")
+        if not hide:
+            if language == "en":
+                print("INFO: Historical user dictionary found, using historical user dictionary.")
+            else:
+                print("INFO: 找到历史用户词典, 使用历史用户词典.")
+        return user_dict
+
+
+def load_stopwords_path_from_txt(hide: bool = False) -> Optional[str]:
+    """
+    Load the path of the stopword file for word clouds.
+
+    Args:
+        hide: whether to hide the prompt
+
+    Returns:
+        the path of the stopword file, None if not specified
+    """
+    stopwords_file: str = ".stopwords"
+    language: str = load_language_from_txt()
+    if not os.path.exists(stopwords_file):
+        return None
+    else:
+        with open(stopwords_file, "r") as f:
+            stopwords: str = f.readline().removesuffix("\n")
+        if not os.path.exists(stopwords):
+            if language == "en":
+                raise wam.FileMissError(f"Stopword file {stopwords} not found, please specify it again.")
+            else:
+                raise wam.FileMissError(f"未找到停用词文件 {stopwords} ，请重新指定。")
+        if not hide:
+            if language == "en":
+                print("INFO: Historical stopword file found, using historical stopword file.")
+            else:
+                print("INFO: 找到历史停用词文件, 使用历史停用词文件.")
+        return stopwords
+
+
 def clean_config() -> None:
     """
     Clean the configuration.
@@ -115,6 +176,8 @@ def clean_config() -> None:
     ffmpeg: str = ".ffmpeg"
     mark: str = ".danmu_mark"
     language: str = ".language"
+    user_dict: str = ".user_dict"
+    stopwords: str = ".stopwords"
     if os.path.exists(work_dir):
         os.remove(work_dir)
     if os.path.exists(ffmpeg):
@@ -123,3 +186,7 @@ def clean_config() -> None:
         os.remove(mark)
     if os.path.exists(language):
         os.remove(language)
+    if os.path.exists(user_dict):
+        os.remove(user_dict)
+    if os.path.exists(stopwords):
+        os.remove(stopwords)
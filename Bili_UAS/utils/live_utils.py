@@ -14,6 +14,7 @@ from bilibili_api import live as bal, Credential
 from matplotlib import pyplot as plt
 from .utils import BiliLiveDanmu, BiliLiveGift, BiliLiveSC, BiliLiveGuard, BiliLiveRevenue
 from .config_utils import load_language_from_txt
+from .word_utils import count_words_parallel, save_word_freq, TokenCache, WordFilter, WordCloudRenderer
 from Bili_UAS.writer import log_writer as wlw
 import os
 import datetime
@@ -24,36 +25,13 @@ import numpy as np
 import scipy.interpolate as spi
 from typing import Optional
 from numpy import typing as npt
-import jieba
-import wordcloud
-import re
+from collections import Counter
 
 
 language: str = load_language_from_txt()
 danmu_warning_mark: list[str] = ["@", "。", "？", "！", "，", ".", "?", "!", ",", "[", "]"]
 
 
-async def chinese_content_process(content: dict[str, float]) -> dict[str, float]:
-    """
-    Process word cloud content, remove symbols, expressions, etc.
-
-    Args:
-        content: content of the word cloud
-
-    Returns:
-        processed content
-    """
-    simplified_chinese_pattern = re.compile(r'^[\u4E00-\u9FFF]+$')
-    traditional_chinese_pattern = re.compile(r'^[\u4E00-\u9FA5]+$')
-    processed_content: dict[str, float] = {}
-    for key, value in content.items():
-        if bool(simplified_chinese_pattern.match(key)):
-            processed_content[key] = value
-        elif bool(traditional_chinese_pattern.match(key)):
-            processed_content[key] = value
-    return processed_content
-
-
 async def is_string_in_file(target_string: str, file_path: str) -> bool:
     """
     Check if the string is in the file.
@@ -657,17 +635,25 @@ class LiveDanmuProcess(object):
     Process the danmu of the live room.
     """
 
-    def __init__(self, live_dir: str, log: wlw.Logger, log_file: str) -> None:
+    def __init__(self, live_dir: str, log: wlw.Logger, log_file: str,
+                 token_cache: Optional[TokenCache] = None, word_filter: Optional[WordFilter] = None,
+                 renderer: Optional[WordCloudRenderer] = None) -> None:
         """
         Args:
             live_dir: the directory of the live-streaming
             log: the logger
             log_file: the log file
+            token_cache: word segmentation cache, None for an in-memory cache of each word cloud
+            word_filter: word filter of the word cloud, None for only keeping Chinese words
+            renderer: word cloud renderer, None for rendering without the image cache
         """
         self.log: wlw.Logger = log
         self.log_file: str = log_file
         self.live_dir: str = live_dir
         self.start_time: int = 0
+        self.token_cache: Optional[TokenCache] = token_cache
+        self.word_filter: Optional[WordFilter] = word_filter
+        self.renderer: WordCloudRenderer = renderer if renderer is not None else WordCloudRenderer()
 
         self.danmu_excel_file: Optional[str] = None
         self.marked_danmu_file: Optional[str] = None
@@ -1050,20 +1036,11 @@ class LiveDanmuProcess(object):
                 self.log.info("Generating word cloud of complete danmu...")
             else:
                 self.log.info("正在生成完整弹幕词云...")
-            danmu_content: str = ""
-            for elem in self.danmu:
-                danmu_content += elem.content
-                danmu_content += "。"
-            words: list[str] = jieba.lcut(danmu_content)
-            word_freq = pd.Series(words).value_counts()
-            wf: dict[str, float] = word_freq.to_dict()
-            wf = await chinese_content_process(wf)
-            wc = wordcloud.WordCloud(font_path='PingFang.ttc', background_color='white', mask=mask, height=675,
-                                     width=1080)
-            wc.generate_from_frequencies(wf)
-            image = wc.to_image()
+            wf: Counter = count_words_parallel((elem.content for elem in self.danmu), token_cache=self.token_cache,
+                                               word_filter=self.word_filter)
+            save_word_freq(wf, os.path.join(self.output_dir, "word_freq.json"))
             save_path: str = os.path.join(self.output_dir, "complete_danmu_word_cloud.png")
-            image.save(save_path, quality=200)
+            self.renderer.render(wf, mask, save_path)
             if language == "en":
                 self.log.info(f"Word cloud image of complete danmu generation completed and saved as {save_path}.")
             else:
@@ -1629,14 +1606,21 @@ class BiliLiveProcess(object):
     Process the data of the live room.
     """
 
-    def __init__(self, work_dir: str, log: str) -> None:
+    def __init__(self, work_dir: str, log: str, token_cache: Optional[TokenCache] = None,
+                 word_filter: Optional[WordFilter] = None, renderer: Optional[WordCloudRenderer] = None) -> None:
         """
         Args:
             log: the log file path
             work_dir: the work directory
+            token_cache: word segmentation cache shared by all live directories
+            word_filter: word filter of the danmu word clouds
+            renderer: word cloud renderer of the danmu word clouds
         """
         self.work_dir: str = work_dir
         self.log_file: str = log
+        self.token_cache: Optional[TokenCache] = token_cache
+        self.word_filter: Optional[WordFilter] = word_filter
+        self.renderer: Optional[WordCloudRenderer] = renderer
 
         self.todo_txt_file: Optional[str] = None
         self.live_dir: list[str] = []
@@ -1716,7 +1700,9 @@ class BiliLiveProcess(object):
         """
         if self.live_dir:
             for live_dir in self.live_dir:
-                danmu_process: LiveDanmuProcess = LiveDanmuProcess(live_dir, self.log, self.log_file)
+                danmu_process: LiveDanmuProcess = LiveDanmuProcess(live_dir, self.log, self.log_file,
+                                                                     self.token_cache, self.word_filter,
+                                                                     self.renderer)
                 revenue_process: LiveRevenueProcess = LiveRevenueProcess(live_dir, self.log, self.log_file)
                 view_process: LiveViewProcess = LiveViewProcess(live_dir, self.log, self.log_file)
                 await danmu_process.load_all_data()
@@ -0,0 +1,47 @@
+"""
+Bili_UAS.utils.rate_utils
+
+This module provides the token bucket used to limit request rate and download bandwidth.
+"""
+
+
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket(object):
+    """
+    Token bucket limiter. Tokens are refilled continuously at a fixed rate, and a caller that takes more tokens than
+    currently available waits until the deficit is refilled.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        """
+        Args:
+            rate: number of tokens refilled per second, e.g. requests per second or bytes per second
+            capacity: maximum number of tokens stored, defaults to the rate (one second of burst)
+        """
+        self.rate: float = rate
+        self.capacity: float = capacity if capacity is not None else rate
+        self.tokens: float = self.capacity
+        self.update_time: float = time.monotonic()
+        self.lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Take tokens from the bucket, waiting if there are not enough.
+
+        Args:
+            amount: number of tokens to take
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            now: float = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.update_time) * self.rate)
+            self.update_time = now
+            self.tokens -= amount
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
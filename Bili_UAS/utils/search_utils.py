@@ -6,16 +6,24 @@ Bili_UAs.utils.search_utils
 from __future__ import annotations
 from bilibili_api import search as bas
 from Bili_UAS.writer import log_writer as lw
-import time
-from typing import Union
+from .cache_utils import BiliApiCache, cached_call
+import asyncio
+from typing import Union, Optional
 
 
 class BiliSearch(object):
     """
     Bilibili Search Class
     """
-    def __init__(self, keywords: list[str], log: str) -> None:
+    def __init__(self, keywords: list[str], log: str, cache: Optional[BiliApiCache] = None) -> None:
+        """
+        Args:
+            keywords: search keywords
+            log: log file path
+            cache: API response cache, None for not using the cache
+        """
         self.keywords: list[str] = keywords
+        self.cache: Optional[BiliApiCache] = cache
         self.log_file: str = log
         self.log: Union[lw.Logger, None] = None
         self.__set_log()
@@ -46,15 +54,19 @@ class BiliSearch(object):
             page: int = 1
             while True:
                 self.log.info(f"Searching for {keyword} on page {page}...")
-                search_result_data: dict = await bas.search_by_type(keyword, search_type=bas.SearchObjectType.VIDEO,
-                                                                    order_type=bas.OrderVideo.TOTALRANK, page=page)
+                search_result_data, cached = await cached_call(self.cache, "search.search_by_type",
+                                                               {"keyword": keyword, "page": page},
+                                                               bas.search_by_type, keyword,
+                                                               search_type=bas.SearchObjectType.VIDEO,
+                                                               order_type=bas.OrderVideo.TOTALRANK, page=page)
 
                 if search_result_data:
                     if search_result_data['result']:
                         search_result: list[dict] = search_result_data['result']
                         for video_result in search_result:
                             self.video_id.append(video_result['bvid'])
-                    time.sleep(0.2)
+                    if not cached:
+                        await asyncio.sleep(0.2)
 
                     if page < search_result_data['numPages']:
                         page += 1
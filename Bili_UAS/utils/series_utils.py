@@ -0,0 +1,216 @@
+"""
+Bili_UAS.utils.series_utils
+
+This module provides the TimeSeriesStore class, an append-only binary store of time series with fast time range
+queries.
+"""
+
+
+# store path template: {series_dir}/file_name: {columns.json, time.bin, {column}.bin}
+# columns.json content format: ["column", ...]
+# time.bin content format: int64 Unix timestamps in ascending order
+# {column}.bin content format: int64 values, one per timestamp
+
+
+from __future__ import annotations
+import numpy as np
+from numpy import typing as npt
+import pandas as pd
+import json
+import os
+import time
+from typing import Optional
+
+
+time_format: str = '%Y-%m-%d_%H-%M-%S'
+
+
+class TimeSeriesStore(object):
+    """
+    Append-only time series store. Timestamps and every column are kept in their own raw int64 file, so the files can
+    be memory-mapped and a time range is found by binary search.
+    """
+
+    def __init__(self, series_dir: str, columns: list[str]) -> None:
+        """
+        Args:
+            series_dir: directory of the store
+            columns: value columns, only used when the store is created
+        """
+        self.series_dir: str = series_dir
+        self.columns_file: str = os.path.join(series_dir, "columns.json")
+        if os.path.exists(self.columns_file):
+            with open(self.columns_file, "r") as f:
+                self.columns: list[str] = json.load(f)
+        else:
+            os.makedirs(series_dir, exist_ok=True)
+            self.columns = list(columns)
+            with open(self.columns_file, "w") as f:
+                json.dump(self.columns, f)
+        self.time_file: str = os.path.join(series_dir, "time.bin")
+        self.value_files: dict[str, str] = {column: os.path.join(series_dir, f"{column}.bin")
+                                            for column in self.columns}
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            the number of complete rows, a row partly written by an interrupted append is not counted
+        """
+        sizes: list[int] = [os.path.getsize(file) if os.path.exists(file) else 0
+                            for file in [self.time_file, *self.value_files.values()]]
+        return min(sizes) // 8
+
+    def __load(self, file: str, length: int) -> npt.NDArray[np.int64]:
+        """
+        Memory-map a file of the store.
+
+        Args:
+            file: the file
+            length: the number of rows
+
+        Returns:
+            the read-only array
+        """
+        if length == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.memmap(file, dtype=np.int64, mode="r", shape=(length,))
+
+    def append(self, times: npt.ArrayLike, values: dict[str, npt.ArrayLike]) -> int:
+        """
+        Append rows. Rows are sorted by time, and rows not later than the last stored row are dropped so that the store
+        stays in ascending order.
+
+        Args:
+            times: Unix timestamps
+            values: values of every column
+
+        Returns:
+            the number of rows appended
+        """
+        times = np.asarray(times, dtype=np.int64)
+        order: np.ndarray = np.argsort(times, kind="stable")
+        times = times[order]
+        length: int = len(self)
+        if length > 0:
+            last_time: int = int(self.__load(self.time_file, length)[-1])
+            keep: np.ndarray = times > last_time
+            times = times[keep]
+            order = order[keep]
+        if len(times) == 0:
+            return 0
+
+        for file in [self.time_file, *self.value_files.values()]:
+            if os.path.exists(file) and os.path.getsize(file) != length * 8:
+                with open(file, "r+b") as f:
+                    f.truncate(length * 8)
+        for column, file in self.value_files.items():
+            with open(file, "ab") as f:
+                f.write(np.asarray(values[column], dtype=np.int64)[order].tobytes())
+        with open(self.time_file, "ab") as f:
+            f.write(times.tobytes())
+        return len(times)
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None) -> dict[str, npt.NDArray[np.int64]]:
+        """
+        Obtain the rows in a time range by binary search.
+
+        Args:
+            start: start Unix timestamp, included, None for no limit
+            end: end Unix timestamp, excluded, None for no limit
+
+        Returns:
+            arrays time and every column, memory-mapped views of the store
+        """
+        length: int = len(self)
+        times: npt.NDArray[np.int64] = self.__load(self.time_file, length)
+        left: int = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        right: int = length if end is None else int(np.searchsorted(times, end, side="left"))
+        result: dict[str, npt.NDArray[np.int64]] = {"time": times[left:right]}
+        for column, file in self.value_files.items():
+            result[column] = self.__load(file, length)[left:right]
+        return result
+
+    def downsample(self, interval: int, start: Optional[int] = None, end: Optional[int] = None,
+                   how: str = "last") -> dict[str, npt.NDArray]:
+        """
+        Aggregate the rows in a time range into buckets of fixed length.
+
+        Args:
+            interval: bucket length, unit: second
+            start: start Unix timestamp, included, None for no limit
+            end: end Unix timestamp, excluded, None for no limit
+            how: aggregation of every bucket, one of "last", "first", "mean", "min" and "max"
+
+        Returns:
+            arrays time (start of every non-empty bucket) and every column
+        """
+        rows: dict[str, npt.NDArray[np.int64]] = self.query(start, end)
+        if len(rows['time']) == 0:
+            return rows
+        bucket: np.ndarray = rows['time'] // interval
+        bounds: np.ndarray = np.flatnonzero(np.diff(bucket)) + 1
+        first: np.ndarray = np.concatenate(([0], bounds))
+        result: dict[str, npt.NDArray] = {"time": bucket[first] * interval}
+        for column in self.columns:
+            data: np.ndarray = np.asarray(rows[column])
+            if how == "last":
+                result[column] = data[np.concatenate((bounds - 1, [len(data) - 1]))]
+            elif how == "first":
+                result[column] = data[first]
+            elif how == "mean":
+                result[column] = np.add.reduceat(data, first) / np.diff(np.concatenate((first, [len(data)])))
+            elif how == "min":
+                result[column] = np.minimum.reduceat(data, first)
+            elif how == "max":
+                result[column] = np.maximum.reduceat(data, first)
+            else:
+                raise ValueError(f"Unknown aggregation {how}!")
+        return result
+
+    def to_frame(self, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Obtain the rows in a time range as a table.
+
+        Args:
+            start: start Unix timestamp, included, None for no limit
+            end: end Unix timestamp, excluded, None for no limit
+
+        Returns:
+            the table with the columns time and every value column
+        """
+        return pd.DataFrame({key: np.array(value) for key, value in self.query(start, end).items()})
+
+
+def parse_time(text: npt.ArrayLike) -> npt.NDArray[np.int64]:
+    """
+    Convert local time strings in the format of the txt output files to Unix timestamps.
+
+    Args:
+        text: time strings, e.g. 2023-09-01_12-00-00
+
+    Returns:
+        Unix timestamps
+    """
+    return np.array([int(time.mktime(time.strptime(elem, time_format))) for elem in text], dtype=np.int64)
+
+
+def import_txt(txt_file: str, store: TimeSeriesStore) -> int:
+    """
+    Import an output txt file, whose first column is the query time and the other columns are the values in the order
+    of the store columns.
+
+    Args:
+        txt_file: the txt file
+        store: the store
+
+    Returns:
+        the number of rows imported
+    """
+    if not os.path.exists(txt_file):
+        return 0
+    table: pd.DataFrame = pd.read_csv(txt_file).dropna()
+    if table.empty:
+        return 0
+    values: dict[str, np.ndarray] = {column: table.iloc[:, i + 1].to_numpy(dtype=np.int64)
+                                     for i, column in enumerate(store.columns)}
+    return store.append(parse_time(table.iloc[:, 0].astype(str)), values)
@@ -0,0 +1,295 @@
+"""
+Bili_UAS.utils.train_utils
+
+This module provides the forecasting of user metric time series, e.g. the number of fans, guards and charging members.
+"""
+
+
+# model: value = intercept + slope * days + daily Fourier terms + weekly Fourier terms, fitted by iteratively
+#        reweighted least squares with the Huber loss, many series at a time
+# a seasonality is only fitted when the series spans more than one period and is sampled at enough phases of it, and
+# its orders are dropped until there are enough observations per parameter
+
+
+from __future__ import annotations
+import numpy as np
+from numpy import typing as npt
+from scipy import stats
+import time
+
+
+day_seconds: int = 24 * 60 * 60
+week_seconds: int = 7 * day_seconds
+min_observations: int = 3  # the trend needs one more observation than its two parameters to estimate the noise
+mad_efficiency: float = 0.37  # asymptotic efficiency of the median absolute deviation as a scale estimator
+
+
+def design_matrix(times: npt.NDArray[np.int64], last_time: npt.ArrayLike, daily: int,
+                  weekly: int) -> npt.NDArray[np.float64]:
+    """
+    Build the regression features of timestamps: intercept, trend in days relative to the last observation, and
+    Fourier terms of the local time of day and of week. Features only depend on the timestamps, so irregularly sampled
+    series need no resampling.
+
+    Args:
+        times: Unix timestamps, shape (..., n)
+        last_time: the last observed timestamp of every series, broadcast against times[..., :1]
+        daily: number of Fourier orders of the daily seasonality
+        weekly: number of Fourier orders of the weekly seasonality
+
+    Returns:
+        features, shape (..., n, 2 + 2 * daily + 2 * weekly)
+    """
+    local: np.ndarray = times + time.localtime().tm_gmtoff
+    features: list[np.ndarray] = [np.ones(times.shape), (times - np.asarray(last_time)) / day_seconds]
+    for period, orders in ((day_seconds, daily), (week_seconds, weekly)):
+        phase: np.ndarray = 2 * np.pi * (local % period) / period
+        for k in range(1, orders + 1):
+            features.append(np.sin(k * phase))
+            features.append(np.cos(k * phase))
+    return np.stack(features, axis=-1)
+
+
+def _phase_orders(phase_bins: npt.NDArray[np.int64], bins: int, orders: int) -> int:
+    """
+    Obtain the number of Fourier orders of a period that samples at the given phases can identify: k orders need
+    samples in 2k + 1 different bins, and no run of empty bins longer than 1 / (2k) of the period.
+
+    Args:
+        phase_bins: bin of the phase of every sample within the period
+        bins: number of bins of the period
+        orders: the maximum number of orders
+
+    Returns:
+        the number of identifiable orders
+    """
+    occupied: np.ndarray = np.zeros(bins, dtype=bool)
+    occupied[phase_bins] = True
+    longest_gap: int = 0
+    gap: int = 0
+    for elem in np.concatenate((occupied, occupied)):
+        gap = 0 if elem else gap + 1
+        longest_gap = max(longest_gap, gap)
+    result: int = 0
+    for k in range(1, orders + 1):
+        if occupied.sum() >= 2 * k + 1 and longest_gap * 2 * k < bins:
+            result = k
+    return result
+
+
+def seasonal_orders(times: npt.NDArray[np.int64], daily: int, weekly: int,
+                    min_ratio: float) -> tuple[int, int]:
+    """
+    Obtain the Fourier orders that the timestamps of a series can identify. A period is only fitted when the series
+    spans more than one period and its samples are spread over the period, see _phase_orders, e.g. samples taken once
+    a day at about the same time identify no daily seasonality. Then weekly orders and daily orders are dropped until
+    there are at least min_ratio observations per parameter.
+
+    Args:
+        times: Unix timestamps of the series
+        daily: the maximum number of Fourier orders of the daily seasonality
+        weekly: the maximum number of Fourier orders of the weekly seasonality
+        min_ratio: the minimum number of observations per parameter
+
+    Returns:
+        the number of daily orders and of weekly orders
+    """
+    local: np.ndarray = times + time.localtime().tm_gmtoff
+    span: int = int(times.max() - times.min())
+    daily_orders: int = 0
+    if span > day_seconds:
+        daily_orders = _phase_orders(local % day_seconds // (3 * 60 * 60), 8, daily)
+    weekly_orders: int = 0
+    if span > week_seconds:
+        weekly_orders = _phase_orders(local % week_seconds // day_seconds, 7, weekly)
+    while daily_orders + weekly_orders > 0 and len(times) < min_ratio * (2 + 2 * daily_orders + 2 * weekly_orders):
+        if weekly_orders > 0:
+            weekly_orders -= 1
+        else:
+            daily_orders -= 1
+    return daily_orders, weekly_orders
+
+
+def _masked_median(data: npt.NDArray[np.float64], mask: npt.NDArray[np.bool_]) -> npt.NDArray[np.float64]:
+    """
+    Compute the median of every row over the masked positions.
+
+    Args:
+        data: values, shape (b, n)
+        mask: whether every position is counted, shape (b, n), every row has at least one counted position
+
+    Returns:
+        medians, shape (b,)
+    """
+    ordered: np.ndarray = np.sort(np.where(mask, data, np.inf), axis=1)
+    count: np.ndarray = mask.sum(axis=1)
+    low: np.ndarray = np.take_along_axis(ordered, ((count - 1) // 2)[:, None], axis=1)[:, 0]
+    high: np.ndarray = np.take_along_axis(ordered, (count // 2)[:, None], axis=1)[:, 0]
+    return (low + high) / 2
+
+
+def _fit_chunk(times: npt.NDArray[np.int64], values: npt.NDArray[np.float64], mask: npt.NDArray[np.bool_],
+               columns: npt.NDArray[np.bool_], daily: int, weekly: int, delta: float, ridge: float,
+               iterations: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit padded series at once.
+
+    Args:
+        times: Unix timestamps, shape (b, n), padding is ignored
+        values: observed values, shape (b, n)
+        mask: whether every position is observed, shape (b, n), every row has more observations than used features
+        columns: whether every feature is used by every series, shape (b, p), unused features are zeroed
+        daily: number of Fourier orders of the daily seasonality
+        weekly: number of Fourier orders of the weekly seasonality
+        delta: threshold of the Huber loss, in units of the robust residual scale
+        ridge: penalty of the seasonal coefficients, relative to the number of observations
+        iterations: the maximum number of reweighting iterations
+
+    Returns:
+        the coefficients (b, p), the inverse normal matrices (b, p, p), the robust residual scales corrected for the
+        degrees of freedom (b,), the degrees of freedom (b,) and the last timestamps (b,)
+    """
+    last_time: np.ndarray = np.where(mask, times, np.iinfo(np.int64).min).max(axis=1)
+    features: np.ndarray = design_matrix(np.where(mask, times, last_time[:, None]), last_time[:, None], daily, weekly)
+    features *= columns[:, None, :]
+    p: int = features.shape[-1]
+    penalty: np.ndarray = np.full(p, ridge)
+    penalty[:2] = 1e-9
+    observed: np.ndarray = mask.astype(np.float64)
+    # zeroed features get a unit penalty, so their coefficients are exactly zero and the normal matrices invertible
+    penalty_matrix: np.ndarray = ((observed.sum(axis=1)[:, None] * np.where(columns, penalty, 1.0))[:, :, None]
+                                  * np.eye(p))
+
+    coef: np.ndarray = np.zeros((len(times), p))
+    scale: np.ndarray = np.ones(len(times))
+    weights: np.ndarray = observed.copy()
+    active: np.ndarray = np.arange(len(times))
+    for _ in range(iterations):
+        x: np.ndarray = features[active]
+        w: np.ndarray = weights[active]
+        normal: np.ndarray = x.transpose(0, 2, 1) @ (x * w[..., None]) + penalty_matrix[active]
+        target: np.ndarray = x.transpose(0, 2, 1) @ (w * values[active])[..., None]
+        coef[active] = np.linalg.solve(normal, target)[..., 0]
+        residual: np.ndarray = values[active] - (x @ coef[active][..., None])[..., 0]
+        scale[active] = np.maximum(1.4826 * _masked_median(np.abs(residual), mask[active]), 1e-9)
+        ratio: np.ndarray = np.abs(residual) / (delta * scale[active][:, None])
+        new_weights: np.ndarray = np.where(ratio <= 1, 1.0, 1.0 / np.maximum(ratio, 1e-12)) * observed[active]
+        change: np.ndarray = np.max(np.abs(new_weights - w), axis=1)
+        weights[active] = new_weights
+        active = active[change >= 1e-4]
+        if len(active) == 0:
+            break
+
+    normal = features.transpose(0, 2, 1) @ (features * weights[..., None]) + penalty_matrix
+    dof: np.ndarray = observed.sum(axis=1) - columns.sum(axis=1)
+    scale *= np.sqrt(observed.sum(axis=1) / dof)
+    return coef, np.linalg.inv(normal), scale, dof, last_time
+
+
+def fit_forecast(series: list[tuple[npt.ArrayLike, npt.ArrayLike]],
+                 horizon: float,
+                 step: float,
+                 level: float = 0.9,
+                 daily: int = 3,
+                 weekly: int = 3,
+                 delta: float = 1.345,
+                 ridge: float = 1e-3,
+                 iterations: int = 20,
+                 min_ratio: float = 3,
+                 chunk_size: int = 2 ** 22) -> list[dict[str, np.ndarray]]:
+    """
+    Fit the trend, daily and weekly seasonality of many series with the Huber loss and forecast them. Series are
+    padded to the same length and fitted in batches, so hundreds of series take one set of vectorized solves. Every
+    series only uses the seasonal orders its timestamps can identify, see seasonal_orders. The forecast interval uses
+    the residual scale corrected for the degrees of freedom, and the t distribution with the degrees of freedom
+    reduced by the efficiency of the median absolute deviation, so that short series get wide enough intervals.
+
+    Args:
+        series: (timestamps, values) of every series, timestamps are Unix timestamps in any order and spacing
+        horizon: how far to forecast after the last observation of every series, unit: second
+        step: spacing of forecast points, unit: second
+        level: probability covered by the forecast interval
+        daily: the maximum number of Fourier orders of the daily seasonality, 0 for none
+        weekly: the maximum number of Fourier orders of the weekly seasonality, 0 for none
+        delta: threshold of the Huber loss, in units of the robust residual scale
+        ridge: penalty of the seasonal coefficients, keeping them near zero when the series is too short to show them
+        iterations: the maximum number of reweighting iterations
+        min_ratio: the minimum number of observations per parameter, seasonal orders are dropped until it is met
+        chunk_size: the maximum number of feature values in a batch, bounding the memory
+
+    Returns:
+        for every series, arrays time, mean, lower and upper of the forecast, empty if the series has fewer than
+        min_observations observations
+    """
+    p: int = 2 + 2 * daily + 2 * weekly
+    future_offset: np.ndarray = np.arange(1, int(horizon // step) + 1, dtype=np.int64) * int(step)
+    prepared: list[tuple[np.ndarray, np.ndarray]] = []
+    for times, values in series:
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        keep: np.ndarray = np.isfinite(values)
+        prepared.append((times[keep], values[keep]))
+
+    results: list[dict[str, np.ndarray]] = [{"time": np.empty(0, dtype=np.int64), "mean": np.empty(0),
+                                             "lower": np.empty(0), "upper": np.empty(0)} for _ in prepared]
+    order: list[int] = sorted((i for i in range(len(prepared)) if len(prepared[i][0]) >= min_observations),
+                              key=lambda i: len(prepared[i][0]))
+    start: int = 0
+    while start < len(order):
+        length: int = len(prepared[order[start]][0])
+        end: int = start + 1
+        while end < len(order):
+            next_length: int = len(prepared[order[end]][0])
+            if (end - start + 1) * next_length * p > chunk_size:
+                break
+            length = next_length
+            end += 1
+        chunk: list[int] = order[start:end]
+        times_pad: np.ndarray = np.zeros((len(chunk), length), dtype=np.int64)
+        values_pad: np.ndarray = np.zeros((len(chunk), length))
+        mask: np.ndarray = np.zeros((len(chunk), length), dtype=bool)
+        columns: np.ndarray = np.ones((len(chunk), p), dtype=bool)
+        orders: np.ndarray = np.arange(1, max(daily, weekly) + 1).repeat(2)
+        for row, i in enumerate(chunk):
+            n: int = len(prepared[i][0])
+            times_pad[row, :n] = prepared[i][0]
+            values_pad[row, :n] = prepared[i][1]
+            mask[row, :n] = True
+            daily_orders, weekly_orders = seasonal_orders(prepared[i][0], daily, weekly, min_ratio)
+            columns[row, 2:2 + 2 * daily] = orders[:2 * daily] <= daily_orders
+            columns[row, 2 + 2 * daily:] = orders[:2 * weekly] <= weekly_orders
+
+        coef, inverse, scale, dof, last_time = _fit_chunk(times_pad, values_pad, mask, columns, daily, weekly, delta,
+                                                          ridge, iterations)
+        future: np.ndarray = last_time[:, None] + future_offset[None, :]
+        features: np.ndarray = design_matrix(future, last_time[:, None], daily, weekly) * columns[:, None, :]
+        mean: np.ndarray = np.einsum("bhp,bp->bh", features, coef)
+        leverage: np.ndarray = np.einsum("bhp,bpq,bhq->bh", features, inverse, features)
+        quantile: np.ndarray = stats.t.ppf(0.5 + level / 2, np.maximum(mad_efficiency * dof, 1))
+        width: np.ndarray = quantile[:, None] * scale[:, None] * np.sqrt(1 + np.maximum(leverage, 0))
+        for row, i in enumerate(chunk):
+            results[i] = {"time": future[row], "mean": mean[row], "lower": mean[row] - width[row],
+                          "upper": mean[row] + width[row]}
+        start = end
+    return results
+
+
+def forecast(times: npt.ArrayLike, values: npt.ArrayLike, horizon: float, step: float, level: float = 0.9,
+             daily: int = 3, weekly: int = 3) -> dict[str, np.ndarray]:
+    """
+    Forecast a single series, see fit_forecast.
+
+    Args:
+        times: Unix timestamps
+        values: observed values
+        horizon: how far to forecast after the last observation, unit: second
+        step: spacing of forecast points, unit: second
+        level: probability covered by the forecast interval
+        daily: the maximum number of Fourier orders of the daily seasonality, 0 for none
+        weekly: the maximum number of Fourier orders of the weekly seasonality, 0 for none
+
+    Returns:
+        arrays time, mean, lower and upper of the forecast, empty if there are fewer than min_observations
+        observations
+    """
+    return fit_forecast([(times, values)], horizon, step, level, daily, weekly)[0]
@@ -6,28 +6,55 @@ This module provides the BiliUser class, which is used to get user information a
 
 
 # data test_output path template: user_output/{user_id}/file_name: {fans_num.txt, guard_num.txt, charge_num.txt,
-#                                                             address.xlsx, address_unreceived.txt}
+#                                                             address.xlsx, address_unreceived.txt,
+#                                                             guard_change.txt, upload_videos.json}
 # fans_num.txt content format: {time},{fans_num}
 # guard_num.txt content format: {time},{guard_total_num},{governor_num},{supervisor_num},{captain_num}
+# guard_change.txt content format: {time},{uid},{username},{change},{old_level},{new_level}, change: join, leave,
+#                                  upgrade, downgrade or renew
+# address sent ledger path: user_output/{user_id}/address_sent/{campaign}.txt
+# address sent ledger content format: {uid},{time}
+# upload_videos.json content format: ["bvid", ...], newest first
+# time series path: user_output/{user_id}/series/{fans, guard, charge}/, see series_utils
+# forecast path: user_output/{user_id}/forecast_{fans, guard, charge}.{csv, png}
+# forecast csv content format: {time},{mean},{lower},{upper}
+# guard snapshot path: user_output/{user_id}/guard_snapshot/{time}.npz, arrays uid, username, guard_level and
+#                      accompany sorted by uid
 
 
 from __future__ import annotations
 import enum
-from bilibili_api import user as bau, live as bal, sync
+from bilibili_api import user as bau, live as bal
 from .config_utils import load_language_from_txt
+from .cache_utils import BiliApiCache, cached_call
+from .rate_utils import TokenBucket
+from .series_utils import TimeSeriesStore, import_txt
+from .train_utils import forecast, min_observations
+from matplotlib import pyplot as plt
 from Bili_UAS.writer import log_writer as wlw
 from bilibili_api import Credential, session
+import asyncio
+import json
 import os
 import time
 from bilibili_api.exceptions import (CredentialNoBiliJctException, CredentialNoSessdataException,
-                                     CredentialNoBuvid3Exception, CredentialNoDedeUserIDException)
+                                     CredentialNoBuvid3Exception, CredentialNoDedeUserIDException,
+                                     NetworkException, ResponseCodeException)
+import aiohttp
+import httpx
 import pandas as pd
 from pandas import DataFrame
-from typing import Union
-import pprint
+from typing import Union, Optional
+import numpy as np
 
 
 language: str = load_language_from_txt()
+guard_roster_columns: list[str] = ["uid", "username", "guard_level", "accompany"]
+# response codes of being intercepted (-412), overloaded (-509) and calling too frequently (-799)
+rate_limit_codes: tuple[int, ...] = (-412, -509, -799)
+user_series_columns: dict[str, list[str]] = {"fans": ["fans_num"],
+                                             "guard": ["total_num", "governor_num", "supervisor_num", "captain_num"],
+                                             "charge": ["charge_num"]}
 
 
 class AddressProcessType(enum.Enum):
@@ -38,6 +65,160 @@ class AddressProcessType(enum.Enum):
     RECEIVE = 2
 
 
+def save_guard_snapshot(roster: DataFrame, file: str) -> None:
+    """
+    Save a guard roster as a compressed snapshot of uid, username, guard level and accompany days, sorted by uid.
+
+    Args:
+        roster: the guard roster
+        file: the snapshot file
+    """
+    order: np.ndarray = np.argsort(roster['uid'].to_numpy(dtype=np.int64), kind="stable")
+    temp_file: str = file + ".temp"
+    with open(temp_file, "wb") as f:
+        np.savez_compressed(f,
+                            uid=roster['uid'].to_numpy(dtype=np.int64)[order],
+                            username=roster['username'].astype(str).to_numpy(dtype=str)[order],
+                            guard_level=roster['guard_level'].to_numpy(dtype=np.int8)[order],
+                            accompany=roster['accompany'].to_numpy(dtype=np.int32)[order])
+    os.replace(temp_file, file)
+
+
+def load_guard_snapshot(file: str) -> dict[str, np.ndarray]:
+    """
+    Load a guard snapshot.
+
+    Args:
+        file: the snapshot file
+
+    Returns:
+        arrays uid, username, guard_level and accompany, sorted by uid, username is empty for snapshots saved without
+        it
+    """
+    with np.load(file) as data:
+        snapshot: dict[str, np.ndarray] = {key: data[key] for key in ("uid", "guard_level", "accompany")}
+        if "username" in data.files:
+            snapshot['username'] = data['username']
+        else:
+            snapshot['username'] = np.full(len(snapshot['uid']), "")
+    return snapshot
+
+
+def find_guard_snapshots(snapshot_dir: str) -> list[str]:
+    """
+    Find all guard snapshots in a directory.
+
+    Args:
+        snapshot_dir: the snapshot directory
+
+    Returns:
+        snapshot files from the oldest to the newest
+    """
+    if not os.path.exists(snapshot_dir):
+        return []
+    return [os.path.join(snapshot_dir, file) for file in sorted(os.listdir(snapshot_dir)) if file.endswith(".npz")]
+
+
+def diff_guard_snapshot(old: dict[str, np.ndarray], new: dict[str, np.ndarray],
+                        interval: float) -> dict[str, np.ndarray]:
+    """
+    Compare two guard snapshots. A smaller guard level is a higher level, 1 for governor and 3 for captain. A guard
+    keeping the level has renewed if the accompany days grew more than the time between the snapshots.
+
+    Args:
+        old: the earlier snapshot
+        new: the later snapshot
+        interval: time between the snapshots, unit: second
+
+    Returns:
+        uid arrays of guards who joined, left, upgraded, downgraded and renewed
+    """
+    common, old_index, new_index = np.intersect1d(old['uid'], new['uid'], assume_unique=True, return_indices=True)
+    old_level: np.ndarray = old['guard_level'][old_index]
+    new_level: np.ndarray = new['guard_level'][new_index]
+    return {"join": np.setdiff1d(new['uid'], old['uid'], assume_unique=True),
+            "leave": np.setdiff1d(old['uid'], new['uid'], assume_unique=True),
+            "upgrade": common[new_level < old_level],
+            "downgrade": common[new_level > old_level],
+            "renew": common[(new_level == old_level)
+                            & (new['accompany'][new_index] - old['accompany'][old_index] > interval / (24 * 60 * 60))]}
+
+
+def guard_history(snapshot_dir: str, uid: int) -> DataFrame:
+    """
+    Obtain the guard level and accompany days of a user in every snapshot.
+
+    Args:
+        snapshot_dir: the snapshot directory
+        uid: user ID of the guard
+
+    Returns:
+        one row per snapshot with the columns time, guard_level and accompany, guard_level is 0 if the user was not a
+        guard at that time
+    """
+    rows: list[list] = []
+    for file in find_guard_snapshots(snapshot_dir):
+        snapshot: dict[str, np.ndarray] = load_guard_snapshot(file)
+        index: int = int(np.searchsorted(snapshot['uid'], uid))
+        if index < len(snapshot['uid']) and snapshot['uid'][index] == uid:
+            rows.append([os.path.basename(file)[:-4], int(snapshot['guard_level'][index]),
+                         int(snapshot['accompany'][index])])
+        else:
+            rows.append([os.path.basename(file)[:-4], 0, 0])
+    return pd.DataFrame(rows, columns=["time", "guard_level", "accompany"])
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """
+    Judge whether a failed request is worth retrying: network errors, timeouts, server errors and rate limits are,
+    while errors such as a blocked recipient or invalid credentials fail the same way every time.
+
+    Args:
+        error: the exception raised by the request
+
+    Returns:
+        whether the error is transient
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, aiohttp.ClientError, httpx.TransportError)):
+        return True
+    if isinstance(error, NetworkException):
+        return error.status in (408, 429) or error.status >= 500
+    if isinstance(error, ResponseCodeException):
+        return error.code in rate_limit_codes
+    return False
+
+
+def _parse_text_msg(content: str) -> Optional[str]:
+    """
+    Parse the text of a private message.
+
+    Args:
+        content: the content field of the message, a JSON string
+
+    Returns:
+        the text, None if the message is not a text message
+    """
+    try:
+        text = json.loads(content).get("content")
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return None
+    return text if isinstance(text, str) else None
+
+
+def count_guard_levels(roster: DataFrame) -> tuple[int, int, int, int]:
+    """
+    Count the guards of every level.
+
+    Args:
+        roster: the guard roster
+
+    Returns:
+        the number of all guards, governors, supervisors and captains
+    """
+    level_num: np.ndarray = np.bincount(roster['guard_level'].to_numpy(dtype=np.int64), minlength=4)
+    return len(roster), int(level_num[1]), int(level_num[2]), int(level_num[3])
+
+
 async def _address_msg_simple_check(msg: list[str]) -> bool:
     """
     Check if it is address information.
@@ -66,34 +247,47 @@ class BiliUser(bau.User, bal.LiveRoom):
     Bilibili User Class
     """
 
-    def __init__(self, uid: int, log: str, work_dir: str, credential: Union[Credential, None] = None) -> None:
+    def __init__(self, uid: int, log: str, work_dir: str, credential: Union[Credential, None] = None,
+                 cache: Optional[BiliApiCache] = None, limiter: Optional[TokenBucket] = None) -> None:
         """
         Args:
             uid: user ID
             log: log file path
+            work_dir: working directory
             credential: logon credentials
+            cache: API response cache, None for not using the cache
+            limiter: request rate limiter shared with other objects, None for not limiting
         """
         self.log_file: str = log
+        self.cache: Optional[BiliApiCache] = cache
+        self.limiter: Optional[TokenBucket] = limiter
         self.log: Union[wlw.Logger, None] = None
         self.__set_log()
 
         bau.User.__init__(self, uid, credential)
         self.uid: int = uid
         self.room_id: Union[int, None] = None
-        self.work_dir: Union[str, None] = None
-        self.__live_init()
+        self.__room_loaded: bool = False
 
         self.video_id: list[str] = []
 
-        self.fans_num_txt_file: Union[str, None] = None
-        self.guard_num_txt_file: Union[str, None] = None
-        self.charge_num_txt_file: Union[str, None] = None
-        self.address_excel_file: Union[str, None] = None
+        self.work_dir: str = os.path.join(work_dir, "user_output", str(self.uid))
+        self.fans_num_txt_file: str = os.path.join(self.work_dir, "fans_num.txt")
+        self.guard_num_txt_file: str = os.path.join(self.work_dir, "guard_num.txt")
+        self.charge_num_txt_file: str = os.path.join(self.work_dir, "charge_num.txt")
+        self.address_excel_file: str = os.path.join(self.work_dir, "address.xlsx")
         self.address_excel: Union[DataFrame, None] = None
-        self.address_unreceived_txt_file: Union[str, None] = None
+        self.address_unreceived_txt_file: str = os.path.join(self.work_dir, "address_unreceived.txt")
+        self.guard_change_txt_file: str = os.path.join(self.work_dir, "guard_change.txt")
+        self.address_sent_dir: str = os.path.join(self.work_dir, "address_sent")
+        self.guard_snapshot_dir: str = os.path.join(self.work_dir, "guard_snapshot")
+        self.series_dir: str = os.path.join(self.work_dir, "series")
+        self.upload_videos_json_file: str = os.path.join(self.work_dir, "upload_videos.json")
+        self.series: dict[str, TimeSeriesStore] = {}
+        self.__output_loaded: bool = False
 
-        self.__load_work_dir(work_dir)
-        sync(self.__load_output_file())
+        self.guard_roster: Union[DataFrame, None] = None
+        self.guard_roster_time: float = 0
 
     def __set_log(self) -> None:
         """
@@ -110,34 +304,27 @@ class BiliUser(bau.User, bal.LiveRoom):
         self.log.add_config(file_handler)
         self.log.add_config(sys_handler)
 
-    def __load_work_dir(self, work_dir: str) -> None:
-        """
-        Load the working directory.
-
-        Args:
-            work_dir: working directory
+    async def get_room_id(self) -> Optional[int]:
         """
-        user_output_dir: str = os.path.join(work_dir, "user_output")
-        if not os.path.exists(user_output_dir):
-            os.mkdir(user_output_dir)
+        Obtain the live room ID of the user and initialize the live room. The room is only resolved on the first call.
 
-        self.work_dir: str = os.path.join(user_output_dir, str(self.uid))
-        if not os.path.exists(self.work_dir):
-            os.mkdir(self.work_dir)
-
-    def __live_init(self) -> None:
-        """
-        Initialize live room.
+        Returns:
+            live room ID, None if the user has not opened a live streaming room
         """
-        live_info: dict = sync(self.get_live_info())
+        if self.__room_loaded:
+            return self.room_id
+        live_info, _ = await cached_call(self.cache, "user.get_live_info", {"uid": self.uid}, self.get_live_info,
+                                         limiter=self.limiter)
+        self.__room_loaded = True
         if live_info['live_room'] is None:
             if language == "en":
                 self.log.warning("The user has not opened a live streaming room!")
             else:
                 self.log.warning("用户未开通直播间！")
-            return
+            return None
         self.room_id = live_info['live_room']['roomid']
         bal.LiveRoom.__init__(self, self.room_id, self.credential)
+        return self.room_id
 
     async def __check_credentials(self) -> bool:
         """
@@ -184,62 +371,330 @@ class BiliUser(bau.User, bal.LiveRoom):
 
         return True
 
-    async def __load_output_file(self) -> None:
+    async def load_output_file(self) -> None:
         """
-        Load the test_output file.
+        Create the output directory and the output files with their headers. Files are only created on the first call.
         """
-        self.fans_num_txt_file: str = os.path.join(self.work_dir, "fans_num.txt")
+        if self.__output_loaded:
+            return
+        os.makedirs(self.work_dir, exist_ok=True)
+
         if not os.path.exists(self.fans_num_txt_file):
             with open(self.fans_num_txt_file, "a") as f:
                 f.write("query_time,fans_num\n")
 
-        self.guard_num_txt_file: str = os.path.join(self.work_dir, "guard_num.txt")
         if not os.path.exists(self.guard_num_txt_file):
             with open(self.guard_num_txt_file, "a") as f:
                 f.write("query_time,total_num,governor_num,supervisor_num,captain_num\n")
 
-        self.charge_num_txt_file: str = os.path.join(self.work_dir, "charge_num.txt")
         if not os.path.exists(self.charge_num_txt_file):
             with open(self.charge_num_txt_file, "a") as f:
                 f.write("query_time,charge_num\n")
 
-        self.address_excel_file: str = os.path.join(self.work_dir, "address.xlsx")
         if not os.path.exists(self.address_excel_file):
             temp_excel: DataFrame = pd.DataFrame()
             temp_excel.to_excel(self.address_excel_file, index=False)
-        self.address_excel: DataFrame = pd.read_excel(self.address_excel_file)
 
-        self.address_unreceived_txt_file: str = os.path.join(self.work_dir, "address_unreceived.txt")
         if not os.path.exists(self.address_unreceived_txt_file):
             with open(self.address_unreceived_txt_file, "a") as f:
                 f.write("uid,bili_name\n")
 
+        if not os.path.exists(self.guard_change_txt_file):
+            with open(self.guard_change_txt_file, "a") as f:
+                f.write("query_time,uid,username,change,old_level,new_level\n")
+        os.makedirs(self.guard_snapshot_dir, exist_ok=True)
+        os.makedirs(self.address_sent_dir, exist_ok=True)
+        self.__output_loaded = True
+
+    def get_series(self, name: str) -> TimeSeriesStore:
+        """
+        Obtain a time series of the user. A new series imports the data recorded in the txt file before.
+
+        Args:
+            name: name of the series, one of "fans", "guard" and "charge"
+
+        Returns:
+            the time series store
+        """
+        if name not in self.series:
+            store: TimeSeriesStore = TimeSeriesStore(os.path.join(self.series_dir, name), user_series_columns[name])
+            if len(store) == 0:
+                import_txt(os.path.join(self.work_dir, f"{name}_num.txt"), store)
+            self.series[name] = store
+        return self.series[name]
+
+    async def get_address_excel(self) -> DataFrame:
+        """
+        Obtain the address sheet of the guards. The sheet is only read on the first call.
+
+        Returns:
+            the address sheet
+        """
+        if self.address_excel is None:
+            await self.load_output_file()
+            self.address_excel = pd.read_excel(self.address_excel_file)
+        return self.address_excel
+
+    async def get_guard_roster(self, parallel: int = 4, ttl: float = 300, refresh: bool = False) -> DataFrame:
+        """
+        Obtain all guards of the live room. All pages are fetched concurrently, and the roster is kept for a while so
+        that operations in a row share one fetch.
+
+        Args:
+            parallel: the maximum number of pages fetched at the same time
+            ttl: how long the fetched roster is reused, unit: second
+            refresh: whether to fetch the roster again instead of reusing the fetched or cached one
+
+        Returns:
+            the roster with the columns uid, username, guard_level and accompany (days), one row per guard
+        """
+        if not refresh and self.guard_roster is not None and time.monotonic() - self.guard_roster_time < ttl:
+            return self.guard_roster
+
+        guard_info, _ = await cached_call(self.cache, "live.get_dahanghai", {"uid": self.uid, "page": 1},
+                                          self.get_dahanghai, page=1, limiter=self.limiter, refresh=refresh)
+        total_page: int = guard_info['info']['page']
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+
+        async def __fetch_page(page: int) -> list[dict]:
+            """
+            Fetch a page of guards.
+
+            Args:
+                page: page number
+
+            Returns:
+                guards of the page
+            """
+            async with semaphore:
+                page_info, _ = await cached_call(self.cache, "live.get_dahanghai", {"uid": self.uid, "page": page},
+                                                 self.get_dahanghai, page=page, limiter=self.limiter,
+                                                 refresh=refresh)
+            return page_info['list']
+
+        pages: list[list[dict]] = await asyncio.gather(*[__fetch_page(i) for i in range(2, total_page + 1)])
+        entries: list[dict] = guard_info['top3'] + guard_info['list']
+        for page in pages:
+            entries.extend(page)
+
+        roster: DataFrame = pd.DataFrame([[elem['uid'], elem['username'], elem['guard_level'],
+                                           elem.get('accompany', 0)] for elem in entries],
+                                         columns=guard_roster_columns)
+        roster = roster.drop_duplicates("uid", ignore_index=True)
+        self.guard_roster = roster
+        self.guard_roster_time = time.monotonic()
+        return roster
+
+    async def __record_guard_change(self, roster: DataFrame, now_time: int) -> None:
+        """
+        Save the roster as a snapshot and record the changes since the previous snapshot.
+
+        Args:
+            roster: the guard roster
+            now_time: query time
+        """
+        query_time: str = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now_time))
+        snapshot_file: str = os.path.join(self.guard_snapshot_dir, f"{query_time}.npz")
+        snapshot_files: list[str] = [file for file in find_guard_snapshots(self.guard_snapshot_dir)
+                                     if file != snapshot_file]
+        save_guard_snapshot(roster, snapshot_file)
+        if not snapshot_files:
+            return
+
+        old: dict[str, np.ndarray] = load_guard_snapshot(snapshot_files[-1])
+        new: dict[str, np.ndarray] = load_guard_snapshot(snapshot_file)
+        old_query_time: str = os.path.basename(snapshot_files[-1])[:-4]
+        old_time: float = time.mktime(time.strptime(old_query_time, '%Y-%m-%d_%H-%M-%S'))
+        diff: dict[str, np.ndarray] = diff_guard_snapshot(old, new, now_time - old_time)
+        # guards who left are only named in the previous snapshot
+        names: dict[int, str] = dict(zip(old['uid'].tolist(), old['username'].tolist()))
+        names.update(zip(roster['uid'].tolist(), roster['username'].tolist()))
+        old_levels: dict[int, int] = dict(zip(old['uid'].tolist(), old['guard_level'].tolist()))
+        new_levels: dict[int, int] = dict(zip(new['uid'].tolist(), new['guard_level'].tolist()))
+        with open(self.guard_change_txt_file, "a") as f:
+            for change, uids in diff.items():
+                for uid in uids.tolist():
+                    f.write(f"{query_time},{uid},{names.get(uid, '')},{change},{old_levels.get(uid, 0)},"
+                            f"{new_levels.get(uid, 0)}\n")
+        if language == "en":
+            self.log.info(f"Compared with {old_query_time}: {len(diff['join'])} joined, {len(diff['leave'])} left, "
+                          f"{len(diff['upgrade'])} upgraded, {len(diff['downgrade'])} downgraded and "
+                          f"{len(diff['renew'])} renewed. Changes are recorded in {self.guard_change_txt_file}.")
+        else:
+            self.log.info(f"与 {old_query_time} 相比：新上舰 {len(diff['join'])} 人，"
+                          f"离开 {len(diff['leave'])} 人，升级 {len(diff['upgrade'])} 人，降级 {len(diff['downgrade'])} "
+                          f"人，续费 {len(diff['renew'])} 人。变化记录在 {self.guard_change_txt_file} 中。")
+
+    async def get_fans_number(self) -> int:
+        """
+        Obtain the number of fans.
+
+        Returns:
+            the number of fans
+        """
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        relation_info: dict = await self.get_relation_info()
+        return relation_info['follower']
+
+    async def get_charge_number(self) -> int:
+        """
+        Obtain the number of charging members of this month.
+
+        Returns:
+            the number of charging members
+        """
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        charge_info: dict = await self.get_elec_user_monthly()
+        return charge_info['total_count']
+
     @wlw.async_separate()
-    async def get_upload_videos(self):
+    async def forecast_series(self, name: str, horizon: float, step: float, level: float) -> None:
         """
-        Get all videos uploaded by this user.
+        Forecast a time series of the user, saving the forecast as a table and a figure.
+
+        Args:
+            name: name of the series, one of "fans", "guard" and "charge", the total number is forecast for guards
+            horizon: how far to forecast after the last record, unit: second
+            step: spacing of forecast points, unit: second
+            level: probability covered by the forecast interval
+        """
+        if language == "en":
+            self.log.info(f"Start forecasting the {name} series of user {self.uid}...")
+        else:
+            self.log.info(f"开始预测用户 {self.uid} 的 {name} 数据...")
+        await self.load_output_file()
+        column: str = user_series_columns[name][0]
+        history: dict[str, np.ndarray] = self.get_series(name).query()
+        if len(history['time']) < min_observations:
+            if language == "en":
+                self.log.warning(f"Not enough records to forecast, at least {min_observations} records are needed!")
+            else:
+                self.log.warning(f"记录不足，无法预测，至少需要 {min_observations} 条记录！")
+            return
+        result: dict[str, np.ndarray] = forecast(history['time'], history[column], horizon, step, level)
+
+        table: DataFrame = pd.DataFrame({"time": [time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(elem))
+                                                  for elem in result['time']],
+                                         "mean": result['mean'], "lower": result['lower'], "upper": result['upper']})
+        csv_file: str = os.path.join(self.work_dir, f"forecast_{name}.csv")
+        table.to_csv(csv_file, index=False)
+
+        history_time: pd.DatetimeIndex = pd.to_datetime(np.asarray(history['time']) + time.localtime().tm_gmtoff,
+                                                        unit="s")
+        future_time: pd.DatetimeIndex = pd.to_datetime(result['time'] + time.localtime().tm_gmtoff, unit="s")
+        plt.figure(figsize=(2160 / 200, 1440 / 200), dpi=200)
+        plt.plot(history_time, history[column], label="History")
+        plt.plot(future_time, result['mean'], label="Forecast")
+        plt.fill_between(future_time, result['lower'], result['upper'], alpha=0.3, label=f"{level:.0%} Interval")
+        plt.xlabel("Time")
+        plt.ylabel("Count")
+        plt.title(f"{name.capitalize()} Forecast")
+        plt.legend()
+        png_file: str = os.path.join(self.work_dir, f"forecast_{name}.png")
+        plt.savefig(png_file)
+        plt.close()
+
+        if language == "en":
+            self.log.info(f"Forecast completed, the {name} number is expected to be {result['mean'][-1]:.0f} "
+                          f"({result['lower'][-1]:.0f} ~ {result['upper'][-1]:.0f}) at {table['time'].iloc[-1]}. "
+                          f"Results are saved in {csv_file} and {png_file}.")
+        else:
+            self.log.info(f"预测完成，预计 {table['time'].iloc[-1]} 时 {name} 数为 {result['mean'][-1]:.0f}"
+                          f"（{result['lower'][-1]:.0f} ~ {result['upper'][-1]:.0f}）。结果保存在 {csv_file} 和 "
+                          f"{png_file} 中。")
+
+    @wlw.async_separate()
+    async def get_upload_videos(self, parallel: int = 4, refresh: bool = False) -> None:
+        """
+        Get all videos uploaded by this user. The first page tells the total number of videos, then the other pages
+        are fetched concurrently. Videos obtained before are kept in a file, so later calls only fetch pages until they
+        reach a known video, and fall back to fetching all pages if the known videos no longer add up to the total,
+        e.g. some videos were deleted.
+
+        Args:
+            parallel: the maximum number of pages fetched at the same time
+            refresh: whether to ignore the videos obtained before and fetch all pages
         """
         if language == "en":
             self.log.info(f"Start getting all videos uploaded by user {self.uid}...")
         else:
             self.log.info(f"开始获取用户 {self.uid} 上传的所有视频...")
-        page: int = 1
-        count: int = 0
-        while True:
-            video_data: dict = await self.get_videos(pn=page)
-            if video_data['list']['vlist']:
-                for video in video_data['list']['vlist']:
-                    self.video_id.append(video['bvid'])
-                    count += 1
-            else:
-                break
-            if count >= video_data['page']['count']:
-                break
-            page += 1
+        known: list[str] = []
+        if not refresh and os.path.exists(self.upload_videos_json_file):
+            with open(self.upload_videos_json_file, "r") as f:
+                known = json.load(f)
+        known_set: set[str] = set(known)
+
+        video_data, _ = await cached_call(self.cache, "user.get_videos", {"uid": self.uid, "pn": 1},
+                                          self.get_videos, pn=1, limiter=self.limiter)
+        total: int = video_data['page']['count']
+        page_size: int = max(1, video_data['page']['ps'])
+        total_page: int = max(1, -(-total // page_size))
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+
+        async def __fetch_page(page: int) -> list[str]:
+            """
+            Fetch a page of videos.
+
+            Args:
+                page: page number
+
+            Returns:
+                bvid of the videos of the page, newest first
+            """
+            async with semaphore:
+                page_data, _ = await cached_call(self.cache, "user.get_videos", {"uid": self.uid, "pn": page},
+                                                 self.get_videos, pn=page, limiter=self.limiter)
+            return [video['bvid'] for video in page_data['list']['vlist'] or []]
+
+        async def __fetch_pages(pages: range) -> list[str]:
+            """
+            Fetch pages of videos concurrently.
+
+            Args:
+                pages: page numbers
+
+            Returns:
+                bvid of the videos of the pages in page order
+            """
+            result: list[str] = []
+            for page in await asyncio.gather(*[__fetch_page(i) for i in pages]):
+                result.extend(page)
+            return result
+
+        fetched: list[str] = [video['bvid'] for video in video_data['list']['vlist'] or []]
+        fetched_page: int = 1
+        if known:
+            # newest first, so the new videos fill the first pages and the first known video follows them
+            fetched_page = min(total_page, max(1, (total - len(known)) // page_size + 1))
+            fetched.extend(await __fetch_pages(range(2, fetched_page + 1)))
+            new: list[str] = []
+            for bvid in fetched:
+                if bvid in known_set:
+                    break
+                new.append(bvid)
+            video_id: list[str] = list(dict.fromkeys(new + known))
+            incremental: bool = len(new) < len(fetched) and len(video_id) == total
+        else:
+            incremental = False
+        if not incremental:
+            fetched.extend(await __fetch_pages(range(fetched_page + 1, total_page + 1)))
+            video_id = list(dict.fromkeys(fetched))
+
+        self.video_id = video_id
+        new_num: int = sum(bvid not in known_set for bvid in self.video_id)
+        os.makedirs(self.work_dir, exist_ok=True)
+        temp_file: str = f"{self.upload_videos_json_file}.temp"
+        with open(temp_file, "w") as f:
+            json.dump(self.video_id, f, indent=1)
+        os.replace(temp_file, self.upload_videos_json_file)
         if language == "en":
-            self.log.info(f"A total of {len(self.video_id)} videos were obtained.")
+            self.log.info(f"A total of {len(self.video_id)} videos were obtained, {new_num} of them are "
+                          f"new.")
         else:
-            self.log.info(f"共获取到 {len(self.video_id)} 个视频。")
+            self.log.info(f"共获取到 {len(self.video_id)} 个视频，其中 {new_num} 个为新视频。")
 
     @wlw.async_separate()
     async def update_fans_number(self) -> None:
@@ -251,11 +706,12 @@ class BiliUser(bau.User, bal.LiveRoom):
             self.log.info(f"Start getting the number of fans of user {self.uid}...")
         else:
             self.log.info(f"开始获取用户 {self.uid} 的粉丝数...")
-        relation_info: dict = await self.get_relation_info()
-        fans_num = relation_info['follower']
+        await self.load_output_file()
+        fans_num: int = await self.get_fans_number()
         if fans_num:
             with open(self.fans_num_txt_file, "a") as f:
                 f.write(f"{time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now_time))},{fans_num}\n")
+            self.get_series("fans").append([now_time], {"fans_num": [fans_num]})
         else:
             if language == "en":
                 self.log.warning("Failed to get the number of fans!")
@@ -272,40 +728,18 @@ class BiliUser(bau.User, bal.LiveRoom):
             self.log.info(f"Start getting the number of guards of user {self.uid}...")
         else:
             self.log.info(f"开始获取用户 {self.uid} 的舰长数...")
-        guard_info: dict = await self.get_dahanghai(page=1)
-        pprint.pprint(guard_info)
-        total_page: int = guard_info['info']['page']
-        guard_num: int = guard_info['info']['num']
-        if guard_num == 0:
-            governor_num: int = 0
-            supervisor_num: int = 0
-            captain_num: int = 0
-        else:
-            governor_num: int = 0
-            supervisor_num: int = 0
-            flag: bool = True
-            for elem in guard_info['top3']:
-                if elem['guard_level'] == 1:
-                    governor_num += 1
-                elif elem['guard_level'] == 2:
-                    supervisor_num += 1
-                elif elem['guard_level'] == 3:
-                    flag = False
-                    break
-            if flag:
-                for i in range(1, total_page + 1):
-                    guard_info: dict = await self.get_dahanghai(page=i)
-                    for elem in guard_info['list']:
-                        if elem['guard_level'] == 1:
-                            governor_num += 1
-                        elif elem['guard_level'] == 2:
-                            supervisor_num += 1
-                        elif elem['guard_level'] == 3:
-                            break
-            captain_num: int = guard_num - governor_num - supervisor_num
+        if await self.get_room_id() is None:
+            return
+        await self.load_output_file()
+        roster: DataFrame = await self.get_guard_roster(refresh=True)
+        guard_num, governor_num, supervisor_num, captain_num = count_guard_levels(roster)
         with open(self.guard_num_txt_file, "a") as f:
             f.write(f"{time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now_time))},{guard_num},{governor_num},"
                     f"{supervisor_num},{captain_num}\n")
+        self.get_series("guard").append([now_time], {"total_num": [guard_num], "governor_num": [governor_num],
+                                                     "supervisor_num": [supervisor_num],
+                                                     "captain_num": [captain_num]})
+        await self.__record_guard_change(roster, now_time)
 
     @wlw.async_separate()
     async def update_charge_number(self) -> None:
@@ -317,57 +751,135 @@ class BiliUser(bau.User, bal.LiveRoom):
             self.log.info(f"Start getting the number of charging member of user {self.uid}...")
         else:
             self.log.info(f"开始获取用户 {self.uid} 的充电人数...")
-        charge_info: dict = await self.get_elec_user_monthly()
-        charge_num: int = charge_info['total_count']
+        await self.load_output_file()
+        charge_num: int = await self.get_charge_number()
         with open(self.charge_num_txt_file, "a") as f:
             f.write(f"{time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now_time))},{charge_num}\n")
+        self.get_series("charge").append([now_time], {"charge_num": [charge_num]})
 
     @wlw.async_separate()
-    async def guard_address_stat_send(self) -> None:
+    async def guard_address_stat_send(self, parallel: int = 2, rate: float = 1, max_retry: int = 3,
+                                      retry_after: float = 5, resend: bool = False,
+                                      campaign: Optional[str] = None) -> None:
         """
-        Send address statistics to the guard.
+        Send address statistics to the guard. Guards who have been sent the message are recorded in the ledger of the
+        campaign, so an interrupted run of a campaign only messages the rest when run again, and a new campaign
+        messages every guard.
+
+        Args:
+            parallel: the maximum number of messages sent at the same time
+            rate: the maximum number of messages sent per second
+            max_retry: the maximum number of attempts for a guard
+            retry_after: waiting time before retrying a failed message, doubled after each failure, unit: second
+            resend: whether to message guards who have been sent the message in this campaign again
+            campaign: name of the campaign, None for the current date
         """
+        if campaign is None:
+            campaign = time.strftime('%Y-%m-%d', time.localtime())
         if language == "en":
-            self.log.info(f"Start sending address statistics to the guard...")
+            self.log.info(f"Start sending address statistics of campaign {campaign} to the guard...")
         else:
-            self.log.info(f"开始向舰长发送地址统计信息...")
+            self.log.info(f"开始向舰长发送地址统计信息，活动 {campaign} ...")
         if not await self.__check_credentials():
             if language == "en":
                 self.log.warning("Credential error, unable to perform address statistics!")
             else:
                 self.log.warning("登录信息错误，无法进行地址统计！")
             return
+        if await self.get_room_id() is None:
+            return
 
         msg: str = "请按以下顺序输入地址信息：收件人，电话，地址。每项之间换行。示例：\n收件人：图图\n电话：123456\n地址：翻斗花园"
-        guard_info: dict = await self.get_dahanghai(page=1)
-        total_page: int = guard_info['info']['page']
-        guard_num: int = guard_info['info']['num']
+        roster: DataFrame = await self.get_guard_roster()
 
-        if guard_num == 0:
+        if roster.empty:
             if language == "en":
                 self.log.warning("There is currently no guard!")
             else:
                 self.log.warning("当前没有舰长！")
             return
 
-        for elem in guard_info['top3']:
-            target_uid: int = elem['uid']
-            await session.send_msg(self.credential, target_uid, "1", msg)
-        for i in range(1, total_page + 1):
-            guard_info: dict = await self.get_dahanghai(page=i)
-            for elem in guard_info['list']:
-                target_uid: int = elem['uid']
-                await session.send_msg(self.credential, target_uid, "1", msg)
-
+        await self.load_output_file()
+        address_sent_txt_file: str = os.path.join(self.address_sent_dir, f"{campaign}.txt")
+        if not os.path.exists(address_sent_txt_file):
+            with open(address_sent_txt_file, "a") as f:
+                f.write("uid,send_time\n")
+        sent: set[int] = set()
+        if not resend:
+            with open(address_sent_txt_file, "r") as f:
+                sent = {int(line.split(",")[0]) for line in f.readlines()[1:] if line.strip()}
+        targets: list[int] = [uid for uid in roster['uid'].tolist() if uid not in sent]
         if language == "en":
-            self.log.info(f"Send successfully.")
+            self.log.info(f"{len(roster) - len(targets)} of {len(roster)} guards have been sent the message in this "
+                          f"campaign, {len(targets)} guards are waiting to be messaged.")
+        else:
+            self.log.info(f"{len(roster)} 位舰长中有 {len(roster) - len(targets)} 位已在本次活动中发送过，"
+                          f"{len(targets)} 位等待发送。")
+
+        limiter: TokenBucket = TokenBucket(rate)
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+        progress: dict[str, int] = {"done": 0, "failed": 0}
+
+        async def __send(target_uid: int) -> None:
+            """
+            Send the message to a guard, retrying with backoff on transient failures.
+
+            Args:
+                target_uid: user ID of the guard
+            """
+            for attempt in range(1, max_retry + 1):
+                try:
+                    async with semaphore:
+                        await limiter.acquire()
+                        await session.send_msg(self.credential, target_uid, "1", msg)
+                except Exception as e:
+                    error: str = f"{type(e).__name__}: {e}"
+                    if attempt < max_retry and _is_transient_error(e):
+                        delay: float = retry_after * 2 ** (attempt - 1)
+                        if language == "en":
+                            self.log.warning(f"Failed to message {target_uid} ({error}), retry after {delay} seconds.")
+                        else:
+                            self.log.warning(f"向 {target_uid} 发送失败（{error}），{delay} 秒后重试。")
+                        await asyncio.sleep(delay)
+                        continue
+                    progress['failed'] += 1
+                    if language == "en":
+                        self.log.error(f"Failed to message {target_uid} after {attempt} attempts: {error}")
+                    else:
+                        self.log.error(f"在尝试 {attempt} 次后向 {target_uid} 发送失败：{error}")
+                    return
+                with open(address_sent_txt_file, "a") as f:
+                    f.write(f"{target_uid},{time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime())}\n")
+                progress['done'] += 1
+                if language == "en":
+                    self.log.info(f"[{progress['done']}/{len(targets)}] Sent to {target_uid}.")
+                else:
+                    self.log.info(f"[{progress['done']}/{len(targets)}] 已发送给 {target_uid} 。")
+                return
+
+        await asyncio.gather(*[__send(uid) for uid in targets])
+
+        if progress['failed'] == 0:
+            if language == "en":
+                self.log.info(f"Send successfully.")
+            else:
+                self.log.info(f"发送成功。")
         else:
-            self.log.info(f"发送成功。")
+            if language == "en":
+                self.log.warning(f"{progress['done']} messages sent, {progress['failed']} failed. Run again to retry "
+                                 f"the failed guards.")
+            else:
+                self.log.warning(f"成功发送 {progress['done']} 条，失败 {progress['failed']} 条。再次运行以重试失败的舰长。")
 
     @wlw.async_separate()
-    async def guard_address_stat_receive(self) -> None:
+    async def guard_address_stat_receive(self, parallel: int = 2, rate: float = 1) -> None:
         """
-        Receive address statistics from the guard.
+        Receive address statistics from the guard. Sessions are fetched concurrently, and the address sheet and the
+        unreceived list are written once at the end.
+
+        Args:
+            parallel: the maximum number of sessions fetched at the same time
+            rate: the maximum number of sessions fetched per second
         """
         if language == "en":
             self.log.info("Start receiving address statistics to the guard")
@@ -379,12 +891,12 @@ class BiliUser(bau.User, bal.LiveRoom):
             else:
                 self.log.warning("登录信息错误，无法接收地址信息！")
             return
+        if await self.get_room_id() is None:
+            return
+        await self.get_address_excel()
 
-        receive_flag: bool = False
-        count: int = 0
-        guard_info: dict = await self.get_dahanghai(page=1)
-        total_page: int = guard_info['info']['page']
-        guard_num: int = guard_info['info']['num']
+        roster: DataFrame = await self.get_guard_roster()
+        guard_num: int = len(roster)
         if guard_num == 0:
             if language == "en":
                 self.log.warning("There is currently no guard!")
@@ -392,39 +904,60 @@ class BiliUser(bau.User, bal.LiveRoom):
                 self.log.warning("当前没有舰长！")
             return
 
-        guard_list: list[dict] = []
-        for elem in guard_info['top3']:
-            guard_list.append(elem)
-        for i in range(1, total_page + 1):
-            guard_info: dict = await self.get_dahanghai(page=i)
-            for elem in guard_info['list']:
-                guard_list.append(elem)
-
-        for elem in guard_list:
-            target_uid: int = elem['uid']
-            target_name: str = elem['username']
-            receive_info = await session.fetch_session_msgs(target_uid, self.credential)
-            msg_list: list[dict] = receive_info['messages']
-            for msg_dict in msg_list:
-                content: list[str] = eval(msg_dict['content'])['content'].split("\n")
-                temp_flag: bool = await _address_msg_simple_check(content)
-                if temp_flag:
-                    line: DataFrame = pd.DataFrame({"uid": target_uid,
-                                                    "bili_name": target_name,
-                                                    "收件人": content[0].split("：")[-1],
-                                                    "电话": content[1].split("：")[-1],
-                                                    "地址": content[2].split("：")[-1]},
-                                                   index=[0])
-                    self.address_excel = pd.concat([self.address_excel, line], ignore_index=True, axis=0)
-                    self.address_excel.to_excel(self.address_excel_file, index=False)
-                    self.address_excel = pd.read_excel(self.address_excel_file)
-                    count += 1
-                    receive_flag = True
-                    break
-            if not receive_flag:
-                with open(self.address_unreceived_txt_file, "a") as f:
-                    f.write(f"{target_uid},{target_name}\n")
-            receive_flag = False
+        limiter: TokenBucket = TokenBucket(rate)
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+
+        async def __receive(target_uid: int) -> Optional[list[str]]:
+            """
+            Find the address message in the session with a guard.
+
+            Args:
+                target_uid: user ID of the guard
+
+            Returns:
+                the lines of the address message, None if there is no address message
+            """
+            try:
+                async with semaphore:
+                    await limiter.acquire()
+                    receive_info: dict = await session.fetch_session_msgs(target_uid, self.credential)
+            except Exception as e:
+                if language == "en":
+                    self.log.warning(f"Failed to fetch the session with {target_uid}: {type(e).__name__}: {e}")
+                else:
+                    self.log.warning(f"获取与 {target_uid} 的会话失败：{type(e).__name__}：{e}")
+                return None
+            for msg_dict in receive_info.get('messages') or []:
+                text: Optional[str] = _parse_text_msg(msg_dict.get('content'))
+                if text is None:
+                    continue
+                content: list[str] = text.split("\n")
+                if await _address_msg_simple_check(content):
+                    return content
+            return None
+
+        uid_list: list[int] = roster['uid'].tolist()
+        name_list: list[str] = roster['username'].tolist()
+        results: list[Optional[list[str]]] = await asyncio.gather(*[__receive(uid) for uid in uid_list])
+
+        rows: list[dict] = []
+        unreceived: list[str] = []
+        for target_uid, target_name, content in zip(uid_list, name_list, results):
+            if content is None:
+                unreceived.append(f"{target_uid},{target_name}\n")
+                continue
+            rows.append({"uid": target_uid,
+                         "bili_name": target_name,
+                         "收件人": content[0].split("：")[-1],
+                         "电话": content[1].split("：")[-1],
+                         "地址": content[2].split("：")[-1]})
+        count: int = len(rows)
+        if rows:
+            self.address_excel = pd.concat([self.address_excel, pd.DataFrame(rows)], ignore_index=True, axis=0)
+            self.address_excel.to_excel(self.address_excel_file, index=False)
+        if unreceived:
+            with open(self.address_unreceived_txt_file, "a") as f:
+                f.writelines(unreceived)
 
         if count == guard_num:
             if language == "en":
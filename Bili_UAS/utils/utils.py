@@ -29,6 +29,8 @@ class BiliVideoReply(object):
         self.replies_num: int = reply_data['rcount']  # Number of replies
         self.content: str = reply_data['content']['message']  # Reply content
         self.like: str = reply_data['like']
+        self.ctime: int = reply_data['ctime']  # Unix timestamp of reply publishing time
+        self.root: int = reply_data.get('root', 0)  # Root reply id, 0 for first level replies
         self.log_file: str = log
 
 
@@ -9,56 +9,91 @@ from __future__ import annotations
 import numpy as np
 from .utils import BiliVideoReply, BiliVideoDanmu, BiliVideoTag
 from .config_utils import load_language_from_txt, load_ffmpeg_path_from_txt
+from .rate_utils import TokenBucket
+from .cache_utils import BiliApiCache, cached_call
 from Bili_UAS.writer import log_writer as wlw
-import time
-import copy
+import json
 import re
-from bilibili_api import Credential, video as bav, Danmaku, comment as bac, HEADERS
+from bilibili_api import Credential, video as bav, comment as bac, HEADERS
 import pandas as pd
 from pandas import DataFrame
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 import httpx
 import enum
+import asyncio
 
 
 language: str = load_language_from_txt()
 
+# emoticon frame in replies, e.g. [doge]
+emote_pattern: re.Pattern = re.compile(r"\[.*?]")
+
+
+def clean_reply_content(content: str) -> str:
+    """
+    Remove emoticon frames from a reply.
+
+    Args:
+        content: reply content
+
+    Returns:
+        cleaned reply content
+    """
+    return emote_pattern.sub(",", content)
+
 
-@wlw.async_separate()
 async def _download_video_from_url(video_url: str,
                                    output_file: str,
                                    video_pid: int,
                                    log: wlw.Logger,
-                                   prompt_prefix: str) -> None:
+                                   prompt_prefix: str,
+                                   bandwidth: Optional[TokenBucket] = None,
+                                   connections: Optional[asyncio.Semaphore] = None) -> None:
     """
-    Download video through url.
+    Download video through url. The response is streamed to the file chunk by chunk.
 
     Args:
         video_url: download url for video
         output_file: the path to save the video
         video_pid: pid of video
         log: the log class
+        prompt_prefix: prefix of the download prompt
+        bandwidth: shared bandwidth limiter in bytes per second, None for unlimited
+        connections: shared semaphore limiting the number of open download connections, None for unlimited
     """
+    if connections is not None:
+        async with connections:
+            await _download_video_from_url(video_url, output_file, video_pid, log, prompt_prefix, bandwidth)
+        return
+
     if language == "en":
         log.info(f"{video_pid} {prompt_prefix} downloading...")
     else:
         log.info(f"{video_pid} {prompt_prefix} 正在下载...")
     async with httpx.AsyncClient(headers=HEADERS) as sess:
-        resp = await sess.get(video_url)
-        length = resp.headers.get('content-length')
-
-        with open(output_file, 'wb') as f:
-            process = 0
-            for chunk in resp.iter_bytes(1024):
-                if not chunk:
-                    break
-                process += len(chunk)
-                if language == "en":
-                    log.info(f"{video_pid} {prompt_prefix} downloading... {process} / {length}")
-                else:
-                    log.info(f"{video_pid} {prompt_prefix} 正在下载... {process} / {length}")
-                f.write(chunk)
+        async with sess.stream("GET", video_url) as resp:
+            # an expired url answers with an error page, which must not be saved as a media stream
+            resp.raise_for_status()
+            length = resp.headers.get('content-length')
+            total: Optional[int] = int(length) if length is not None else None
+
+            with open(output_file, 'wb') as f:
+                process: int = 0
+                next_prompt: float = 0.1
+                async for chunk in resp.aiter_bytes(1024 * 64):
+                    if not chunk:
+                        break
+                    process += len(chunk)
+                    if bandwidth is not None:
+                        await bandwidth.acquire(len(chunk))
+                    f.write(chunk)
+                    if total and process / total >= next_prompt:
+                        next_prompt += 0.1
+                        if language == "en":
+                            log.info(f"{video_pid} {prompt_prefix} downloading... {process} / {length}")
+                        else:
+                            log.info(f"{video_pid} {prompt_prefix} 正在下载... {process} / {length}")
 
     if language == "en":
         log.info(f"{video_pid} {prompt_prefix} download successfully.")
@@ -66,12 +101,38 @@ async def _download_video_from_url(video_url: str,
         log.info(f"{video_pid} {prompt_prefix} 下载成功.")
 
 
+async def _run_ffmpeg(ffmpeg_path: str, *args: str) -> int:
+    """
+    Run ffmpeg in a subprocess without blocking the event loop. If the call is cancelled, ffmpeg is killed.
+
+    Args:
+        ffmpeg_path: the path of ffmpeg
+        args: ffmpeg arguments, passed without going through a shell
+
+    Returns:
+        the return code of ffmpeg
+    """
+    process = await asyncio.create_subprocess_exec(ffmpeg_path, "-y", "-loglevel", "error", *args)
+    try:
+        return await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+
+
 class VideoDownloadMode(enum.Enum):
     """
     Video Download Type Enumeration Class
     """
     VIDEO = 1
-    AUDIO = 2
+    AUDIO = 2  # transcoded to mp3
+    AUDIO_COPY = 3  # original aac stream without transcoding
+
+
+download_suffix: dict[VideoDownloadMode, str] = {VideoDownloadMode.VIDEO: "mp4",
+                                                 VideoDownloadMode.AUDIO: "mp3",
+                                                 VideoDownloadMode.AUDIO_COPY: "m4a"}
 
 
 class BiliVideo(bav.Video):
@@ -84,7 +145,9 @@ class BiliVideo(bav.Video):
                  work_dir: str,
                  credential: Optional[Credential] = None,
                  aid: Optional[int] = None,
-                 bvid: Optional[str] = None) -> None:
+                 bvid: Optional[str] = None,
+                 cache: Optional[BiliApiCache] = None,
+                 limiter: Optional[TokenBucket] = None) -> None:
         """
         Either aid or bvid must be filled in.
 
@@ -94,12 +157,16 @@ class BiliVideo(bav.Video):
             log: the log file
             work_dir: working directory
             credential: logon credentials
+            cache: API response cache, None for not using the cache
+            limiter: request rate limiter shared with other videos, None for pausing 0.2 seconds between requests
         """
         super().__init__(bvid=bvid, aid=aid, credential=credential)
         self.aid: int = self.get_aid()
         self.bvid: str = self.get_bvid()
         self.p_cid: list[int] = []
         self.p_time: list[int] = []
+        self.cache: Optional[BiliApiCache] = cache
+        self.limiter: Optional[TokenBucket] = limiter
 
         self.publish_time: Optional[int] = None
         self.total_time: Optional[int] = None
@@ -122,11 +189,14 @@ class BiliVideo(bav.Video):
         self.tag_follow_max: Optional[int] = None
 
         self.replies: list[BiliVideoReply] = []
-        self.robust_replies: list[BiliVideoReply] = []
+        self.robust_reply_content: Optional[pd.Series] = None
+        self.reply_emotes: Optional[pd.Series] = None
         self.danmu: list[BiliVideoDanmu] = []
         self.tags: list[BiliVideoTag] = []
 
         self.work_dir: Optional[str] = None
+        self.reply_store_file: Optional[str] = None
+        self.reply_checkpoint_file: Optional[str] = None
         self.info_excel_file: Optional[str] = None
         self.info_excel: Optional[DataFrame] = None
 
@@ -154,7 +224,8 @@ class BiliVideo(bav.Video):
         """
         Obtain sub video information, including id and video time.
         """
-        p_info: list[dict] = await self.get_pages()
+        p_info, _ = await cached_call(self.cache, "video.get_pages", {"bvid": self.bvid}, self.get_pages,
+                                      limiter=self.limiter)
         if p_info:
             for page in p_info:
                 self.p_cid.append(page['cid'])
@@ -182,6 +253,8 @@ class BiliVideo(bav.Video):
         self.work_dir: str = os.path.join(video_output_dir, self.bvid)
         if not os.path.exists(self.work_dir):
             os.mkdir(self.work_dir)
+        self.reply_store_file: str = os.path.join(self.work_dir, "replies.jsonl")
+        self.reply_checkpoint_file: str = os.path.join(self.work_dir, "reply_checkpoint.json")
 
     @wlw.async_separate()
     async def video_info_statistics(self) -> None:
@@ -193,7 +266,8 @@ class BiliVideo(bav.Video):
         else:
             self.log.info(f"开始获取 {self.bvid} 的视频信息...")
 
-        video_info: dict = await self.get_info()
+        video_info, _ = await cached_call(self.cache, "video.get_info", {"bvid": self.bvid}, self.get_info,
+                                          limiter=self.limiter)
         self.publish_time = video_info['pubdate']
         self.total_time = video_info['duration']
         self.view = video_info['stat']['view']
@@ -207,7 +281,8 @@ class BiliVideo(bav.Video):
         self.copyright = video_info['copyright']  # copyright: copyright mark, 1: homemade, 2: reprint
         self.up_uid = video_info['owner']['mid']
 
-        video_stst: dict = await self.get_stat()
+        video_stst, _ = await cached_call(self.cache, "video.get_stat", {"bvid": self.bvid}, self.get_stat,
+                                          limiter=self.limiter)
         self.reprint_sign = video_stst[
             'no_reprint']  # reprint_sign: prohibition of reprinting sign, 0: none, 1: prohibition
 
@@ -216,18 +291,17 @@ class BiliVideo(bav.Video):
         else:
             self.log.info(f"{self.bvid} 的视频信息获取完成.")
 
-    @wlw.async_separate()
-    async def get_replies(self, sec: bool) -> None:
+    async def iter_reply_pages(self, sec: bool) -> AsyncIterator[list[BiliVideoReply]]:
         """
-        Obtain first level (second level) replies of videos.
+        Obtain first level (second level) replies of videos page by page, so that each page can be processed as soon
+        as it arrives.
 
         Args:
             sec: whether to obtain the second level reply
+
+        Yields:
+            replies of a page
         """
-        if language == "en":
-            self.log.info(f"Start acquiring replies for {self.bvid}...")
-        else:
-            self.log.info(f"开始获取 {self.bvid} 的评论...")
         page: int = 1
         count: int = 0
         while True:
@@ -235,24 +309,44 @@ class BiliVideo(bav.Video):
                 self.log.info(f"Start acquiring page {page} of replies for {self.bvid}.")
             else:
                 self.log.info(f"开始获取 {self.bvid} 第 {page} 页评论.")
-            page_reply_info: dict = await bac.get_comments(self.aid, bac.CommentResourceType.VIDEO, page,
-                                                           credential=self.credential)
+            page_reply_info, cached = await cached_call(self.cache, "comment.get_comments",
+                                                        {"oid": self.aid, "page": page},
+                                                        bac.get_comments, self.aid, bac.CommentResourceType.VIDEO,
+                                                        page, credential=self.credential, limiter=self.limiter)
             count += page_reply_info['page']['size']
             if page_reply_info['replies']:
+                page_replies: list[BiliVideoReply] = []
                 for r in page_reply_info['replies']:
                     reply: BiliVideoReply = BiliVideoReply(r, log=self.log_file)
-                    self.replies.append(reply)
+                    page_replies.append(reply)
                     if sec:
                         if r['replies']:
                             for sub_r in r['replies']:
                                 sub_reply: BiliVideoReply = BiliVideoReply(sub_r, log=self.log_file)
-                                self.replies.append(sub_reply)
+                                page_replies.append(sub_reply)
+                yield page_replies
                 page += 1
-                time.sleep(0.2)
+                if not cached and self.limiter is None:
+                    await asyncio.sleep(0.2)
                 if count >= page_reply_info['page']['count']:
                     break
             else:
                 break
+
+    @wlw.async_separate()
+    async def get_replies(self, sec: bool) -> None:
+        """
+        Obtain first level (second level) replies of videos.
+
+        Args:
+            sec: whether to obtain the second level reply
+        """
+        if language == "en":
+            self.log.info(f"Start acquiring replies for {self.bvid}...")
+        else:
+            self.log.info(f"开始获取 {self.bvid} 的评论...")
+        async for page_replies in self.iter_reply_pages(sec):
+            self.replies.extend(page_replies)
         if sec:
             if language == "en":
                 self.log.info(
@@ -270,6 +364,121 @@ class BiliVideo(bav.Video):
                 self.log.info(
                     f"一共成功获取了 {len(self.replies)} 条评论. (不包含二级评论)")
 
+    @wlw.async_separate()
+    async def sync_replies(self, sec: bool) -> None:
+        """
+        Incrementally synchronize replies into the local reply store. Replies are fetched from the newest until a
+        page reaches the replies already synchronized, and only new replies are appended to the store. All replies in
+        the store are loaded afterwards.
+
+        Args:
+            sec: whether to load the second level reply
+        """
+        if language == "en":
+            self.log.info(f"Start synchronizing replies for {self.bvid}...")
+        else:
+            self.log.info(f"开始同步 {self.bvid} 的评论...")
+
+        checkpoint: dict = {"newest_rpid": 0, "newest_ctime": 0, "total": 0}
+        if os.path.exists(self.reply_checkpoint_file):
+            with open(self.reply_checkpoint_file, "r") as f:
+                checkpoint.update(json.load(f))
+
+        stored_replies: list[dict] = []
+        if os.path.exists(self.reply_store_file):
+            with open(self.reply_store_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        stored_replies.append(json.loads(line))
+        known_rpid: set[int] = {r['rpid'] for r in stored_replies}
+
+        new_replies: list[dict] = []
+        newest_rpid: int = checkpoint['newest_rpid']
+        newest_ctime: int = checkpoint['newest_ctime']
+        total: int = checkpoint['total']
+        page: int = 1
+        count: int = 0
+        while True:
+            if language == "en":
+                self.log.info(f"Start synchronizing page {page} of replies for {self.bvid}.")
+            else:
+                self.log.info(f"开始同步 {self.bvid} 第 {page} 页评论.")
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            page_reply_info: dict = await bac.get_comments(self.aid, bac.CommentResourceType.VIDEO, page,
+                                                           order=bac.OrderType.TIME, credential=self.credential)
+            count += page_reply_info['page']['size']
+            total = page_reply_info['page']['count']
+            if not page_reply_info['replies']:
+                break
+
+            reach_known: bool = False
+            for r in page_reply_info['replies']:
+                if r['rpid'] in known_rpid or r['ctime'] < checkpoint['newest_ctime']:
+                    reach_known = True
+                if r['ctime'] > newest_ctime:
+                    newest_rpid, newest_ctime = r['rpid'], r['ctime']
+                for elem in [r] + (r['replies'] or []):
+                    if elem['rpid'] not in known_rpid:
+                        known_rpid.add(elem['rpid'])
+                        new_replies.append({"rpid": elem['rpid'],
+                                            "mid": elem['mid'],
+                                            "ctime": elem['ctime'],
+                                            "root": elem.get('root', 0),
+                                            "count": elem['count'],
+                                            "rcount": elem['rcount'],
+                                            "like": elem['like'],
+                                            "content": {"message": elem['content']['message']}})
+            if reach_known or count >= total:
+                break
+            page += 1
+            if self.limiter is None:
+                await asyncio.sleep(0.2)
+
+        if new_replies:
+            with open(self.reply_store_file, "a", encoding="utf-8") as f:
+                for r in new_replies:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        with open(self.reply_checkpoint_file, "w") as f:
+            json.dump({"newest_rpid": newest_rpid, "newest_ctime": newest_ctime, "total": total}, f)
+
+        for r in stored_replies + new_replies:
+            if sec or r['root'] == 0:
+                self.replies.append(BiliVideoReply(r, log=self.log_file))
+        if language == "en":
+            self.log.info(f"{len(new_replies)} new replies have been synchronized, a total of {len(self.replies)} "
+                          f"replies are loaded from {self.reply_store_file}.")
+        else:
+            self.log.info(f"同步了 {len(new_replies)} 条新评论，共从 {self.reply_store_file} 加载了 "
+                          f"{len(self.replies)} 条评论.")
+
+    async def iter_danmu_pages(self) -> AsyncIterator[list[BiliVideoDanmu]]:
+        """
+        Obtain all current danmu in the video sub video by sub video, so that the danmu of each sub video can be
+        processed as soon as they arrive.
+
+        Yields:
+            danmu of a sub video
+        """
+        if not self.p_cid:
+            if language == "en":
+                self.log.warning("The sub video id is missing, and the danmu cannot be obtained!")
+            else:
+                self.log.warning("缺少分P视频id, 无法获取弹幕!")
+            return
+        for p_id in self.p_cid:
+            if language == "en":
+                self.log.info(f"Start acquiring danmu for sub video: {p_id}...")
+            else:
+                self.log.info(f"开始获取分P: {p_id} 的弹幕...")
+            danmu_list_info, cached = await cached_call(self.cache, "video.get_danmakus",
+                                                        {"bvid": self.bvid, "cid": p_id},
+                                                        self.get_danmakus, cid=p_id, limiter=self.limiter)
+            if danmu_list_info:
+                yield [BiliVideoDanmu(danmu_info, log=self.log_file) for danmu_info in danmu_list_info]
+            if not cached and self.limiter is None:
+                await asyncio.sleep(0.2)
+
     @wlw.async_separate()
     async def get_danmu(self) -> None:
         """
@@ -279,42 +488,32 @@ class BiliVideo(bav.Video):
             self.log.info(f"Start acquiring danmu for {self.bvid}...")
         else:
             self.log.info(f"开始获取 {self.bvid} 的弹幕...")
+        async for page_danmu in self.iter_danmu_pages():
+            self.danmu.extend(page_danmu)
         if self.p_cid:
-            for p_id in self.p_cid:
-                if language == "en":
-                    self.log.info(f"Start acquiring danmu for sub video: {p_id}...")
-                else:
-                    self.log.info(f"开始获取分P: {p_id} 的弹幕...")
-                danmu_list_info: list[Danmaku] = await self.get_danmakus(cid=p_id)
-                if danmu_list_info:
-                    for danmu_info in danmu_list_info:
-                        danmu: BiliVideoDanmu = BiliVideoDanmu(danmu_info, log=self.log_file)
-                        self.danmu.append(danmu)
-                time.sleep(0.2)
             if language == "en":
                 self.log.info(f"A total of {len(self.danmu)} danmu have been collected successfully.")
             else:
                 self.log.info(f"一共成功获取了 {len(self.danmu)} 条弹幕.")
-        else:
-            if language == "en":
-                self.log.warning("The sub video id is missing, and the danmu cannot be obtained!")
-            else:
-                self.log.warning("缺少分P视频id, 无法获取弹幕!")
 
     @wlw.async_separate()
-    async def reply_robust_process(self) -> None:
+    async def reply_robust_process(self, emotes: bool = False) -> None:
         """
-        Robust processing of replies. Remove emoticon frame.
+        Robust processing of replies. Remove emoticon frame. Only the cleaned content is kept, as one column processed
+        in a single vectorized pass, and the replies themselves are not copied.
+
+        Args:
+            emotes: whether to count the emoticons into reply_emotes before removing them
         """
         if language == "en":
             self.log.info(f"Start robust processing of replies for {self.bvid}...")
         else:
             self.log.info(f"开始处理 {self.bvid} 的评论内容...")
         if self.replies:
-            for elem in self.replies:
-                rb_reply: BiliVideoReply = copy.deepcopy(elem)
-                rb_reply.content = re.sub(r"\[.*?]", ",", rb_reply.content)
-                self.robust_replies.append(rb_reply)
+            content: pd.Series = pd.Series([elem.content for elem in self.replies], dtype=object)
+            if emotes:
+                self.reply_emotes = content.str.findall(emote_pattern).explode().dropna().value_counts()
+            self.robust_reply_content = content.str.replace(emote_pattern, ",", regex=True)
             if language == "en":
                 self.log.info(f"Robust processing of replies for {self.bvid} completed.")
             else:
@@ -340,12 +539,15 @@ class BiliVideo(bav.Video):
                     self.log.info(f"Start acquiring tags for sub video: {p_id}.")
                 else:
                     self.log.info(f"开始获取分P: {p_id} 的标签...")
-                tag_info_list: list[dict] = await self.get_tags(cid=p_id)
+                tag_info_list, cached = await cached_call(self.cache, "video.get_tags",
+                                                          {"bvid": self.bvid, "cid": p_id}, self.get_tags, cid=p_id,
+                                                          limiter=self.limiter)
                 if tag_info_list:
                     for tag_info in tag_info_list:
                         tag: BiliVideoTag = BiliVideoTag(tag_info, log=self.log_file)
                         self.tags.append(tag)
-                time.sleep(0.2)
+                if not cached and self.limiter is None:
+                    await asyncio.sleep(0.2)
             if len(self.tags) > 0:
                 if language == "en":
                     self.log.info(f"A total of {len(self.tags)} tags have been collected successfully.")
@@ -447,116 +649,158 @@ class BiliVideo(bav.Video):
         else:
             self.log.info(f"视频信息已保存至 {excel_file}.")
 
-    @wlw.async_separate()
-    async def download(self, mode: VideoDownloadMode) -> None:
+    async def __download_part(self,
+                              pid: int,
+                              mode: VideoDownloadMode,
+                              ffmpeg_path: str,
+                              download_semaphore: asyncio.Semaphore,
+                              bandwidth: Optional[TokenBucket],
+                              connections: Optional[asyncio.Semaphore],
+                              transcoders: asyncio.Semaphore) -> bool:
         """
-        Download all videos or audio.
+        Download a sub video or its audio. The streams of the sub video are downloaded concurrently, and the
+        download slot is released before converting, so that converting overlaps with the next download. ffmpeg
+        writes to a partial file, which replaces the output file only after a successful conversion, so an existing
+        output file is always complete.
 
         Args:
-            mode: 0 for downloading videos, 1 for downloading audio.
+            pid: sub video id
+            mode: download mode
+            ffmpeg_path: the path of ffmpeg
+            download_semaphore: semaphore limiting the number of sub videos downloaded at the same time
+            bandwidth: shared bandwidth limiter in bytes per second
+            connections: shared semaphore limiting the number of open download connections
+            transcoders: semaphore limiting the number of ffmpeg processes running at the same time
+
+        Returns:
+            True if the sub video is available after the call, otherwise False
         """
-        if self.p_cid:
-            ffmpeg_path = await load_ffmpeg_path_from_txt()
-            for pid in self.p_cid:
-
+        output_file: str = os.path.join(self.work_dir, f"{pid}.{download_suffix[mode]}")
+        part_file: str = os.path.join(self.work_dir, f"{pid}.part.{download_suffix[mode]}")
+        if mode == VideoDownloadMode.VIDEO:
+            if os.path.exists(output_file):
+                if language == "en":
+                    self.log.info(f"{pid} video has been downloaded.")
+                else:
+                    self.log.info(f"{pid} 视频已下载.")
+                return True
+        else:
+            if os.path.exists(output_file):
+                if language == "en":
+                    self.log.info(f"{pid} audio has been downloaded.")
+                else:
+                    self.log.info(f"{pid} 音频已下载.")
+                return True
+
+        async with download_semaphore:
+            p_url_info: dict = await self.get_download_url(cid=pid)
+            detector = bav.VideoDownloadURLDataDetecter(data=p_url_info)
+            streams = detector.detect_best_streams()
+
+            if detector.check_flv_stream():
+                temp_files: list[str] = [os.path.join(self.work_dir, f"{pid}_flv_temp.flv")]
+                await _download_video_from_url(streams[0].url, temp_files[0], pid, self.log, "flv video streaming",
+                                               bandwidth, connections)
                 if mode == VideoDownloadMode.VIDEO:
-                    if os.path.exists(os.path.join(self.work_dir, f"{pid}.mp4")):
-                        if language == "en":
-                            self.log.info(f"{pid} video has been downloaded.")
-                        else:
-                            self.log.info(f"{pid} 视频已下载.")
-                        continue
+                    ffmpeg_args: list[str] = ["-i", temp_files[0], part_file]
+                elif mode == VideoDownloadMode.AUDIO:
+                    ffmpeg_args: list[str] = ["-i", temp_files[0], "-vn", "-acodec", "libmp3lame", "-aq", "0",
+                                              part_file]
                 else:
-                    if os.path.exists(os.path.join(self.work_dir, f"{pid}.mp3")):
-                        if language == "en":
-                            self.log.info(f"{pid} audio has been downloaded.")
-                        else:
-                            self.log.info(f"{pid} 音频已下载.")
-                        continue
-
-                p_url_info: dict = await self.get_download_url(cid=pid)
-                detector = bav.VideoDownloadURLDataDetecter(data=p_url_info)
-                streams = detector.detect_best_streams()
-
-                if detector.check_flv_stream():
-                    if mode == VideoDownloadMode.VIDEO:
-                        temp_flv: str = os.path.join(self.work_dir, f"{pid}_flv_temp.flv")
-                        mp4_video_out: str = os.path.join(self.work_dir, f"{pid}.mp4")
-
-                        await _download_video_from_url(streams[0].url, temp_flv, pid, self.log, "flv video streaming")
-
-                        if language == "en":
-                            self.log.info("Converting video format...")
-                        else:
-                            self.log.info("正在转换视频格式...")
-                        os.system(f"{ffmpeg_path} -i {temp_flv} {mp4_video_out}")
-
-                        os.remove(temp_flv)
-                        if language == "en":
-                            self.log.info(f"{pid} video download successfully.")
-                        else:
-                            self.log.info(f"{pid} 视频下载成功.")
-
-                    elif mode == VideoDownloadMode.AUDIO:
-                        temp_flv: str = os.path.join(self.work_dir, f"{pid}_flv_temp.flv")
-                        mp3_audio_out: str = os.path.join(self.work_dir, f"{pid}.mp3")
-
-                        await _download_video_from_url(streams[0].url, temp_flv, pid, self.log, "flv video streaming")
-
-                        if language == "en":
-                            self.log.info("Converting audio format...")
-                        else:
-                            self.log.info("正在转换音频格式...")
-                        os.system(f"{ffmpeg_path} -i {temp_flv} -vn -acodec libmp3lame -aq 0 {mp3_audio_out}")
-
-                        os.remove(temp_flv)
-                        if language == "en":
-                            self.log.info(f"{pid} audio download successfully.")
-                        else:
-                            self.log.info(f"{pid} 音频下载成功.")
+                    ffmpeg_args: list[str] = ["-i", temp_files[0], "-vn", "-acodec", "copy", part_file]
+            else:
+                if mode == VideoDownloadMode.VIDEO:
+                    temp_files: list[str] = [os.path.join(self.work_dir, f"{pid}_video_mp4_temp.m4s"),
+                                             os.path.join(self.work_dir, f"{pid}_audio_mp4_temp.m4s")]
+                    await asyncio.gather(
+                        _download_video_from_url(streams[0].url, temp_files[0], pid, self.log, "video streaming",
+                                                 bandwidth, connections),
+                        _download_video_from_url(streams[1].url, temp_files[1], pid, self.log, "audio streaming",
+                                                 bandwidth, connections))
+                    ffmpeg_args: list[str] = ["-i", temp_files[0], "-i", temp_files[1],
+                                              "-vcodec", "copy", "-acodec", "copy", part_file]
                 else:
-                    if mode == VideoDownloadMode.VIDEO:
-                        temp_m4s_video: str = os.path.join(self.work_dir, f"{pid}_video_mp4_temp.m4s")
-                        temp_m4s_audio: str = os.path.join(self.work_dir, f"{pid}_audio_mp4_temp.m4s")
-                        mp4_video_out: str = os.path.join(self.work_dir, f"{pid}.mp4")
-
-                        await _download_video_from_url(streams[0].url, temp_m4s_video, pid, self.log, "video streaming")
-                        await _download_video_from_url(streams[1].url, temp_m4s_audio, pid, self.log, "audio streaming")
-
-                        if language == "en":
-                            self.log.info("Converting video format...")
-                        else:
-                            self.log.info("正在转换视频格式...")
-                        os.system(f"{ffmpeg_path} -i {temp_m4s_video} -i {temp_m4s_audio} "
-                                  f"-vcodec copy -acodec copy {mp4_video_out}")
-
-                        os.remove(temp_m4s_video)
-                        os.remove(temp_m4s_audio)
-                        if language == "en":
-                            self.log.info(f"{pid} video download successfully.")
-                        else:
-                            self.log.info(f"{pid} 视频下载成功.")
-
-                    elif mode == VideoDownloadMode.AUDIO:
-                        temp_m4s_audio: str = os.path.join(self.work_dir, f"{pid}_audio_mp4_temp.m4s")
-                        mp3_audio_out: str = os.path.join(self.work_dir, f"{pid}.mp3")
-
-                        await _download_video_from_url(streams[1].url, temp_m4s_audio, pid, self.log, "audio streaming")
+                    temp_files: list[str] = [os.path.join(self.work_dir, f"{pid}_audio_mp4_temp.m4s")]
+                    await _download_video_from_url(streams[1].url, temp_files[0], pid, self.log, "audio streaming",
+                                                   bandwidth, connections)
+                    if mode == VideoDownloadMode.AUDIO:
+                        ffmpeg_args: list[str] = ["-i", temp_files[0], "-acodec", "libmp3lame", "-aq", "0",
+                                                  part_file]
+                    else:
+                        ffmpeg_args: list[str] = ["-i", temp_files[0], "-acodec", "copy", part_file]
+
+        if mode == VideoDownloadMode.VIDEO:
+            if language == "en":
+                self.log.info(f"{pid} converting video format...")
+            else:
+                self.log.info(f"{pid} 正在转换视频格式...")
+        else:
+            if language == "en":
+                self.log.info(f"{pid} converting audio format...")
+            else:
+                self.log.info(f"{pid} 正在转换音频格式...")
+        async with transcoders:
+            return_code: int = await _run_ffmpeg(ffmpeg_path, *ffmpeg_args)
 
-                        if language == "en":
-                            self.log.info("Converting audio format...")
-                        else:
-                            self.log.info("正在转换音频格式...")
-                        os.system(f"{ffmpeg_path} -i {temp_m4s_audio} -acodec libmp3lame -aq 0 {mp3_audio_out}")
+        if return_code != 0:
+            if language == "en":
+                self.log.error(f"{pid} ffmpeg conversion failed with return code {return_code}, the temporary files "
+                               f"are kept: {temp_files}.")
+            else:
+                self.log.error(f"{pid} ffmpeg 转换失败，返回码为 {return_code}，临时文件已保留：{temp_files}。")
+            if os.path.exists(part_file):
+                os.remove(part_file)
+            return False
+
+        os.replace(part_file, output_file)
+        for temp_file in temp_files:
+            os.remove(temp_file)
+        if mode == VideoDownloadMode.VIDEO:
+            if language == "en":
+                self.log.info(f"{pid} video download successfully.")
+            else:
+                self.log.info(f"{pid} 视频下载成功.")
+        else:
+            if language == "en":
+                self.log.info(f"{pid} audio download successfully.")
+            else:
+                self.log.info(f"{pid} 音频下载成功.")
+        return True
 
-                        os.remove(temp_m4s_audio)
-                        if language == "en":
-                            self.log.info(f"{pid} audio download successfully.")
-                        else:
-                            self.log.info(f"{pid} 音频下载成功.")
+    @wlw.async_separate()
+    async def download(self,
+                       mode: VideoDownloadMode,
+                       parallel: int = 2,
+                       bandwidth: Optional[TokenBucket] = None,
+                       connections: Optional[asyncio.Semaphore] = None,
+                       transcoders: Optional[asyncio.Semaphore] = None) -> bool:
+        """
+        Download all videos or audio. Sub videos that have already been downloaded are skipped.
 
+        Args:
+            mode: 1 for downloading videos, 2 for downloading mp3 audio, 3 for downloading the original audio without
+                  transcoding
+            parallel: the maximum number of sub videos downloaded at the same time
+            bandwidth: shared bandwidth limiter in bytes per second, None for unlimited
+            connections: shared semaphore limiting the number of open download connections, None for unlimited
+            transcoders: shared semaphore limiting the number of ffmpeg processes, None for one per CPU core
+
+        Returns:
+            True if all sub videos are downloaded, otherwise False
+        """
+        if self.p_cid:
+            ffmpeg_path: str = await load_ffmpeg_path_from_txt()
+            download_semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, parallel))
+            if transcoders is None:
+                transcoders = asyncio.Semaphore(os.cpu_count() or 1)
+            results: list[bool] = await asyncio.gather(
+                *[self.__download_part(pid, mode, ffmpeg_path, download_semaphore, bandwidth, connections,
+                                       transcoders)
+                  for pid in self.p_cid])
+            return all(results)
         else:
             if language == "en":
                 self.log.warning("The sub video id is missing, cannot download!")
             else:
                 self.log.warning("缺少分p视频id，无法下载！")
+            return False
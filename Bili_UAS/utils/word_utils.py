@@ -0,0 +1,807 @@
+"""
+Bili_UAS.utils.word_utils
+
+This module provides the word frequency pipeline used to generate word cloud images.
+"""
+
+
+from __future__ import annotations
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+from numpy import typing as npt
+import asyncio
+import cv2 as cv
+import hashlib
+import itertools
+import jieba
+import json
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import sqlite3
+import unicodedata
+import wordcloud
+
+
+chinese_word_pattern: str = r'[\u4E00-\u9FFF]+'
+
+# tokenizer shared by the word frequency pipeline, replaced by load_tokenizer
+tokenizer: jieba.Tokenizer = jieba.dt
+# dictionary and model cache directory of the tokenizer, passed to tokenization workers
+tokenizer_args: tuple[Optional[str], Optional[str]] = (None, None)
+# identifies the dictionary, so that segmentation results of different dictionaries are cached separately
+dictionary_tag: str = "default"
+
+
+def _set_tokenizer(dictionary: Optional[str], tmp_dir: Optional[str]) -> None:
+    """
+    Replace the tokenizer of the word frequency pipeline. The prefix dictionary is built lazily on first use, and
+    jieba keeps the built model in the cache directory, so later runs only load it.
+
+    Args:
+        dictionary: the dictionary file, None for the default dictionary of jieba
+        tmp_dir: directory of the built model, None for the temporary directory
+    """
+    global tokenizer, tokenizer_args
+    tokenizer = jieba.Tokenizer(dictionary)
+    tokenizer.tmp_dir = tmp_dir
+    tokenizer_args = (dictionary, tmp_dir)
+
+
+def load_tokenizer(work_dir: str, user_dict: Optional[str] = None) -> None:
+    """
+    Set up the tokenizer of the word frequency pipeline. A user dictionary is merged with the default dictionary of
+    jieba into one dictionary file named after the hash of the user dictionary, so it is only merged again when the
+    user dictionary changes, and the prefix dictionary built from it is cached as well.
+
+    Args:
+        work_dir: working directory
+        user_dict: user dictionary in jieba format, one "word [frequency] [tag]" per line, None for not using one
+    """
+    global dictionary_tag
+    cache_dir: str = os.path.join(work_dir, "cache", "jieba")
+    os.makedirs(cache_dir, exist_ok=True)
+    if user_dict is None:
+        _set_tokenizer(None, cache_dir)
+        dictionary_tag = "default"
+        return
+
+    with open(user_dict, "rb") as f:
+        digest: str = hashlib.sha256(f.read() + jieba.__version__.encode("utf-8")).hexdigest()[:16]
+    dictionary: str = os.path.join(cache_dir, f"dict_{digest}.txt")
+    if not os.path.exists(dictionary):
+        merger: jieba.Tokenizer = jieba.Tokenizer()
+        merger.tmp_dir = cache_dir
+        merger.load_userdict(user_dict)
+        temp_file: str = dictionary + ".temp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for word, freq in merger.FREQ.items():
+                if freq > 0 and not any(char.isspace() for char in word):
+                    f.write(f"{word} {freq}\n")
+        os.replace(temp_file, dictionary)
+    _set_tokenizer(dictionary, cache_dir)
+    dictionary_tag = digest
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize a message before segmentation, so that messages differing only in width or surrounding spaces share
+    one cache entry.
+
+    Args:
+        message: message
+
+    Returns:
+        normalized message
+    """
+    return unicodedata.normalize("NFKC", message).strip()
+
+
+class TokenCache(object):
+    """
+    Memoization of word segmentation, keyed by normalized message. Recently used messages are kept in an in-memory
+    LRU, and an optional SQLite store shares the results across runs.
+    """
+
+    def __init__(self, db_file: Optional[str] = None, max_size: int = 100000) -> None:
+        """
+        Args:
+            db_file: SQLite file of the on-disk store, None for only using the in-memory LRU
+            max_size: the maximum number of messages kept in memory
+        """
+        self.memory: OrderedDict[str, list[str]] = OrderedDict()
+        self.max_size: int = max_size
+        self.db_file: Optional[str] = db_file
+        self.db: Optional[sqlite3.Connection] = None
+        if db_file is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+            self.db = sqlite3.connect(db_file, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS tokens (message TEXT PRIMARY KEY, tokens TEXT NOT NULL)")
+
+    def __remember(self, message: str, tokens: list[str]) -> None:
+        """
+        Put a message into the in-memory LRU.
+
+        Args:
+            message: normalized message
+            tokens: segmentation result
+        """
+        self.memory[message] = tokens
+        self.memory.move_to_end(message)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, messages: Iterable[str]) -> dict[str, list[str]]:
+        """
+        Look up segmentation results.
+
+        Args:
+            messages: normalized messages
+
+        Returns:
+            segmentation results of the messages found
+        """
+        found: dict[str, list[str]] = {}
+        missing: list[str] = []
+        for message in messages:
+            tokens: Optional[list[str]] = self.memory.get(message)
+            if tokens is not None:
+                self.memory.move_to_end(message)
+                found[message] = tokens
+            else:
+                missing.append(message)
+
+        if self.db is not None:
+            for i in range(0, len(missing), 500):
+                batch: list[str] = missing[i:i + 500]
+                rows = self.db.execute(f"SELECT message, tokens FROM tokens WHERE message IN "
+                                       f"({','.join('?' * len(batch))})", batch)
+                for message, raw_tokens in rows:
+                    tokens = json.loads(raw_tokens)
+                    found[message] = tokens
+                    self.__remember(message, tokens)
+        return found
+
+    def put_many(self, tokens: dict[str, list[str]]) -> None:
+        """
+        Save segmentation results.
+
+        Args:
+            tokens: segmentation results keyed by normalized message
+        """
+        for message, message_tokens in tokens.items():
+            self.__remember(message, message_tokens)
+        if self.db is not None and tokens:
+            self.db.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?)",
+                                [(message, json.dumps(message_tokens, ensure_ascii=False))
+                                 for message, message_tokens in tokens.items()])
+            self.db.commit()
+
+    def close(self) -> None:
+        """
+        Close the on-disk store.
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def load_token_cache(work_dir: str, persistent: bool) -> TokenCache:
+    """
+    Create the segmentation cache of the working directory. Results of each dictionary are kept in a separate
+    store, so load_tokenizer should be called first.
+
+    Args:
+        work_dir: working directory
+        persistent: whether to keep segmentation results on disk across runs
+
+    Returns:
+        the segmentation cache
+    """
+    if persistent:
+        if dictionary_tag == "default":
+            return TokenCache(os.path.join(work_dir, "cache", "token_cache.sqlite3"))
+        return TokenCache(os.path.join(work_dir, "cache", f"token_cache_{dictionary_tag}.sqlite3"))
+    return TokenCache()
+
+
+def _tokenize(messages: list[str]) -> list[list[str]]:
+    """
+    Segment messages one by one.
+
+    Args:
+        messages: normalized messages
+
+    Returns:
+        segmentation result of every message
+    """
+    return [tokenizer.lcut(message) for message in messages]
+
+
+def _unique_messages(chunk: list[str]) -> Counter:
+    """
+    Normalize a chunk of messages and count repeated messages.
+
+    Args:
+        chunk: messages
+
+    Returns:
+        number of occurrences of every normalized message
+    """
+    message_freq: Counter = Counter(normalize_message(message) for message in chunk)
+    message_freq.pop("", None)
+    return message_freq
+
+
+class WordFilter(object):
+    """
+    Filter of word frequency tables. Words are filtered once over the whole table instead of token by token, so the
+    cost depends on the vocabulary instead of the number of messages.
+    """
+
+    def __init__(self, stopwords: Iterable[str] = (), min_length: int = 1, min_count: int = 1) -> None:
+        """
+        Args:
+            stopwords: words to remove
+            min_length: the minimum number of characters of a word
+            min_count: the minimum frequency of a word
+        """
+        self.stopwords: set[str] = set(stopwords)
+        self.min_length: int = min_length
+        self.min_count: int = min_count
+
+    def apply(self, word_freq: Counter) -> Counter:
+        """
+        Keep the Chinese words that are long and frequent enough and are not stopwords.
+
+        Args:
+            word_freq: word frequency
+
+        Returns:
+            filtered word frequency
+        """
+        if not word_freq:
+            return Counter()
+        table: pd.Series = pd.Series(word_freq)
+        words: pd.Index = table.index
+        keep = words.str.fullmatch(chinese_word_pattern) & (table.to_numpy() >= self.min_count)
+        if self.min_length > 1:
+            keep &= words.str.len() >= self.min_length
+        if self.stopwords:
+            keep &= ~words.isin(self.stopwords)
+        return Counter(table[keep].to_dict())
+
+
+def load_stopwords(stopword_file: str) -> set[str]:
+    """
+    Load stopwords from file, one word per line.
+
+    Args:
+        stopword_file: the stopword file
+
+    Returns:
+        the stopwords
+    """
+    with open(stopword_file, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def load_word_filter(stopword_file: Optional[str], min_length: int, min_count: int) -> WordFilter:
+    """
+    Create the word filter according to the configuration and the command line options.
+
+    Args:
+        stopword_file: the stopword file, None for not removing stopwords
+        min_length: the minimum number of characters of a word
+        min_count: the minimum frequency of a word
+
+    Returns:
+        the word filter
+    """
+    stopwords: set[str] = load_stopwords(stopword_file) if stopword_file is not None else set()
+    return WordFilter(stopwords, min_length, min_count)
+
+
+def _add_words(message_freq: Counter, tokens: dict[str, list[str]], word_freq: Counter) -> None:
+    """
+    Add the words of messages to the counter, weighted by the number of occurrences of each message.
+
+    Args:
+        message_freq: number of occurrences of every normalized message
+        tokens: segmentation results keyed by normalized message
+        word_freq: the running word frequency counter
+    """
+    for message, number in message_freq.items():
+        for word in tokens[message]:
+            word_freq[word] += number
+
+
+def _count_chunk(chunk: list[str], word_freq: Counter, token_cache: TokenCache) -> None:
+    """
+    Tokenize a chunk of messages and add the words to the counter. Each distinct message is segmented at
+    most once, and messages found in the cache are not segmented at all.
+
+    Args:
+        chunk: messages
+        word_freq: the running word frequency counter
+        token_cache: the segmentation cache
+    """
+    message_freq: Counter = _unique_messages(chunk)
+    tokens: dict[str, list[str]] = token_cache.get_many(message_freq)
+    misses: list[str] = [message for message in message_freq if message not in tokens]
+    if misses:
+        new_tokens: dict[str, list[str]] = dict(zip(misses, _tokenize(misses)))
+        token_cache.put_many(new_tokens)
+        tokens.update(new_tokens)
+    _add_words(message_freq, tokens, word_freq)
+
+
+def _chunks(messages: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    """
+    Split messages into chunks.
+
+    Args:
+        messages: messages, can be a generator
+        chunk_size: number of messages in a chunk
+
+    Yields:
+        chunks of messages
+    """
+    chunk: list[str] = []
+    for message in messages:
+        if not isinstance(message, str):
+            continue
+        chunk.append(message)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def count_words(messages: Iterable[str],
+                chunk_size: int = 2000,
+                token_cache: Optional[TokenCache] = None,
+                word_filter: Optional[WordFilter] = None) -> Counter:
+    """
+    Count word frequency of messages. Messages are tokenized chunk by chunk and the table is filtered at the end, so
+    memory usage depends on the vocabulary instead of the number of messages.
+
+    Args:
+        messages: messages, e.g. reply or danmu content, can be a generator
+        chunk_size: number of messages tokenized at a time
+        token_cache: the segmentation cache, None for an in-memory cache of this call
+        word_filter: the word filter, None for only keeping Chinese words
+
+    Returns:
+        word frequency
+    """
+    if token_cache is None:
+        token_cache = TokenCache()
+    if word_filter is None:
+        word_filter = WordFilter()
+    word_freq: Counter = Counter()
+    for chunk in _chunks(messages, chunk_size):
+        _count_chunk(chunk, word_freq, token_cache)
+    return word_filter.apply(word_freq)
+
+
+def _init_tokenizer(dictionary: Optional[str], tmp_dir: Optional[str]) -> None:
+    """
+    Load the dictionary once when a tokenization worker starts.
+
+    Args:
+        dictionary: the dictionary file, None for the default dictionary of jieba
+        tmp_dir: directory of the built model, None for the temporary directory
+    """
+    _set_tokenizer(dictionary, tmp_dir)
+    tokenizer.initialize()
+
+
+def _tokenize_shard(shard: list[str]) -> list[list[str]]:
+    """
+    Segment a shard of messages in a tokenization worker.
+
+    Args:
+        shard: normalized messages
+
+    Returns:
+        segmentation result of every message
+    """
+    return _tokenize(shard)
+
+
+def count_words_parallel(messages: Iterable[str],
+                         processes: Optional[int] = None,
+                         chunk_size: int = 2000,
+                         token_cache: Optional[TokenCache] = None,
+                         word_filter: Optional[WordFilter] = None) -> Counter:
+    """
+    Count word frequency of messages with a process pool. Each chunk of messages is deduplicated and looked up in
+    the segmentation cache, and only the distinct messages missing from the cache are sent to the workers. Each
+    worker loads the jieba dictionary once, and the results are cached and counted as they arrive. At most two
+    chunks per worker are in flight, so messages can still be streamed. Small inputs that fit into one round of
+    chunks are counted in the current process, since starting the pool would cost more than it saves.
+
+    Args:
+        messages: messages, e.g. reply or danmu content, can be a generator
+        processes: number of worker processes, None or 0 for the number of CPU cores
+        chunk_size: number of messages sent to a worker at a time
+        token_cache: the segmentation cache, None for an in-memory cache of this call
+        word_filter: the word filter, None for only keeping Chinese words
+
+    Returns:
+        word frequency
+    """
+    if not processes:
+        processes = os.cpu_count() or 1
+    if token_cache is None:
+        token_cache = TokenCache()
+    if word_filter is None:
+        word_filter = WordFilter()
+    chunks: Iterator[list[str]] = _chunks(messages, chunk_size)
+    head: list[list[str]] = list(itertools.islice(chunks, processes))
+    word_freq: Counter = Counter()
+    if processes <= 1 or len(head) < processes:
+        for chunk in itertools.chain(head, chunks):
+            _count_chunk(chunk, word_freq, token_cache)
+        return word_filter.apply(word_freq)
+
+    with ProcessPoolExecutor(processes, initializer=_init_tokenizer, initargs=tokenizer_args) as pool:
+        in_flight: dict[Future, tuple[Counter, dict[str, list[str]], list[str]]] = {}
+
+        def __merge(future: Future) -> None:
+            """
+            Cache and count the segmentation result of a finished shard.
+
+            Args:
+                future: the finished shard
+            """
+            message_freq, tokens, misses = in_flight.pop(future)
+            new_tokens: dict[str, list[str]] = dict(zip(misses, future.result()))
+            token_cache.put_many(new_tokens)
+            tokens.update(new_tokens)
+            _add_words(message_freq, tokens, word_freq)
+
+        for chunk in itertools.chain(head, chunks):
+            message_freq: Counter = _unique_messages(chunk)
+            tokens: dict[str, list[str]] = token_cache.get_many(message_freq)
+            misses: list[str] = [message for message in message_freq if message not in tokens]
+            if not misses:
+                _add_words(message_freq, tokens, word_freq)
+                continue
+            if len(in_flight) >= 2 * processes:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    __merge(future)
+            in_flight[pool.submit(_tokenize_shard, misses)] = (message_freq, tokens, misses)
+        for future in list(in_flight):
+            __merge(future)
+    return word_filter.apply(word_freq)
+
+
+async def merge_pages(*sources: AsyncIterator[list[str]]) -> AsyncIterator[list[str]]:
+    """
+    Fetch several sources of pages concurrently and yield their pages in the order they arrive.
+
+    Args:
+        sources: sources of pages
+
+    Yields:
+        pages of messages
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+    async def __produce(source: AsyncIterator[list[str]]) -> None:
+        """
+        Put the pages of a source into the queue, followed by None when the source is exhausted.
+
+        Args:
+            source: source of pages
+        """
+        try:
+            async for page in source:
+                await queue.put(page)
+        finally:
+            await queue.put(None)
+
+    producers: list[asyncio.Task] = [asyncio.create_task(__produce(source)) for source in sources]
+    try:
+        remaining: int = len(producers)
+        while remaining:
+            page: Optional[list[str]] = await queue.get()
+            if page is None:
+                remaining -= 1
+            else:
+                yield page
+        await asyncio.gather(*producers)
+    finally:
+        for producer in producers:
+            producer.cancel()
+
+
+async def count_words_async(pages: AsyncIterable[list[str]],
+                            processes: Optional[int] = None,
+                            chunk_size: int = 2000,
+                            token_cache: Optional[TokenCache] = None,
+                            word_filter: Optional[WordFilter] = None) -> Counter:
+    """
+    Count word frequency of messages arriving page by page, e.g. while they are still being fetched. Each page is
+    deduplicated and looked up in the segmentation cache as soon as it arrives, and the missing messages are
+    segmented in the background in one thread. Only when more than one round of chunks has missed the cache and more
+    than one process is used, a process pool is started for the rest, since loading the jieba dictionary in every
+    worker costs more than it saves for small inputs. At most two chunks per worker are in flight, so a slow
+    tokenizer slows down the fetching instead of piling up pages in memory.
+
+    Args:
+        pages: pages of messages, e.g. reply or danmu content
+        processes: number of worker processes, None or 0 for the number of CPU cores
+        chunk_size: number of messages sent to a worker at a time
+        token_cache: the segmentation cache, None for an in-memory cache of this call
+        word_filter: the word filter, None for only keeping Chinese words
+
+    Returns:
+        word frequency
+    """
+    if not processes:
+        processes = os.cpu_count() or 1
+    if token_cache is None:
+        token_cache = TokenCache()
+    if word_filter is None:
+        word_filter = WordFilter()
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    pools: list[Executor] = [ThreadPoolExecutor(1)]
+    workers: int = 1
+    miss_count: int = 0
+    word_freq: Counter = Counter()
+    in_flight: set[asyncio.Future] = set()
+
+    async def __tokenize(message_freq: Counter, tokens: dict[str, list[str]], misses: list[str],
+                         pool: Executor) -> None:
+        """
+        Segment the messages missing from the cache, then cache and count them.
+
+        Args:
+            message_freq: number of occurrences of every normalized message
+            tokens: segmentation results found in the cache
+            misses: messages missing from the cache
+            pool: the executor segmenting the messages
+        """
+        result: list[list[str]] = await loop.run_in_executor(pool, _tokenize_shard, misses)
+        new_tokens: dict[str, list[str]] = dict(zip(misses, result))
+        token_cache.put_many(new_tokens)
+        tokens.update(new_tokens)
+        _add_words(message_freq, tokens, word_freq)
+
+    try:
+        async for page in pages:
+            for chunk in _chunks(page, chunk_size):
+                message_freq: Counter = _unique_messages(chunk)
+                tokens: dict[str, list[str]] = token_cache.get_many(message_freq)
+                misses: list[str] = [message for message in message_freq if message not in tokens]
+                if not misses:
+                    _add_words(message_freq, tokens, word_freq)
+                    continue
+                miss_count += len(misses)
+                if processes > 1 and workers == 1 and miss_count > processes * chunk_size:
+                    pools.append(ProcessPoolExecutor(processes, initializer=_init_tokenizer,
+                                                     initargs=tokenizer_args))
+                    workers = processes
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.ensure_future(__tokenize(message_freq, tokens, misses, pools[-1])))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        # do not block the event loop waiting for the running shards
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return word_filter.apply(word_freq)
+
+
+def save_word_freq(word_freq: Counter, freq_file: str) -> None:
+    """
+    Save a word frequency table, so that word clouds of many sources can be merged later without segmenting the
+    messages again. The file is replaced atomically.
+
+    Args:
+        word_freq: word frequency
+        freq_file: the word frequency file
+    """
+    temp_file: str = freq_file + ".temp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(dict(word_freq.most_common()), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_file, freq_file)
+
+
+def load_word_freq(freq_file: str) -> Counter:
+    """
+    Load a word frequency table.
+
+    Args:
+        freq_file: the word frequency file
+
+    Returns:
+        word frequency
+    """
+    with open(freq_file, "r", encoding="utf-8") as f:
+        return Counter(json.load(f))
+
+
+def merge_word_freq(freq_files: Iterable[str]) -> Counter:
+    """
+    Merge word frequency tables by adding up the frequency of every word.
+
+    Args:
+        freq_files: word frequency files
+
+    Returns:
+        the merged word frequency
+    """
+    word_freq: Counter = Counter()
+    for freq_file in freq_files:
+        word_freq.update(load_word_freq(freq_file))
+    return word_freq
+
+
+def find_word_freq_files(directory: str, file_name: str) -> list[str]:
+    """
+    Find word frequency files in a directory and all its subdirectories.
+
+    Args:
+        directory: the directory, e.g. the output directory of a live room or of a single live-streaming
+        file_name: name of the word frequency file
+
+    Returns:
+        paths of the word frequency files found
+    """
+    freq_files: list[str] = []
+    for root, _, files in os.walk(directory):
+        if file_name in files:
+            freq_files.append(os.path.join(root, file_name))
+    return sorted(freq_files)
+
+
+def load_mask(mask_file: str, work_dir: str) -> npt.NDArray:
+    """
+    Load a word cloud mask. The decoded array is cached as a .npy file keyed by the path, size and modification time
+    of the image, so the image is only decoded again after it changes.
+
+    Args:
+        mask_file: the mask image
+        work_dir: working directory
+
+    Returns:
+        the mask array
+    """
+    stat = os.stat(mask_file)
+    raw_key: str = f"{os.path.abspath(mask_file)}|{stat.st_size}|{stat.st_mtime_ns}"
+    cache_dir: str = os.path.join(work_dir, "cache", "mask")
+    cache_file: str = os.path.join(cache_dir, hashlib.sha256(raw_key.encode("utf-8")).hexdigest() + ".npy")
+    if os.path.exists(cache_file):
+        return np.load(cache_file)
+    mask: npt.NDArray = cv.imread(mask_file).astype(np.uint8)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_file: str = cache_file + ".temp.npy"
+    np.save(temp_file, mask)
+    os.replace(temp_file, cache_file)
+    return mask
+
+
+class WordCloudRenderer(object):
+    """
+    Word cloud renderer. Only the most frequent words are laid out, and rendered images are cached by the hash of
+    those words together with the mask, font and size, so an unchanged word cloud skips the layout entirely.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 top_n: int = 200,
+                 font_path: str = 'PingFang.ttc',
+                 width: int = 1080,
+                 height: int = 675,
+                 max_images: int = 256) -> None:
+        """
+        Args:
+            cache_dir: directory of cached images, None for not caching
+            top_n: the maximum number of words in the word cloud
+            font_path: the font of the word cloud
+            width: width of the image, ignored if a mask is used
+            height: height of the image, ignored if a mask is used
+            max_images: the maximum number of cached images, the least recently used images are removed first
+        """
+        self.cache_dir: Optional[str] = cache_dir
+        self.top_n: int = top_n
+        self.font_path: str = font_path
+        self.width: int = width
+        self.height: int = height
+        self.max_images: int = max_images
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __key(self, words: list[tuple[str, int]], mask: Optional[npt.NDArray]) -> str:
+        """
+        Compute the cache key of a word cloud.
+
+        Args:
+            words: the words laid out and their frequency
+            mask: word cloud mask
+
+        Returns:
+            the cache key
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([words, self.top_n, self.font_path, self.width, self.height],
+                                 ensure_ascii=False).encode("utf-8"))
+        if mask is not None:
+            digest.update(str(mask.shape).encode("utf-8"))
+            digest.update(np.ascontiguousarray(mask).tobytes())
+        return digest.hexdigest()
+
+    def __prune(self) -> None:
+        """
+        Remove the least recently used images beyond the limit.
+        """
+        images: list[tuple[float, str]] = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".png"):
+                path: str = os.path.join(self.cache_dir, name)
+                images.append((os.path.getmtime(path), path))
+        images.sort()
+        for _, path in images[:max(0, len(images) - self.max_images)]:
+            os.remove(path)
+
+    def render(self, word_freq: Counter, mask: Optional[npt.NDArray], save_path: str) -> bool:
+        """
+        Render a word cloud image from word frequency.
+
+        Args:
+            word_freq: word frequency
+            mask: word cloud mask, filling the white pixel with word clouds
+            save_path: path of the image
+
+        Returns:
+            whether the image was taken from the cache
+        """
+        words: list[tuple[str, int]] = word_freq.most_common(self.top_n)
+        key: str = self.__key(words, mask)
+        cache_file: Optional[str] = None
+        if self.cache_dir is not None:
+            cache_file = os.path.join(self.cache_dir, key + ".png")
+            if os.path.exists(cache_file):
+                os.utime(cache_file)
+                shutil.copyfile(cache_file, save_path)
+                return True
+
+        wc = wordcloud.WordCloud(font_path=self.font_path, background_color='white', mask=mask, height=self.height,
+                                 width=self.width, max_words=self.top_n, random_state=int(key[:8], 16))
+        wc.generate_from_frequencies(dict(words))
+        image = wc.to_image()
+        image.save(save_path, quality=100)
+
+        if cache_file is not None:
+            temp_file: str = cache_file + ".temp"
+            shutil.copyfile(save_path, temp_file)
+            os.replace(temp_file, cache_file)
+            self.__prune()
+        return False
+
+
+def load_word_cloud_renderer(work_dir: str, top_n: int) -> WordCloudRenderer:
+    """
+    Create the word cloud renderer of the working directory.
+
+    Args:
+        work_dir: working directory
+        top_n: the maximum number of words in the word cloud
+
+    Returns:
+        the word cloud renderer
+    """
+    return WordCloudRenderer(os.path.join(work_dir, "cache", "word_cloud"), top_n)
@@ -22,3 +22,11 @@ class FileMissError(Exception):
     """
     def __init__(self, message: str) -> None:
         self.message = message
+
+
+class CacheMissError(Exception):
+    """
+    Raise when a response is not in the cache while only the cache may be used.
+    """
+    def __init__(self, message: str) -> None:
+        self.message = message
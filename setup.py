@@ -55,7 +55,8 @@ setup(
             'bili-live = Bili_UAS.bili_live:tyro_cli',
             'bili-login = Bili_UAS.bili_login:tyro_cli',
             'bili-video = Bili_UAS.bili_video:tyro_cli',
-            'bili-user = Bili_UAS.bili_user:tyro_cli'
+            'bili-user = Bili_UAS.bili_user:tyro_cli',
+            'bili-scheduler = Bili_UAS.bili_scheduler:tyro_cli'
         ],
     }
 )
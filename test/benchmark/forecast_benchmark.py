@@ -0,0 +1,119 @@
+"""
+Benchmark for the batch forecasting in train_utils.py
+"""
+
+
+from Bili_UAS.utils import train_utils as utu
+from typing import Callable
+import numpy as np
+import time
+
+
+def make_series(number: int, days: float, per_day: int, seed: int = 0, outlier: float = 0.01,
+                regular: bool = False) -> tuple[list[tuple[np.ndarray, np.ndarray]], list[Callable], float]:
+    """
+    Generate irregularly sampled follower series with trend, daily seasonality, noise and outliers.
+
+    Args:
+        number: number of series
+        days: time span of every series, unit: day
+        per_day: average number of observations per day
+        seed: random seed
+        outlier: probability of an observation being an outlier
+        regular: whether to sample at fixed intervals, e.g. once a day at the same time, instead of at random times
+
+    Returns:
+        (timestamps, values) of every series, the noise-free value of every series as a function of timestamps, and
+        the standard deviation of the noise
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    start: int = 1_700_000_000
+    noise: float = 10
+    series: list[tuple[np.ndarray, np.ndarray]] = []
+    truths: list[Callable] = []
+    for _ in range(number):
+        if regular:
+            size: int = int(days * per_day)
+            times: np.ndarray = start + np.arange(size) * (utu.day_seconds // per_day)
+        else:
+            size = max(int(rng.integers(days * per_day // 2, days * per_day * 3 // 2 + 1)), 3)
+            times = np.sort(rng.integers(start, start + int(days * utu.day_seconds), size))
+        base, slope, amplitude = rng.uniform(1e3, 1e6), rng.normal(0, 200), rng.uniform(0, 100)
+        truth: Callable = (lambda x, base=base, slope=slope, amplitude=amplitude:
+                           base + slope * (x - start) / utu.day_seconds
+                           + amplitude * np.sin(2 * np.pi * (x % utu.day_seconds) / utu.day_seconds))
+        values: np.ndarray = truth(times) + rng.normal(0, noise, size)
+        values[rng.random(size) < outlier] += rng.normal(0, 5000)
+        series.append((times, values))
+        truths.append(truth)
+    return series, truths, noise
+
+
+def compare(name: str, series: list[tuple[np.ndarray, np.ndarray]]) -> None:
+    """
+    Print the time of fitting and forecasting the series in one batch and one by one.
+
+    Args:
+        name: name of the case
+        series: (timestamps, values) of every series
+    """
+    print(f"{name}: series: {len(series)}, observations: {sum(len(elem[0]) for elem in series)}")
+
+    start: float = time.perf_counter()
+    batch = utu.fit_forecast(series, 7 * utu.day_seconds, 3600)
+    batch_time: float = time.perf_counter() - start
+    print(f"\tbatch: {batch_time:.2f}s")
+
+    start = time.perf_counter()
+    single = [utu.forecast(times, values, 7 * utu.day_seconds, 3600) for times, values in series]
+    single_time: float = time.perf_counter() - start
+    print(f"\tone by one: {single_time:.2f}s, speedup: {single_time / batch_time:.2f}x")
+    for a, b in zip(batch, single):
+        assert np.allclose(a['mean'], b['mean'], rtol=1e-6, atol=1e-3)
+
+
+def coverage(name: str, days: float, per_day: int, regular: bool = False, level: float = 0.9,
+             number: int = 400) -> None:
+    """
+    Print and check the share of new observations falling in the forecast interval, which should be close to the
+    level for long and short series alike.
+
+    Args:
+        name: name of the case
+        days: time span of every series, unit: day
+        per_day: average number of observations per day
+        regular: whether to sample at fixed intervals and forecast at the same interval, other times are not observed
+        level: probability covered by the forecast interval
+        number: number of series
+    """
+    rng: np.random.Generator = np.random.default_rng(1)
+    series, truths, noise = make_series(number, days, per_day, seed=2, regular=regular)
+    step: int = utu.day_seconds // per_day if regular else 6 * 60 * 60
+    results = utu.fit_forecast(series, 3 * utu.day_seconds, step, level)
+    hits: list[np.ndarray] = []
+    for result, truth in zip(results, truths):
+        actual: np.ndarray = truth(result['time']) + rng.normal(0, noise, len(result['time']))
+        hits.append((actual >= result['lower']) & (actual <= result['upper']))
+    rate: float = float(np.concatenate(hits).mean())
+    print(f"{name}: observations per series: about {int(days * per_day)}, coverage: {rate:.3f} (level {level})")
+    assert level - 0.05 <= rate <= level + 0.07
+
+
+def main():
+    """
+    Main function. Compares batch and one-by-one forecasting of hourly samples over 60 days and of daily samples over
+    90 days, then checks the interval coverage of long and short series.
+    """
+    compare("hourly", make_series(500, 60, 24)[0])
+    compare("daily", make_series(500, 90, 1)[0])
+    coverage("hourly, 14 days", 14, 24)
+    coverage("every 3 hours, 30 days", 30, 8)
+    coverage("daily, 30 days", 30, 1)
+    coverage("every 6 hours, 5 days", 5, 4)
+    coverage("daily, 10 days", 10, 1)
+    coverage("once a day at the same time, 10 days", 10, 1, regular=True)
+    coverage("every 6 hours at the same times, 5 days", 5, 4, regular=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark for the word frequency pipeline in word_utils.py
+"""
+
+
+from Bili_UAS.utils import word_utils as uwu
+import os
+import random
+import time
+
+
+vocabulary: list[str] = ["哈哈哈", "草", "awsl", "主播", "好看", "今天", "直播间", "这个", "真的", "太强了", "弹幕", "舰长",
+                         "晚上好", "可爱", "下播", "唱歌", "游戏", "关注", "礼物", "感谢", "老板", "大气", "什么", "时候"]
+
+
+def make_corpus(number: int, seed: int = 0) -> list[str]:
+    """
+    Generate random danmu-like messages.
+
+    Args:
+        number: number of messages
+        seed: random seed
+
+    Returns:
+        messages
+    """
+    rng: random.Random = random.Random(seed)
+    return ["".join(rng.choices(vocabulary, k=rng.randint(1, 6))) for _ in range(number)]
+
+
+def main():
+    """
+    Main function. Prints the time of counting word frequency against the number of processes.
+    """
+    corpus: list[str] = make_corpus(200000)
+    uwu.count_words(corpus[:10])  # load the jieba dictionary before timing
+
+    start: float = time.perf_counter()
+    expected = uwu.count_words(corpus)
+    serial_time: float = time.perf_counter() - start
+    print(f"messages: {len(corpus)}, cores: {os.cpu_count()}")
+    print(f"serial: {serial_time:.2f}s")
+
+    processes: int = 2
+    while processes <= max(2, os.cpu_count() or 1):
+        start = time.perf_counter()
+        result = uwu.count_words_parallel(corpus, processes)
+        parallel_time: float = time.perf_counter() - start
+        assert result == expected
+        print(f"{processes} processes: {parallel_time:.2f}s, speedup: {serial_time / parallel_time:.2f}x")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
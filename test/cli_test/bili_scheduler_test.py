@@ -0,0 +1,25 @@
+"""
+Test for bili_scheduler.py
+"""
+
+
+from Bili_UAS import bili_scheduler as bs
+from Bili_UAS.cli import scheduler_cli as csc
+
+
+def scheduler_test():
+    """
+    Main function for scheduler test.
+    """
+    print("Scheduler test:")
+    config: csc.BiliSchedulerConfig = csc.BiliSchedulerConfig()
+    config.video_id = ("BV13L41127Bo", "BV1gG4y1X7DJ")
+    config.video_interval = 10
+    config.live_id = (...,)
+    config.live_interval = 1
+    bs.sync_tyro_main(config)
+
+
+if __name__ == '__main__':
+    scheduler_test()
+    pass
@@ -17,6 +17,28 @@ def update_test():
     bu.sync_tyro_main(config)
 
 
+def batch_update_test():
+    """
+    Main function for batch update test.
+    """
+    print("Batch update test:")
+    config: cuc.BiliUserConfigBatchUpdate = cuc.BiliUserConfigBatchUpdate()
+    config.uid = (..., ...)
+    bu.sync_tyro_main(config)
+
+
+def forecast_test():
+    """
+    Main function for forecast test.
+    """
+    print("Forecast test:")
+    config: cuc.BiliUserConfigForecast = cuc.BiliUserConfigForecast()
+    config.name = "..."
+    bu.sync_tyro_main(config)
+
+
 if __name__ == '__main__':
     update_test()
+    # batch_update_test()
+    # forecast_test()
     pass
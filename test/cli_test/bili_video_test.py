@@ -28,6 +28,17 @@ def audio_download_test():
     bv.sync_tyro_main(config)
 
 
+def batch_download_test():
+    """
+    Main function for batch download test.
+    """
+    print("Batch download test:")
+    config: cvc.BiliVideoConfigBatchDownload = cvc.BiliVideoConfigBatchDownload()
+    config.video_id = ("BV13L41127Bo", "BV1gG4y1X7DJ")
+    config.bandwidth = 2048
+    bv.sync_tyro_main(config)
+
+
 def word_cloud_test():
     """
     Main function for word cloud test.
@@ -40,8 +51,32 @@ def word_cloud_test():
     bv.sync_tyro_main(config)
 
 
+def merge_word_cloud_test():
+    """
+    Main function for merge word cloud test.
+    """
+    print("Merge word cloud test:")
+    config: cvc.BiliVideoConfigMergeWordCloud = cvc.BiliVideoConfigMergeWordCloud()
+    config.video_id = ("BV13L41127Bo", "BV1gG4y1X7DJ")
+    config.mode = 3
+    bv.sync_tyro_main(config)
+
+
+def corpus_test():
+    """
+    Main function for corpus analysis test.
+    """
+    print("Corpus analysis test:")
+    config: cvc.BiliVideoConfigCorpus = cvc.BiliVideoConfigCorpus()
+    config.video_id = ("BV13L41127Bo", "BV1gG4y1X7DJ")
+    bv.sync_tyro_main(config)
+
+
 if __name__ == "__main__":
     video_download_test()
     # audio_download_test()
+    # batch_download_test()
     # word_cloud_test()
+    # merge_word_cloud_test()
+    # corpus_test()
     pass